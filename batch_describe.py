@@ -0,0 +1,236 @@
+"""
+批量图片描述：并发调用 TokenFree 多模态接口，结果逐行写入 JSONL 文件，中断后可继续。
+
+用法：
+    python batch_describe.py data/images/cat --output results.jsonl --concurrency 8
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import requests
+from PIL import Image
+
+from latency_stats import percentile
+from tokenfree_api import (
+    DELIVERY_CHECK_PROMPT,
+    JPEG_QUALITY,
+    MAX_IMAGE_SIZE,
+    StreamingImagePayload,
+    iter_content,
+    prepare_image,
+    stream_request,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# 遇到这些状态码时按指数退避重试
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def collect_images(sources: Iterable[str]) -> List[str]:
+    """
+    展开图片路径，目录会被递归遍历。
+
+    :param sources: 图片文件或目录的路径
+    :return: 排序后的图片路径列表
+    """
+    images = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                images.extend(
+                    os.path.join(root, name)
+                    for name in files
+                    if name.lower().endswith(IMAGE_EXTENSIONS)
+                )
+        else:
+            images.append(source)
+    return sorted(images)
+
+
+def load_completed(results_path: str) -> Set[str]:
+    """读取结果文件中已成功处理的图片，用于断点续跑。"""
+    completed = set()
+    if not os.path.exists(results_path):
+        return completed
+    with open(results_path, encoding="utf-8") as results_file:
+        for line in results_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 上次中断时可能留下不完整的最后一行
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["image"])
+    return completed
+
+
+class BatchDescriber:
+    """带并发上限和重试的批量图片描述。每个工作线程使用独立的 Session 复用连接。"""
+
+    def __init__(
+        self,
+        text: str = DELIVERY_CHECK_PROMPT,
+        concurrency: int = 8,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_size: int = MAX_IMAGE_SIZE,
+        quality: int = JPEG_QUALITY,
+        api_url: Optional[str] = None,
+    ):
+        """
+        :param text: 发送给模型的提示词
+        :param concurrency: 同时进行的请求数
+        :param max_retries: 单张图片的最大重试次数
+        :param backoff: 首次重试前的等待时间（秒），之后每次翻倍并加入随机抖动
+        :param max_size: 图片最大边长
+        :param quality: JPEG 质量
+        :param api_url: 接口地址，默认使用 tokenfree_api.API_URL
+        """
+        self.text = text
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_size = max_size
+        self.quality = quality
+        self.api_url = api_url
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _retry_delay(self, attempt: int, err: requests.RequestException) -> float:
+        response = getattr(err, "response", None)
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+        return self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+    def describe(self, image_path: str) -> Dict:
+        """
+        描述单张图片，遇到 429/5xx 或连接错误时重试。
+
+        :return: 写入结果文件的记录
+        """
+        start = time.perf_counter()
+        record = {"image": image_path}
+        try:
+            payload = StreamingImagePayload(
+                prepare_image(image_path, self.max_size, self.quality), self.text
+            )
+        except (OSError, Image.DecompressionBombError) as err:
+            # 只记录这一张图片的错误，不中断整批任务
+            record.update(status="error", error=f"读取图片失败: {err}", attempts=0)
+            record["latency"] = time.perf_counter() - start
+            return record
+
+        for attempt in range(1, self.max_retries + 2):
+            try:
+                description = "".join(
+                    iter_content(stream_request(payload, self.api_url, self._session()))
+                )
+                record.update(status="ok", description=description, attempts=attempt)
+                break
+            except requests.RequestException as err:
+                response = getattr(err, "response", None)
+                retryable = response is None or response.status_code in RETRY_STATUS_CODES
+                if not retryable or attempt > self.max_retries:
+                    record.update(status="error", error=str(err), attempts=attempt)
+                    break
+                time.sleep(self._retry_delay(attempt, err))
+        record["latency"] = time.perf_counter() - start
+        return record
+
+    def run(
+        self,
+        images: List[str],
+        results_path: str,
+        progress_callback: Optional[Callable[[int, int, Dict], None]] = None,
+    ) -> Dict:
+        """
+        批量处理图片，跳过结果文件中已成功的图片，每完成一张立即追加写入结果。
+
+        :param images: 图片路径列表
+        :param results_path: JSONL 结果文件路径
+        :param progress_callback: 每完成一张图片时调用 callback(已完成数, 总数, 记录)
+        :return: 统计信息，包括吞吐量（张/秒）和 p50/p95 延迟
+        """
+        completed = load_completed(results_path)
+        pending = [image for image in images if image not in completed]
+        latencies = []
+        failed = 0
+
+        start = time.perf_counter()
+        with open(results_path, "a", encoding="utf-8") as results_file, ThreadPoolExecutor(
+            max_workers=self.concurrency
+        ) as executor:
+            futures = [executor.submit(self.describe, image) for image in pending]
+            for done, future in enumerate(as_completed(futures), start=1):
+                record = future.result()
+                results_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                results_file.flush()
+                if record["status"] == "ok":
+                    latencies.append(record["latency"])
+                else:
+                    failed += 1
+                if progress_callback is not None:
+                    progress_callback(done, len(pending), record)
+        elapsed = time.perf_counter() - start
+
+        return {
+            "total": len(images),
+            "skipped": len(images) - len(pending),
+            "succeeded": len(latencies),
+            "failed": failed,
+            "elapsed": elapsed,
+            "images_per_sec": len(pending) / elapsed if elapsed > 0 else 0.0,
+            "p50_latency": percentile(latencies, 50),
+            "p95_latency": percentile(latencies, 95),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量描述图片")
+    parser.add_argument("sources", nargs="+", help="图片文件或目录")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL 结果文件")
+    parser.add_argument("--prompt", default=DELIVERY_CHECK_PROMPT, help="提示词")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发请求数")
+    parser.add_argument("--max-retries", type=int, default=5, help="最大重试次数")
+    parser.add_argument("--max-size", type=int, default=MAX_IMAGE_SIZE, help="图片最大边长")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY, help="JPEG 质量")
+    parser.add_argument("--api-url", default=None, help="接口地址，可指向 mock_server.py")
+    args = parser.parse_args()
+
+    describer = BatchDescriber(
+        text=args.prompt,
+        concurrency=args.concurrency,
+        max_retries=args.max_retries,
+        max_size=args.max_size,
+        quality=args.quality,
+        api_url=args.api_url,
+    )
+
+    def report_progress(done: int, total: int, record: Dict) -> None:
+        print(f"[{done}/{total}] {record['status']} {record['image']}")
+
+    stats = describer.run(collect_images(args.sources), args.output, report_progress)
+    print(
+        f"共 {stats['total']} 张，跳过 {stats['skipped']} 张，成功 {stats['succeeded']} 张，"
+        f"失败 {stats['failed']} 张，耗时 {stats['elapsed']:.2f} 秒"
+    )
+    print(
+        f"吞吐量 {stats['images_per_sec']:.2f} 张/秒，"
+        f"p50 延迟 {stats['p50_latency']:.3f} 秒，p95 延迟 {stats['p95_latency']:.3f} 秒"
+    )
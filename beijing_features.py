@@ -0,0 +1,250 @@
+"""
+北京房价的稀疏特征。
+
+原来的做法用 pd.get_dummies 把 小区名字、房型、楼层 展开成上千个几乎全为 0 的稠密列，
+LinearRegression 训练时还会再复制成 float64 矩阵。BeijingFeatureEncoder 直接构造 CSR 稀疏矩阵：
+每行只有数值特征和 3 个类别特征对应的非零元素。数值特征（包括平方项和交互项）先标准化，
+避免 建造时间平方 这类数量级很大的列使求解病态。
+
+小区名字 的取值很多，且新数据中经常出现训练时没有见过的小区，可以选择：
+- "onehot"：按训练集中出现过的小区编号，未见过的小区整行为 0；
+- "hash"：用 MurmurHash3 映射到固定数量的桶中，列数与数据量无关，不需要保存词表。
+
+用法：
+    python beijing_features.py                # 对比稠密和稀疏两种方式的内存和训练耗时
+    python beijing_features.py --scales 1 10 100
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+NUMERIC_COLUMNS = ["公交", "写字楼", "医院", "商场", "地铁", "学校", "建造时间", "面积"]
+CATEGORICAL_COLUMNS = ["小区名字", "房型", "楼层"]
+TARGET_COLUMN = "每平米价格"
+
+# 与原页面相同的平方项和交互项
+DERIVED_FEATURES = {
+    "建造时间平方": ("建造时间", "建造时间"),
+    "面积平方": ("面积", "面积"),
+    "公交_写字楼": ("公交", "写字楼"),
+    "医院_地铁": ("医院", "地铁"),
+    "商场_学校": ("商场", "学校"),
+}
+
+
+class BeijingFeatureEncoder:
+    """把北京房价数据转换为 CSR 稀疏特征矩阵，接口与 scikit-learn 的转换器相同。"""
+
+    def __init__(self, community_encoding: str = "onehot", hash_buckets: int = 4096):
+        """
+        :param community_encoding: 小区名字 的编码方式，"onehot" 或 "hash"
+        :param hash_buckets: "hash" 方式的桶数
+        """
+        if community_encoding not in ("onehot", "hash"):
+            raise ValueError(f"Unsupported community encoding: {community_encoding}")
+        self.community_encoding = community_encoding
+        self.hash_buckets = hash_buckets
+
+    @staticmethod
+    def numeric_features(frame: pd.DataFrame) -> np.ndarray:
+        """数值特征及其平方项和交互项，形状为 (n, 数值特征数)。"""
+        values = {
+            column: pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64)
+            for column in NUMERIC_COLUMNS
+        }
+        derived = [values[left] * values[right] for left, right in DERIVED_FEATURES.values()]
+        return np.column_stack(list(values.values()) + derived)
+
+    def fit(self, frame: pd.DataFrame, y=None) -> "BeijingFeatureEncoder":
+        numeric = self.numeric_features(frame)
+        self.mean_ = np.nanmean(numeric, axis=0)
+        scale = np.nanstd(numeric, axis=0)
+        # 常数列（例如数据中的 商场 全为 0）不缩放
+        self.scale_ = np.where(scale > 0, scale, 1.0)
+
+        # 每个类别特征：取值 -> 列下标（从数值特征之后开始连续编号）
+        self.vocabularies_: Dict[str, Dict[str, int]] = {}
+        offset = numeric.shape[1]
+        for column in CATEGORICAL_COLUMNS:
+            if column == "小区名字" and self.community_encoding == "hash":
+                self.hash_offset_ = offset
+                offset += self.hash_buckets
+                continue
+            categories = pd.unique(frame[column].astype(str))
+            self.vocabularies_[column] = {
+                category: offset + index for index, category in enumerate(categories)
+            }
+            offset += len(categories)
+        self.n_features_ = offset
+        return self
+
+    def _category_columns(self, frame: pd.DataFrame, column: str) -> np.ndarray:
+        """每行在该类别特征上的列下标，未见过的取值为 -1。"""
+        values = frame[column].astype(str)
+        if column == "小区名字" and self.community_encoding == "hash":
+            from sklearn.utils import murmurhash3_32
+
+            buckets = np.fromiter(
+                (murmurhash3_32(value, positive=True) for value in values),
+                dtype=np.int64,
+                count=len(values),
+            )
+            return self.hash_offset_ + buckets % self.hash_buckets
+        mapped = values.map(self.vocabularies_[column])
+        return mapped.to_numpy(dtype=np.float64, na_value=-1).astype(np.int64)
+
+    def transform(self, frame: pd.DataFrame) -> sparse.csr_matrix:
+        """
+        :param frame: 包含 NUMERIC_COLUMNS 和 CATEGORICAL_COLUMNS 的 DataFrame
+        :return: 形状为 (len(frame), n_features_) 的 float64 CSR 矩阵
+        """
+        numeric = (self.numeric_features(frame) - self.mean_) / self.scale_
+        # 缺失的数值按均值处理，即标准化后为 0
+        numeric = np.nan_to_num(numeric, nan=0.0)
+        n_rows, n_numeric = numeric.shape
+
+        categories = np.column_stack(
+            [self._category_columns(frame, column) for column in CATEGORICAL_COLUMNS]
+        )
+        known = categories >= 0
+
+        # 直接构造 CSR 的三个数组：每行先是数值特征，再是已知的类别列
+        row_lengths = n_numeric + known.sum(axis=1)
+        indptr = np.concatenate([[0], np.cumsum(row_lengths)])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.empty(indptr[-1], dtype=np.float64)
+        numeric_positions = indptr[:-1, None] + np.arange(n_numeric)
+        indices[numeric_positions] = np.arange(n_numeric)
+        data[numeric_positions] = numeric
+        category_positions = indptr[:-1, None] + n_numeric + np.cumsum(known, axis=1) - 1
+        indices[category_positions[known]] = categories[known]
+        data[category_positions[known]] = 1.0
+        return sparse.csr_matrix((data, indices, indptr), shape=(n_rows, self.n_features_))
+
+    def fit_transform(self, frame: pd.DataFrame, y=None) -> sparse.csr_matrix:
+        return self.fit(frame).transform(frame)
+
+    @property
+    def feature_names(self) -> List[str]:
+        names = NUMERIC_COLUMNS + list(DERIVED_FEATURES)
+        for column in CATEGORICAL_COLUMNS:
+            if column == "小区名字" and self.community_encoding == "hash":
+                names += [f"小区名字_hash{bucket}" for bucket in range(self.hash_buckets)]
+            else:
+                names += [f"{column}_{category}" for category in self.vocabularies_[column]]
+        return names
+
+
+def make_beijing_model(
+    community_encoding: str = "onehot", hash_buckets: int = 4096, alpha: float = 0.01
+):
+    """稀疏特征 + 支持稀疏输入的岭回归（共轭梯度求解）。"""
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+
+    return make_pipeline(
+        BeijingFeatureEncoder(community_encoding, hash_buckets),
+        Ridge(alpha=alpha, solver="sparse_cg"),
+    )
+
+
+def dense_features(data: pd.DataFrame) -> pd.DataFrame:
+    """原页面的特征工程（稠密 get_dummies），仅用于对比。"""
+    data = pd.get_dummies(data, columns=CATEGORICAL_COLUMNS, drop_first=True)
+    data["建造时间"] = pd.to_numeric(data["建造时间"], errors="coerce")
+    data = data.dropna()
+    for name, (left, right) in DERIVED_FEATURES.items():
+        data[name] = data[left] * data[right]
+    return data
+
+
+def synthetic_rows(data: pd.DataFrame, scale: int, seed: int = 0) -> pd.DataFrame:
+    """
+    按 scale 倍放大数据集，用于测试扩展性。
+
+    行从原数据中有放回地抽取；小区名字 加上编号后缀，使小区数量也随之增加，
+    模拟更大范围的真实数据；数值列加入少量扰动。
+    """
+    if scale == 1:
+        return data
+    rng = np.random.default_rng(seed)
+    sample = data.iloc[rng.integers(len(data), size=len(data) * scale)].reset_index(drop=True)
+    sample["小区名字"] = sample["小区名字"] + "_" + (
+        rng.integers(scale, size=len(sample)).astype(str)
+    )
+    for column in ("面积", TARGET_COLUMN):
+        sample[column] = (sample[column] * rng.uniform(0.95, 1.05, len(sample))).round()
+    return sample
+
+
+# 基准测试：原页面的稠密 get_dummies + LinearRegression 与稀疏特征 + Ridge 的对比
+if __name__ == "__main__":
+    import argparse
+    import time
+    import tracemalloc
+
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_absolute_error
+    from sklearn.model_selection import train_test_split
+
+    parser = argparse.ArgumentParser(description="对比北京房价的稠密和稀疏特征")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument(
+        "--dense-limit-mb", type=float, default=1024, help="稠密矩阵超过该大小时跳过稠密方式"
+    )
+    args = parser.parse_args()
+
+    def measure(func) -> Dict[str, float]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        mae = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {"seconds": elapsed, "peak_mb": peak / 1e6, "mae": mae}
+
+    def dense(frame: pd.DataFrame) -> Optional[float]:
+        features = dense_features(frame)
+        X = features.drop(TARGET_COLUMN, axis=1)
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, features[TARGET_COLUMN], test_size=0.2, random_state=42
+        )
+        model = LinearRegression().fit(X_train, y_train)
+        return mean_absolute_error(y_test, model.predict(X_test))
+
+    def sparse_path(frame: pd.DataFrame, encoding: str) -> float:
+        train, test = train_test_split(frame, test_size=0.2, random_state=42)
+        model = make_beijing_model(encoding).fit(train, train[TARGET_COLUMN])
+        return mean_absolute_error(test[TARGET_COLUMN], model.predict(test))
+
+    data = pd.read_csv("data/challenge-1-beijing.csv")
+    for scale in args.scales:
+        frame = synthetic_rows(data, scale)
+        n_columns = len(NUMERIC_COLUMNS) + len(DERIVED_FEATURES) + sum(
+            frame[column].nunique() for column in CATEGORICAL_COLUMNS
+        )
+        dense_mb = len(frame) * n_columns * 8 / 1e6
+        encoder = BeijingFeatureEncoder().fit(frame)
+        X = encoder.transform(frame)
+        sparse_mb = (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6
+        print(
+            f"\n{scale}x：{len(frame)} 行，约 {n_columns} 列；"
+            f"float64 稠密矩阵 {dense_mb:.1f} MB，CSR {sparse_mb:.1f} MB"
+        )
+        runs = {
+            "稀疏 onehot + Ridge": lambda: sparse_path(frame, "onehot"),
+            "稀疏 hash + Ridge": lambda: sparse_path(frame, "hash"),
+        }
+        if dense_mb <= args.dense_limit_mb:
+            runs = {"稠密 get_dummies + LinearRegression": lambda: dense(frame), **runs}
+        else:
+            print(f"  稠密 get_dummies + LinearRegression：需要约 {dense_mb / 1e3:.1f} GB，跳过")
+        for label, func in runs.items():
+            result = measure(func)
+            print(
+                f"  {label}：特征工程和训练 {result['seconds']:.2f} 秒，"
+                f"Python 分配峰值 {result['peak_mb']:.0f} MB，测试集 MAE {result['mae']:.0f}"
+            )
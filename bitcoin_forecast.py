@@ -0,0 +1,336 @@
+"""
+比特币价格的时间序列预测。
+
+随机划分训练集和测试集会让模型看到“未来”的数据，这里改为按时间顺序前推回测（walk-forward）：
+每天只用之前的数据预测当天价格，再把当天的真实值加入模型。
+模型是带截距的线性回归，用递推最小二乘（RLS）增量更新：加入一行只需 O(特征数²) 的运算，
+不必重新训练；滚动窗口模式下同时移除窗口外最旧的一行，移除在数值上不稳定时改为用窗口内的数据重新求解。
+价格接近随机游走，回测中模型的误差并不低于朴素预测（前一天的价格），页面同时显示两者。
+
+特征都只依赖前一天及更早的数据：价格的滞后值、滚动均值和标准差，以及其他指标的前一天值。
+
+用法：
+    python bitcoin_forecast.py   # 回测误差，以及每加入一行的更新耗时与重新训练的对比
+"""
+
+from collections import deque
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+TARGET_COLUMN = "btc_market_price"
+DATE_COLUMN = "Date"
+
+DEFAULT_LAGS = (1, 2, 3, 7)
+DEFAULT_WINDOWS = (7, 30)
+DEFAULT_EXOGENOUS = ("btc_total_bitcoins", "btc_transaction_fees")
+
+# downdate 的分母 1 - xᵀPx 低于该值时认为移除这一行在数值上不稳定
+DOWNDATE_TOLERANCE = 1e-8
+
+
+def make_features(
+    data: pd.DataFrame,
+    lags: Sequence[int] = DEFAULT_LAGS,
+    windows: Sequence[int] = DEFAULT_WINDOWS,
+    exogenous: Sequence[str] = DEFAULT_EXOGENOUS,
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    向量化地生成滞后和滚动窗口特征。
+
+    :param data: 按日期排序的数据
+    :return: (特征, 目标价格)，去掉了历史不足、特征不完整的前几行
+    """
+    price = data[TARGET_COLUMN]
+    past = price.shift(1)
+    columns = {f"lag_{lag}": price.shift(lag) for lag in lags}
+    for window in windows:
+        rolling = past.rolling(window)
+        columns[f"mean_{window}"] = rolling.mean()
+        columns[f"std_{window}"] = rolling.std()
+    for column in exogenous:
+        columns[f"{column}_lag_1"] = data[column].shift(1)
+    features = pd.DataFrame(columns, index=data.index)
+    valid = features.notna().all(axis=1)
+    return features[valid], price[valid]
+
+
+class RecursiveLeastSquares:
+    """
+    带截距的递推最小二乘。
+
+    维护 P = (XᵀX + I / delta)⁻¹ 和权重 w，加入或移除一行都是一次秩 1 更新（Sherman-Morrison）。
+    forgetting < 1 时旧数据的权重按天指数衰减，此时不能再移除行。
+    特征按 fit 时的均值和标准差标准化，之后保持不变，避免价格等大数量级的列使 P 的递推失去精度。
+    """
+
+    def __init__(self, n_features: int, forgetting: float = 1.0, delta: float = 1e6):
+        """
+        :param n_features: 特征数（不含截距）
+        :param forgetting: 遗忘因子，1 表示所有数据权重相同
+        :param delta: P 的初始值 delta * I，越大初始的正则化越弱
+        """
+        self.forgetting = forgetting
+        self.delta = delta
+        self.P = np.eye(n_features + 1) * delta
+        self.w = np.zeros(n_features + 1)
+        self.mean = np.zeros(n_features)
+        self.scale = np.ones(n_features)
+        self.n_samples = 0
+
+    def _with_intercept(self, X: np.ndarray) -> np.ndarray:
+        X = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        return np.concatenate([X, np.ones(X.shape[:-1] + (1,))], axis=-1)
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "RecursiveLeastSquares":
+        """用一批数据直接求解初始状态，结果与逐行 update 相同，但只需一次矩阵求逆。"""
+        X = np.asarray(X, dtype=np.float64)
+        self.mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        self.scale = np.where(scale > 0, scale, 1.0)
+        X1 = self._with_intercept(X)
+        y = np.asarray(y, dtype=np.float64)
+        weights = self.forgetting ** np.arange(len(X1) - 1, -1, -1)
+        A = (X1 * weights[:, None]).T @ X1 + np.eye(X1.shape[1]) / self.delta
+        self.P = np.linalg.inv(A)
+        self.w = self.P @ (X1.T @ (weights * y))
+        self.n_samples = len(X1)
+        return self
+
+    def update(self, x: np.ndarray, y: float) -> float:
+        """
+        加入一行。
+
+        :return: 加入前对这一行的预测误差（y - 预测值）
+        """
+        x1 = self._with_intercept(x)
+        Px = self.P @ x1
+        gain = Px / (self.forgetting + x1 @ Px)
+        error = y - self.w @ x1
+        self.w += gain * error
+        self.P = (self.P - np.outer(gain, Px)) / self.forgetting
+        # 舍入误差会使 P 逐渐不对称，对称化的开销同样是 O(特征数²)
+        self.P = (self.P + self.P.T) / 2
+        self.n_samples += 1
+        return error
+
+    def downdate(self, x: np.ndarray, y: float) -> None:
+        """
+        移除之前加入的一行，用于滚动窗口。
+
+        分母 1 - xᵀPx 在精确计算时总为正，舍入误差累积后可能接近 0 甚至为负，
+        此时抛出 np.linalg.LinAlgError 且不修改状态，调用方应改用剩余的数据调用 fit。
+        """
+        if self.forgetting != 1.0:
+            raise ValueError("Rows cannot be removed when forgetting < 1.")
+        x1 = self._with_intercept(x)
+        Px = self.P @ x1
+        denominator = 1.0 - x1 @ Px
+        if not denominator > DOWNDATE_TOLERANCE:
+            raise np.linalg.LinAlgError(
+                f"Removing the row is numerically unstable (1 - xᵀPx = {denominator:.3g})."
+            )
+        error = y - self.w @ x1
+        self.P = self.P + np.outer(Px, Px) / denominator
+        self.P = (self.P + self.P.T) / 2
+        self.w -= Px * error / denominator
+        self.n_samples -= 1
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self._with_intercept(X) @ self.w
+
+
+def backtest(
+    data: pd.DataFrame,
+    initial: int = 365,
+    window: Optional[int] = None,
+    forgetting: float = 1.0,
+    **feature_params,
+) -> pd.DataFrame:
+    """
+    前推回测：先用前 initial 行训练，之后每天预测当天价格，再用当天的真实值更新模型。
+
+    :param initial: 初始训练的行数（去掉历史不足的行之后）
+    :param window: 滚动窗口的行数，None 表示扩展窗口（使用全部历史）
+    :param forgetting: RLS 的遗忘因子，只能在扩展窗口模式下小于 1
+    :return: 每个预测日的日期、真实值、预测值和朴素预测（前一天的价格）
+    """
+    features, target = make_features(data, **feature_params)
+    X, y = features.to_numpy(dtype=np.float64), target.to_numpy(dtype=np.float64)
+    if window is not None and window > initial:
+        raise ValueError("The rolling window cannot be longer than the initial training set.")
+    if window and forgetting != 1.0:
+        raise ValueError("A rolling window cannot be combined with forgetting < 1.")
+
+    start = initial - window if window else 0
+    model = RecursiveLeastSquares(X.shape[1], forgetting).fit(X[start:initial], y[start:initial])
+    predictions = np.empty(len(X) - initial)
+    for t in range(initial, len(X)):
+        predictions[t - initial] = y[t] - model.update(X[t], y[t])
+        if window:
+            try:
+                model.downdate(X[t - window], y[t - window])
+            except np.linalg.LinAlgError:
+                rows = slice(t - window + 1, t + 1)
+                model = RecursiveLeastSquares(X.shape[1]).fit(X[rows], y[rows])
+
+    return pd.DataFrame(
+        {
+            "日期": data.loc[target.index[initial:], DATE_COLUMN].to_numpy(),
+            "真实值": y[initial:],
+            "预测值": predictions,
+            "朴素预测": features["lag_1"].to_numpy()[initial:]
+            if "lag_1" in features
+            else np.nan,
+        }
+    )
+
+
+def backtest_metrics(results: pd.DataFrame) -> Dict[str, float]:
+    """回测的 MAE、RMSE、MAPE（忽略价格为 0 的日子），以及朴素预测的 MAE 作为参照。"""
+    actual, predicted = results["真实值"], results["预测值"]
+    errors = actual - predicted
+    nonzero = actual != 0
+    return {
+        "mae": float(errors.abs().mean()),
+        "rmse": float(np.sqrt((errors**2).mean())),
+        "mape": float((errors[nonzero] / actual[nonzero]).abs().mean() * 100),
+        "naive_mae": float((actual - results["朴素预测"]).abs().mean()),
+    }
+
+
+class BitcoinForecaster:
+    """
+    可以逐行追加新数据的预测器。
+
+    只保留计算特征所需的最近几天的价格和最近一天的其他指标，
+    追加一行时用 NumPy 直接计算这一行的特征，再对 RLS 做一次秩 1 更新。
+    """
+
+    def __init__(
+        self,
+        lags: Sequence[int] = DEFAULT_LAGS,
+        windows: Sequence[int] = DEFAULT_WINDOWS,
+        exogenous: Sequence[str] = DEFAULT_EXOGENOUS,
+        window: Optional[int] = None,
+        forgetting: float = 1.0,
+    ):
+        """
+        :param window: 滚动窗口的行数，None 表示使用全部历史
+        :param forgetting: RLS 的遗忘因子，只能在 window 为 None 时小于 1
+        """
+        if window and forgetting != 1.0:
+            raise ValueError("A rolling window cannot be combined with forgetting < 1.")
+        self.lags = tuple(lags)
+        self.windows = tuple(windows)
+        self.exogenous = tuple(exogenous)
+        self.window = window
+        self.forgetting = forgetting
+        self.lookback = max(self.lags + tuple(window + 1 for window in self.windows))
+
+    def fit(self, data: pd.DataFrame) -> "BitcoinForecaster":
+        features, target = make_features(data, self.lags, self.windows, self.exogenous)
+        X, y = features.to_numpy(dtype=np.float64), target.to_numpy(dtype=np.float64)
+        if self.window:
+            X, y = X[-self.window :], y[-self.window :]
+        self.model = RecursiveLeastSquares(X.shape[1], self.forgetting).fit(X, y)
+        # 滚动窗口中的行，追加新行时移除最旧的一行
+        self.recent = deque(zip(X, y)) if self.window else None
+        self.prices = deque(data[TARGET_COLUMN].to_numpy()[-self.lookback :], self.lookback)
+        self.last_exogenous = data[list(self.exogenous)].to_numpy()[-1].astype(np.float64)
+        self.last_date = data[DATE_COLUMN].iloc[-1]
+        return self
+
+    def _next_features(self) -> np.ndarray:
+        """下一天的特征，与 make_features 的列顺序相同。"""
+        prices = np.asarray(self.prices)
+        values = [prices[-lag] for lag in self.lags]
+        for window in self.windows:
+            recent = prices[-window:]
+            values += [recent.mean(), recent.std(ddof=1)]
+        return np.concatenate([values, self.last_exogenous])
+
+    def forecast(self) -> Tuple[pd.Timestamp, float]:
+        """预测下一天的价格，返回 (日期, 价格)。"""
+        price = float(self.model.predict(self._next_features()[None, :])[0])
+        return self.last_date + pd.Timedelta(days=1), price
+
+    def append(self, row: Dict) -> float:
+        """
+        追加一天的数据并更新模型。
+
+        :param row: 包含 Date、btc_market_price 和 exogenous 各列的一行
+        :return: 加入前对这一天价格的预测值
+        """
+        x = self._next_features()
+        y = float(row[TARGET_COLUMN])
+        prediction = y - self.model.update(x, y)
+        if self.window:
+            self.recent.append((x, y))
+            try:
+                self.model.downdate(*self.recent.popleft())
+            except np.linalg.LinAlgError:
+                X, y_recent = map(np.array, zip(*self.recent))
+                self.model = RecursiveLeastSquares(X.shape[1]).fit(X, y_recent)
+        self.prices.append(y)
+        self.last_exogenous = np.array([row[column] for column in self.exogenous], dtype=np.float64)
+        self.last_date = pd.Timestamp(row[DATE_COLUMN])
+        return prediction
+
+
+# 基准测试：回测误差，以及追加一行时 RLS 更新与重新训练 LinearRegression 的耗时
+if __name__ == "__main__":
+    import time
+
+    from sklearn.linear_model import LinearRegression
+
+    data = pd.read_csv("data/challenge-2-bitcoin.csv", parse_dates=[DATE_COLUMN])
+
+    # 向量化特征与逐行计算的特征一致
+    features, target = make_features(data)
+    forecaster = BitcoinForecaster().fit(data.iloc[:1000])
+    for index in range(1000, 1100):
+        assert np.allclose(forecaster._next_features(), features.loc[index].to_numpy())
+        forecaster.append(data.iloc[index])
+
+    # RLS 逐行更新后的权重与一次性最小二乘的解一致（相对误差）
+    X, y = features.to_numpy(), target.to_numpy()
+    rls = RecursiveLeastSquares(X.shape[1]).fit(X[:500], y[:500])
+    for t in range(500, len(X)):
+        rls.update(X[t], y[t])
+    for t in range(0, 200):
+        rls.downdate(X[t], y[t])
+    reference = LinearRegression().fit(X[200:], y[200:])
+    assert np.allclose(rls.predict(X), reference.predict(X), rtol=1e-4, atol=1e-2)
+
+    for label, params in (
+        ("扩展窗口", {}),
+        ("滚动窗口 365 天", {"window": 365}),
+        ("遗忘因子 0.99", {"forgetting": 0.99}),
+    ):
+        metrics = backtest_metrics(backtest(data, **params))
+        print(
+            f"{label}：MAE {metrics['mae']:.1f}，RMSE {metrics['rmse']:.1f}，"
+            f"MAPE {metrics['mape']:.2f}%（朴素预测 MAE {metrics['naive_mae']:.1f}）"
+        )
+
+    rows = [data.iloc[index] for index in range(len(data) - 300, len(data))]
+    for label, params in (("扩展窗口", {}), ("滚动窗口 365 天", {"window": 365})):
+        forecaster = BitcoinForecaster(**params).fit(data.iloc[: len(data) - 300])
+        start = time.perf_counter()
+        for row in rows:
+            forecaster.append(row)
+        append = (time.perf_counter() - start) / len(rows) * 1e6
+        print(f"{label} 追加一行（含特征计算）：{append:.0f} µs")
+
+    start = time.perf_counter()
+    for t in range(len(X) - 100, len(X)):
+        LinearRegression().fit(X[:t], y[:t])
+    refit = (time.perf_counter() - start) / 100 * 1e6
+    start = time.perf_counter()
+    for t in range(len(X) - 100, len(X)):
+        rls.update(X[t], y[t])
+    update = (time.perf_counter() - start) / 100 * 1e6
+    print(f"每加入一行：RLS 更新 {update:.0f} µs，重新训练 LinearRegression {refit:.0f} µs")
+    print(f"下一天 {forecaster.forecast()[0]:%Y-%m-%d} 的预测价格：{forecaster.forecast()[1]:.2f}")
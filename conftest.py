@@ -0,0 +1 @@
+# 仓库根目录的 conftest.py 使 pytest 把根目录加入 sys.path，tests 下的测试可以直接导入顶层模块
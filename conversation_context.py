@@ -0,0 +1,224 @@
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+# 每条消息在角色、分隔符等格式上的额外开销
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "请将下面的对话压缩成一段简洁的中文摘要，保留用户的需求、已给出的结论和重要细节，"
+    "不超过 {max_chars} 字，不要有任何前缀。\n\n"
+    "{previous}"
+    "对话内容：\n{transcript}"
+)
+
+# 摘要失败后等待这么多秒再重试，连续失败时翻倍，最多等待 SUMMARY_MAX_BACKOFF 秒
+SUMMARY_RETRY_BACKOFF = 5.0
+SUMMARY_MAX_BACKOFF = 300.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估计文本的 token 数：中文字符和全角标点约 1 个 token，其余字符约 4 个字符 1 个 token。
+
+    :param text: 文本
+    :return: 估计的 token 数
+    """
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+# 摘要提示词模板本身的估计 token 数
+_SUMMARY_PROMPT_TOKENS = estimate_tokens(SUMMARY_PROMPT)
+
+
+def estimate_message_tokens(message: Dict) -> int:
+    """估计单条消息的 token 数，包括格式开销。"""
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def make_summarizer(
+    generate: Callable[[List[Dict]], Iterable[str]], max_chars: int = 500
+) -> Callable[[Optional[str], List[Dict]], str]:
+    """
+    基于任意流式生成函数构造摘要函数。
+
+    :param generate: 接收消息列表、逐步产出回答的函数，例如 hunyuan_generator 的偏函数
+    :param max_chars: 摘要的最大字数
+    :return: summarize(previous_summary, messages) -> 新的摘要
+    """
+
+    def summarize(previous: Optional[str], messages: List[Dict]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = SUMMARY_PROMPT.format(
+            max_chars=max_chars,
+            previous=f"此前的摘要：\n{previous}\n\n" if previous else "",
+            transcript=transcript,
+        )
+        summary = "".join(generate([{"role": "user", "content": prompt}]))
+        if summary.startswith("Error:"):
+            raise RuntimeError(summary)
+        return summary
+
+    return summarize
+
+
+class ConversationContext:
+    """
+    聊天上下文管理：增量估计每条消息的 token 数，按模型的上下文预算截取最近的对话，
+    被截掉的早期对话在后台线程中压缩为摘要，并以 system 消息的形式放在最前面。
+
+    messages 与页面用于显示的历史记录是同一个列表，页面直接向其中追加消息即可。
+    """
+
+    def __init__(
+        self,
+        messages: Optional[List[Dict]] = None,
+        summarizer: Optional[Callable[[Optional[str], List[Dict]], str]] = None,
+    ):
+        """
+        :param messages: 完整的聊天历史记录
+        :param summarizer: 摘要函数，为 None 时只截断不摘要
+        """
+        self.messages: List[Dict] = messages if messages is not None else []
+        self.summarizer = summarizer
+        self.summary: Optional[str] = None
+        self.turn_metrics: List[Dict[str, int]] = []
+        self._tokens: List[int] = []
+        self._summary_tokens = 0
+        self._summarized_upto = 0  # messages[:_summarized_upto] 已包含在摘要中
+        self._summarizing = False
+        self._summary_failures = 0
+        self._retry_at = 0.0  # 摘要失败后，time.monotonic() 到达该值之前不再重试
+        self._generation = 0  # clear() 后丢弃尚未完成的摘要
+        self._lock = threading.Lock()
+
+    def _sync_locked(self) -> None:
+        # 只估计新追加的消息，已估计过的消息不再重复计算
+        for message in self.messages[len(self._tokens) :]:
+            self._tokens.append(estimate_message_tokens(message))
+
+    @property
+    def history_tokens(self) -> int:
+        """完整历史记录的估计 token 数。"""
+        with self._lock:
+            self._sync_locked()
+            return sum(self._tokens)
+
+    def build_messages(self, budget: int, reserve: int = 1024) -> List[Dict]:
+        """
+        在预算内构造本轮发送给模型的消息列表。
+
+        :param budget: 模型的输入上下文长度（tokens）
+        :param reserve: 为模型回答预留的 tokens
+        :return: 发送给模型的消息列表，第一条非摘要消息总是用户消息
+        """
+        available = max(budget - reserve, 0)
+        with self._lock:
+            self._sync_locked()
+            used = self._summary_tokens if self.summary else 0
+            start = len(self.messages)
+            while (
+                start > self._summarized_upto
+                and used + self._tokens[start - 1] <= available
+            ):
+                start -= 1
+                used += self._tokens[start]
+            # 即使超出预算，也至少发送最新的一条消息
+            if start == len(self.messages) and self.messages:
+                start -= 1
+                used += self._tokens[start]
+            # 部分模型要求对话从用户消息开始
+            while start < len(self.messages) - 1 and self.messages[start]["role"] != "user":
+                used -= self._tokens[start]
+                start += 1
+
+            prompt = []
+            if self.summary:
+                prompt.append(
+                    {"role": "system", "content": f"以下是此前对话的摘要：\n{self.summary}"}
+                )
+            prompt.extend(self.messages[start:])
+
+            if start > self._summarized_upto and self.summarizer is not None:
+                self._schedule_summary_locked(start, available)
+
+            self.turn_metrics.append(
+                {
+                    "prompt_tokens": used,
+                    "history_tokens": sum(self._tokens),
+                    "messages_sent": len(self.messages) - start,
+                    "messages_dropped": start,
+                    "messages_summarized": self._summarized_upto,
+                }
+            )
+            return prompt
+
+    def _next_chunk_locked(self, upto: int, budget: int) -> int:
+        """
+        从 _summarized_upto 开始、连同此前的摘要和提示词模板不超过 budget 的一段消息。
+
+        :return: 这段消息的结束位置，至少包含一条消息
+        """
+        used = _SUMMARY_PROMPT_TOKENS + (self._summary_tokens if self.summary else 0)
+        end = self._summarized_upto + 1
+        used += self._tokens[end - 1]
+        while end < upto and used + self._tokens[end] <= budget:
+            used += self._tokens[end]
+            end += 1
+        return end
+
+    def _schedule_summary_locked(self, upto: int, budget: int) -> None:
+        if self._summarizing or time.monotonic() < self._retry_at:
+            return
+        self._summarizing = True
+        generation = self._generation
+
+        def worker():
+            # 逐段摘要，每段的摘要提示词都不超过 budget，直到 messages[:upto] 都包含在摘要中
+            while True:
+                with self._lock:
+                    if generation != self._generation or self._summarized_upto >= upto:
+                        self._summarizing = False
+                        return
+                    previous = self.summary
+                    end = self._next_chunk_locked(upto, budget)
+                    pending = self.messages[self._summarized_upto : end]
+                try:
+                    summary = self.summarizer(previous, pending)
+                except Exception:
+                    summary = None
+                with self._lock:
+                    if generation != self._generation:
+                        self._summarizing = False
+                        return
+                    if not summary:
+                        self._summary_failures += 1
+                        self._retry_at = time.monotonic() + min(
+                            SUMMARY_RETRY_BACKOFF * 2 ** (self._summary_failures - 1),
+                            SUMMARY_MAX_BACKOFF,
+                        )
+                        self._summarizing = False
+                        return
+                    self._summary_failures = 0
+                    self.summary = summary
+                    self._summary_tokens = estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+                    self._summarized_upto = end
+
+        threading.Thread(target=worker, name="conversation-summary", daemon=True).start()
+
+    def clear(self) -> None:
+        """清空历史记录、摘要和统计。"""
+        with self._lock:
+            self.messages.clear()
+            self.summary = None
+            self.turn_metrics.clear()
+            self._tokens.clear()
+            self._summary_tokens = 0
+            self._summarized_upto = 0
+            self._summary_failures = 0
+            self._retry_at = 0.0
+            self._generation += 1
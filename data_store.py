@@ -0,0 +1,220 @@
+"""
+data 目录中 CSV 数据集的列式缓存。
+
+页面首次加载时要解析整个 CSV 文本（比特币数据还要解析日期），之后 st.cache_data
+每次命中都要把 DataFrame 反序列化一遍。这里在首次加载时按 DATASETS 中声明的类型读取 CSV，
+转换为 Arrow IPC 文件（即未压缩的 Feather v2）保存到 cache/data，之后以内存映射方式读取：
+数值列直接引用映射的文件页，不需要解析，也不占用进程的堆内存。
+
+类型都显式声明：蘑菇的各项属性和北京房价的 房型 为 category，比特币的 Date 为 datetime64。
+缓存文件名包含 CSV 内容的哈希和类型声明的哈希，CSV 或类型变化后自动重新转换。
+
+用法：
+    python data_store.py convert     # 转换所有数据集
+    python data_store.py benchmark   # 对比 CSV、pickle（st.cache_data 命中时）和 Arrow 的加载耗时和内存
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import tempfile
+from typing import Dict, List, NamedTuple
+
+import pandas as pd
+import pyarrow as pa
+
+from training_cache import file_digest
+
+DATA_DIR = "data"
+DATA_CACHE_DIR = os.getenv("DATA_CACHE_DIR", "cache/data")
+
+MUSHROOM_COLUMNS = [
+    "class", "cap-shape", "cap-surface", "cap-color", "bruises", "odor",
+    "gill-attachment", "gill-spacing", "gill-size", "gill-color", "stalk-shape",
+    "stalk-root", "stalk-surface-above-ring", "stalk-surface-below-ring",
+    "stalk-color-above-ring", "stalk-color-below-ring", "veil-type", "veil-color",
+    "ring-number", "ring-type", "spore-print-color", "population", "habitat",
+]  # fmt: skip
+
+BITCOIN_COLUMNS = [
+    "btc_market_price", "btc_total_bitcoins", "btc_market_cap", "btc_trade_volume",
+    "btc_blocks_size", "btc_avg_block_size", "btc_n_orphaned_blocks",
+    "btc_n_transactions_per_block", "btc_median_confirmation_time", "btc_hash_rate",
+    "btc_difficulty", "btc_miners_revenue", "btc_transaction_fees",
+    "btc_cost_per_transaction_percent", "btc_cost_per_transaction", "btc_n_unique_addresses",
+    "btc_n_transactions", "btc_n_transactions_total", "btc_n_transactions_excluding_popular",
+    "btc_n_transactions_excluding_chains_longer_than_100", "btc_output_volume",
+    "btc_estimated_transaction_volume", "btc_estimated_transaction_volume_usd",
+]  # fmt: skip
+
+
+class DatasetSpec(NamedTuple):
+    filename: str
+    dtypes: Dict[str, str]
+    parse_dates: List[str] = []
+    # 蘑菇数据中 "?" 等取值是有意义的代码，不能当作缺失值
+    keep_default_na: bool = True
+
+
+DATASETS: Dict[str, DatasetSpec] = {
+    "boston": DatasetSpec(
+        "course-5-boston.csv",
+        {
+            **dict.fromkeys(
+                ["crim", "zn", "indus", "nox", "rm", "age", "dis", "ptratio", "black", "lstat"],
+                "float64",
+            ),
+            **dict.fromkeys(["chas", "rad", "tax"], "int64"),
+            "medv": "float64",
+        },
+    ),
+    "beijing": DatasetSpec(
+        "challenge-1-beijing.csv",
+        {
+            **dict.fromkeys(
+                ["公交", "写字楼", "医院", "商场", "地铁", "学校", "建造时间", "楼层", "面积"], "int64"
+            ),
+            # 小区名字 的取值几乎每行都不同，且 synthetic_rows 会拼接后缀，保留为字符串
+            "小区名字": "object",
+            "房型": "category",
+            "每平米价格": "int64",
+        },
+    ),
+    "bitcoin": DatasetSpec(
+        "challenge-2-bitcoin.csv", dict.fromkeys(BITCOIN_COLUMNS, "float64"), ["Date"]
+    ),
+    "vaccine": DatasetSpec("course-6-vaccine.csv", {"Year": "int64", "Values": "float64"}),
+    "mushrooms": DatasetSpec(
+        "mushrooms.csv", dict.fromkeys(MUSHROOM_COLUMNS, "category"), keep_default_na=False
+    ),
+    "mushrooms_test": DatasetSpec(
+        "mushrooms_test.csv", dict.fromkeys(MUSHROOM_COLUMNS, "category"), keep_default_na=False
+    ),
+}
+
+
+def source_path(name: str) -> str:
+    return os.path.join(DATA_DIR, DATASETS[name].filename)
+
+
+def cache_path(name: str, directory: str = DATA_CACHE_DIR) -> str:
+    """数据集当前版本的 Arrow 文件路径，文件名包含 CSV 内容和类型声明的哈希。"""
+    hasher = hashlib.blake2b(digest_size=8)
+    hasher.update(file_digest(source_path(name)).encode())
+    hasher.update(repr(DATASETS[name]).encode())
+    return os.path.join(directory, f"{name}-{hasher.hexdigest()}.arrow")
+
+
+def read_csv(name: str) -> pd.DataFrame:
+    """按声明的类型从 CSV 读取数据集。"""
+    spec = DATASETS[name]
+    return pd.read_csv(
+        source_path(name),
+        dtype=spec.dtypes,
+        parse_dates=spec.parse_dates,
+        keep_default_na=spec.keep_default_na,
+    )
+
+
+def convert(name: str, directory: str = DATA_CACHE_DIR) -> str:
+    """
+    把数据集转换为 Arrow IPC 文件，已是最新时直接返回路径。
+
+    :return: Arrow 文件的路径
+    """
+    path = cache_path(name, directory)
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    table = pa.Table.from_pandas(read_csv(name), preserve_index=False)
+    # 先写入临时文件再替换，其他会话不会读到写了一半的文件
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(temp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    # 删除旧版本；Windows 上仍被映射的文件无法删除，留到下次转换
+    for stale in glob.glob(os.path.join(directory, f"{name}-*.arrow")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+
+def load_dataset(name: str, memory_map: bool = True) -> pd.DataFrame:
+    """
+    加载数据集，首次加载或 CSV 变化后先转换为 Arrow 文件。
+
+    :param name: DATASETS 中的名称
+    :param memory_map: 是否以内存映射方式读取，否则把文件完整读入内存
+    :return: 列类型与 DATASETS 中声明的相同的 DataFrame
+    """
+    try:
+        path = convert(name)
+    except OSError:
+        # 缓存目录不可写时直接读取 CSV
+        return read_csv(name)
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks 使每列单独成块，数值列不必为合并成二维块而复制
+    return table.to_pandas(split_blocks=True)
+
+
+# 基准测试：每个数据集用三种方式获取 DataFrame 的耗时和内存
+if __name__ == "__main__":
+    import pickle
+    import time
+    import tracemalloc
+
+    parser = argparse.ArgumentParser(description="数据集的列式缓存")
+    parser.add_argument("command", nargs="?", choices=["convert", "benchmark"], default="benchmark")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        for name in DATASETS:
+            path = convert(name)
+            print(f"{name}: {source_path(name)} -> {path}（{os.path.getsize(path) / 1e3:.0f} KB）")
+        raise SystemExit
+
+    def measure(func, rounds: int = 20) -> float:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        return (time.perf_counter() - start) / rounds * 1000
+
+    def allocated_bytes(func) -> int:
+        """func() 的返回值占用的新分配内存（Python/NumPy 堆和 Arrow 内存池），不含映射的文件页。"""
+        tracemalloc.start()
+        arrow_before = pa.total_allocated_bytes()
+        result = func()  # noqa: F841  保持引用，测量的是返回值仍存在时的内存
+        heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return heap + max(pa.total_allocated_bytes() - arrow_before, 0)
+
+    for name in DATASETS:
+        # 原页面的读取方式：不指定类型，比特币数据解析日期
+        def original(name=name):
+            return pd.read_csv(source_path(name), parse_dates=DATASETS[name].parse_dates)
+
+        frame = load_dataset(name)
+        pickled = pickle.dumps(read_csv(name))
+        pd.testing.assert_frame_equal(frame, read_csv(name))
+
+        csv_ms = measure(original)
+        pickle_ms = measure(lambda: pickle.loads(pickled))
+        arrow_ms = measure(lambda: load_dataset(name))
+        print(
+            f"{name}（{len(frame)} 行）：CSV {csv_ms:.2f} ms，pickle {pickle_ms:.2f} ms，"
+            f"Arrow 内存映射 {arrow_ms:.2f} ms；"
+            f"内存 CSV {allocated_bytes(original) / 1e3:.0f} KB，"
+            f"pickle {allocated_bytes(lambda: pickle.loads(pickled)) / 1e3:.0f} KB，"
+            f"Arrow {allocated_bytes(lambda: load_dataset(name)) / 1e3:.0f} KB"
+            f"（映射的文件 {os.path.getsize(cache_path(name)) / 1e3:.0f} KB）"
+        )
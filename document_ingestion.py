@@ -0,0 +1,165 @@
+import codecs
+import io
+import os
+import zipfile
+from typing import BinaryIO, Iterator
+from xml.etree import ElementTree
+
+# 按顺序尝试的编码，前缀样本能完整解码即认为匹配
+CANDIDATE_ENCODINGS = ("utf-8", "gbk")
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    根据文件开头的样本判断文本编码。
+
+    样本末尾可能截断了一个多字节字符，因此使用增量解码器且不要求解码完整。
+
+    :param sample: 文件开头的字节
+    :return: 编码名称
+    :raises UnicodeDecodeError: 样本无法以任何候选编码解码
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError as err:
+            last_error = err
+    raise last_error
+
+
+def iter_text(
+    file: BinaryIO, sample_size: int = 64 * 1024, block_size: int = 256 * 1024
+) -> Iterator[str]:
+    """
+    逐块读取并解码文本文件。
+
+    只用开头的样本检测一次编码，之后按块增量解码，不会同时持有整份字节和整份文本。
+
+    :param file: 以二进制方式打开的文件或上传的文件对象
+    :param sample_size: 用于检测编码的样本字节数
+    :param block_size: 每次读取的字节数
+    :yield: 解码后的文本块
+    :raises UnicodeDecodeError: 文件不是 UTF-8、GBK 或带 BOM 的 UTF-16 编码
+    """
+    file.seek(0)
+    sample = file.read(sample_size)
+    decoder = codecs.getincrementaldecoder(detect_encoding(sample))()
+
+    block = sample
+    while block:
+        text = decoder.decode(block)
+        if text:
+            yield text
+        block = file.read(block_size)
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def iter_docx_paragraphs(file: BinaryIO) -> Iterator[str]:
+    """
+    逐段读取 .docx 文件的文本。
+
+    直接从压缩包中流式解析 word/document.xml，每处理完一个段落即从树中移除其节点，
+    不会像 python-docx 那样先构建整篇文档的对象树。表格中的段落也会被读取。
+
+    :param file: 以二进制方式打开的文件或上传的文件对象
+    :yield: 每个段落的文本
+    """
+    file.seek(0)
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as xml:
+        parts = []
+        # 从根节点到当前节点的路径，用于找到已处理节点的父节点
+        path = []
+        for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                path.append(elem)
+                continue
+            path.pop()
+            tag = elem.tag
+            if tag == _W + "t":
+                parts.append(elem.text or "")
+            elif tag == _W + "tab":
+                parts.append("\t")
+            elif tag in (_W + "br", _W + "cr"):
+                parts.append("\n")
+            elif tag == _W + "p":
+                yield "".join(parts)
+                parts = []
+            # 段落以及 body 的直接子节点（表格等）处理完后从父节点中移除，
+            # 根节点不再引用已解析的部分，内存只与单个段落或表格的大小有关
+            if path and (tag == _W + "p" or path[-1].tag == _W + "body"):
+                path[-1].remove(elem)
+
+
+class UnsupportedFormatError(ValueError):
+    """上传的文件不是 .txt、.md 或 .docx。"""
+
+
+def iter_document(file: BinaryIO, name: str) -> Iterator[str]:
+    """
+    按文件类型逐段读取上传的文档。
+
+    :param file: 以二进制方式打开的文件或上传的文件对象
+    :param name: 文件名，用于判断类型
+    :yield: 文本片段，拼接后即为完整文档
+    :raises UnsupportedFormatError: 不支持的文件格式
+    """
+    extension = os.path.splitext(name)[1].lower()
+    if extension in (".txt", ".md"):
+        yield from iter_text(file)
+    elif extension == ".docx":
+        for paragraph in iter_docx_paragraphs(file):
+            yield paragraph + "\n"
+    else:
+        raise UnsupportedFormatError(f"Unsupported file type: {extension}")
+
+
+# 基准测试：对比一次性读取与流式读取的吞吐量和峰值内存
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    from document_retrieval import iter_chunks, split_into_chunks
+
+    sentence = "混元大模型支持长文档问答，Streamlit 负责界面展示。\n".encode("gbk")
+
+    def read_all(file: BinaryIO) -> int:
+        # 原页面的做法：整体读取、解码，再整篇切分
+        data = file.read()
+        try:
+            article = data.decode("utf-8")
+        except UnicodeDecodeError:
+            article = data.decode("gbk")
+        return len(split_into_chunks(article))
+
+    def read_streaming(file: BinaryIO) -> int:
+        return sum(1 for _ in iter_chunks(iter_document(file, "a.txt")))
+
+    print(f"{'大小':>6} {'方式':>6} {'耗时(s)':>8} {'MB/s':>7} {'峰值内存(MB)':>12} {'片段数':>7}")
+    for size_mb in (1, 10, 50):
+        data = sentence * (size_mb * 1024 * 1024 // len(sentence))
+        for label, func in (("一次性", read_all), ("流式", read_streaming)):
+            file = io.BytesIO(data)
+            tracemalloc.start()
+            start = time.perf_counter()
+            num_chunks = func(file)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{size_mb:>4}MB {label:>6} {elapsed:>8.2f} {len(data) / 2**20 / elapsed:>7.1f} "
+                f"{peak / 2**20:>12.1f} {num_chunks:>7}"
+            )
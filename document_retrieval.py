@@ -0,0 +1,305 @@
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# 优先在这些位置切分，避免把一句话拆到两个片段中
+SEPARATORS = ("\n", "。", "！", "？", "；", ".", "!", "?", ";")
+
+_WORD_RE = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+def _find_cut(buffer: str, start: int, chunk_size: int) -> int:
+    """在 buffer[start:start + chunk_size] 的后半段中寻找最靠后的分隔符。"""
+    lower = start + chunk_size // 2
+    upper = start + chunk_size
+    best = max(buffer.rfind(sep, lower, upper) for sep in SEPARATORS)
+    return best + 1 if best >= 0 else upper
+
+
+def iter_chunks(
+    pieces: Iterable[str], chunk_size: int = 500, overlap: int = 100
+) -> Iterator[str]:
+    """
+    将逐段到达的文本切分为有重叠的片段。
+
+    输入可以是整篇文档，也可以是逐段读取的段落，切分结果相同，
+    因此可以边读取文档边建立索引。
+
+    :param pieces: 文本片段的可迭代对象
+    :param chunk_size: 每个片段的最大字符数
+    :param overlap: 相邻片段之间重叠的字符数，必须小于 chunk_size 的一半
+    :yield: 切分后的片段
+    """
+    if not 0 <= overlap < chunk_size // 2:
+        raise ValueError("overlap must be non-negative and less than chunk_size // 2.")
+
+    buffer = ""
+    start = 0
+    carried = 0  # buffer[start:start + carried] 已包含在上一个片段中
+    for piece in pieces:
+        # 上一轮剩余的内容不超过 chunk_size，拼接的开销与新片段长度成正比
+        buffer = buffer[start:] + piece
+        start = 0
+        while len(buffer) - start >= chunk_size:
+            end = _find_cut(buffer, start, chunk_size)
+            chunk = buffer[start:end]
+            if chunk.strip():
+                yield chunk
+            start = end - overlap
+            carried = overlap
+
+    tail = buffer[start:]
+    if len(tail) > carried and tail[carried:].strip():
+        yield tail
+
+
+def split_into_chunks(text: str, chunk_size: int = 500, overlap: int = 100) -> List[str]:
+    """将整篇文档切分为有重叠的片段。"""
+    return list(iter_chunks([text], chunk_size, overlap))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    简单的中英文混合分词：英文和数字按单词切分，中文取单字和相邻两字。
+
+    :param text: 待分词的文本
+    :return: 词项列表
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word[0].isascii():
+            tokens.append(word)
+        else:
+            tokens.extend(word)
+            tokens.extend(word[i : i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class BM25Index:
+    """支持增量添加片段的 BM25 词法索引。"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._total_length = 0
+        self._idf: Optional[Dict[str, float]] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, text: str) -> int:
+        """
+        添加一个片段。
+
+        :return: 片段的编号
+        """
+        doc_id = len(self.doc_lengths)
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        self.doc_lengths.append(length)
+        self._total_length += length
+        for term, tf in counts.items():
+            self.postings[term].append((doc_id, tf))
+        self._idf = None
+        return doc_id
+
+    def _ensure_idf(self) -> Dict[str, float]:
+        if self._idf is None:
+            n = len(self.doc_lengths)
+            self._idf = {
+                term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for term, docs in self.postings.items()
+            }
+        return self._idf
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """
+        检索与查询最相关的片段。
+
+        :param query: 查询文本
+        :param k: 返回的片段数量
+        :return: [(片段编号, 得分)]，按得分从高到低排列
+        """
+        if not self.doc_lengths:
+            return []
+        idf = self._ensure_idf()
+        avgdl = self._total_length / len(self.doc_lengths) or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            term_idf = idf.get(term)
+            if term_idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avgdl)
+                scores[doc_id] += term_idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+class DocumentIndex:
+    """
+    文档片段索引：默认只使用 BM25，提供 embed_fn 时再结合向量检索。
+
+    向量在第一次检索时才计算，两路结果使用倒数排名融合（RRF）合并。
+    计算向量需要调用外部接口，期间不持有索引的锁：其他会话正在计算向量或接口出错时，
+    本次检索只使用 BM25，错误记录在 embedding_error 中。
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[str] = (),
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    ):
+        """
+        :param chunks: 初始片段
+        :param embed_fn: 将文本列表转换为向量列表的函数，例如 hunyuan_api.get_embeddings
+        """
+        self.chunks: List[str] = []
+        self.bm25 = BM25Index()
+        self.embed_fn = embed_fn
+        self._embeddings: Optional[np.ndarray] = None
+        self.embedding_error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        self._embedding_lock = threading.Lock()
+        for chunk in chunks:
+            self.add(chunk)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def num_chars(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def add(self, chunk: str) -> None:
+        """添加一个片段。"""
+        with self._lock:
+            self.chunks.append(chunk)
+            self.bm25.add(chunk)
+            self._embeddings = None
+
+    def _ensure_embeddings(self) -> Optional[np.ndarray]:
+        """返回片段的向量矩阵，其他线程正在计算时返回 None。"""
+        with self._lock:
+            if self._embeddings is not None:
+                return self._embeddings
+        if not self._embedding_lock.acquire(blocking=False):
+            return None
+        try:
+            with self._lock:
+                chunks = list(self.chunks)
+                if self._embeddings is not None:
+                    return self._embeddings
+            matrix = np.asarray(self.embed_fn(chunks), dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+            with self._lock:
+                # 计算期间添加了新片段时不保存，下次检索重新计算
+                if len(self.chunks) == len(chunks):
+                    self._embeddings = matrix
+            return matrix
+        finally:
+            self._embedding_lock.release()
+
+    def _embedding_ranking(self, query: str, k: int) -> Optional[List[int]]:
+        """向量检索的排名，向量不可用时返回 None。"""
+        try:
+            embeddings = self._ensure_embeddings()
+            if embeddings is None:
+                return None
+            query_vector = np.asarray(self.embed_fn([query])[0], dtype=np.float32)
+        except Exception as err:  # embed_fn 可能抛出任意网络或接口错误
+            self.embedding_error = err
+            return None
+        self.embedding_error = None
+        scores = embeddings @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+    def search(self, query: str, k: int = 4, rrf_k: int = 60) -> List[str]:
+        """
+        检索与问题相关的片段。
+
+        :param query: 问题
+        :param k: 返回的片段数量
+        :param rrf_k: 倒数排名融合的平滑常数
+        :return: 相关片段，按其在文档中的顺序排列
+        """
+        with self._lock:
+            if not self.chunks:
+                return []
+            candidates = max(k * 4, 20)
+            rankings = [[doc_id for doc_id, _ in self.bm25.search(query, candidates)]]
+            # 片段只会追加，编号不变；向量检索在锁外进行
+            chunks = list(self.chunks)
+        if self.embed_fn is not None:
+            ranking = self._embedding_ranking(query, candidates)
+            if ranking is not None:
+                rankings.append(ranking)
+
+        fused: Dict[int, float] = defaultdict(float)
+        for ranking in rankings:
+            for rank, doc_id in enumerate(ranking):
+                fused[doc_id] += 1.0 / (rrf_k + rank + 1)
+        if not fused:
+            # 没有任何词项命中时，退回到文档开头的片段
+            top = range(min(k, len(chunks)))
+        else:
+            top = heapq.nlargest(k, fused, key=fused.get)
+        return [chunks[doc_id] for doc_id in sorted(top)]
+
+
+def build_prompt(chunks: List[str], question: str) -> str:
+    """将检索到的片段和问题拼接为发送给模型的用户消息。"""
+    context = "\n\n---\n\n".join(chunks)
+    return f"下面是文档中与问题相关的片段:\n\n{context}\n\n{question}"
+
+
+# 基准测试：文档长度与检索延迟、提示词大小的关系
+if __name__ == "__main__":
+    import random
+
+    random.seed(0)
+    vocabulary = [
+        "混元", "模型", "文档", "检索", "片段", "问答", "延迟", "缓存", "索引",
+        "数据", "训练", "推理", "用户", "服务", "网络", "性能", "内存", "并发",
+    ]
+
+    def make_document(num_chars: int) -> str:
+        sentences = []
+        total = 0
+        while total < num_chars:
+            sentence = "".join(random.choices(vocabulary, k=random.randint(5, 15))) + "。"
+            if random.random() < 0.2:
+                sentence += "\n"
+            sentences.append(sentence)
+            total += len(sentence)
+        return "".join(sentences)
+
+    question = "混元模型的推理延迟和缓存有什么关系？"
+    print(f"{'文档字符数':>10} {'片段数':>6} {'建索引(ms)':>10} {'检索(ms)':>9} {'全文提示词':>10} {'检索提示词':>10}")
+    for num_chars in (10_000, 100_000, 1_000_000, 5_000_000):
+        article = make_document(num_chars)
+
+        start = time.perf_counter()
+        index = DocumentIndex(iter_chunks([article]))
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for _ in range(10):
+            chunks = index.search(question, k=4)
+        search_ms = (time.perf_counter() - start) * 1000 / 10
+
+        full_prompt = f"下面是一个文档:\n\n{article}\n\n{question}"
+        retrieved_prompt = build_prompt(chunks, question)
+        print(
+            f"{len(article):>10} {len(index):>6} {build_ms:>10.1f} {search_ms:>9.2f} "
+            f"{len(full_prompt):>10} {len(retrieved_prompt):>10}"
+        )
@@ -0,0 +1,158 @@
+"""
+评估手写识别模型各精度版本的准确率、模型大小、加载时间和单张推理延迟。
+
+准确率基于 data/images 中的数字示例图片（仅数字模型）和一个留出集：
+数字模型使用 MNIST 测试集，字母模型使用 data/emnist_data 中的 EMNIST letters 测试集；
+无法获取时（例如离线环境）改用与校准数据不同随机种子渲染的字形。
+
+用法：
+    python model_variants.py            # 先生成量化版本
+    python evaluate_model_variants.py --holdout-size 2000
+"""
+
+import argparse
+import gzip
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from handwriting_models import VARIANTS, Recognizer, TFLiteRecognizer, variant_path
+from latency_stats import percentile
+from model_variants import (
+    DIGIT_LABELS,
+    SAMPLE_IMAGE_DIR,
+    VARIANT_MODELS,
+    load_sample_digits,
+    render_glyphs,
+)
+
+EMNIST_DIR = "data/emnist_data"
+
+
+def load_emnist_letters(
+    directory: str = EMNIST_DIR,
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """读取 EMNIST letters 测试集（与 手写英文字母数字.ipynb 相同的文件），不存在时返回 None。"""
+    images_path = os.path.join(directory, "emnist-letters-test-images-idx3-ubyte.gz")
+    labels_path = os.path.join(directory, "emnist-letters-test-labels-idx1-ubyte.gz")
+    if not (os.path.exists(images_path) and os.path.exists(labels_path)):
+        return None
+    with gzip.open(labels_path, "rb") as labels_file:
+        labels = np.frombuffer(labels_file.read(), dtype=np.uint8, offset=8)
+    with gzip.open(images_path, "rb") as images_file:
+        images = np.frombuffer(images_file.read(), dtype=np.uint8, offset=16)
+    # EMNIST 的图片按列存储，转置为正常方向（推理函数会按模型配置再转置回去）；类别从 1 开始
+    images = images.reshape(-1, 28, 28).transpose(0, 2, 1).astype(np.float32) / 255
+    return images, labels.astype(np.int64) - 1
+
+
+def load_mnist_test() -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """读取 MNIST 测试集（首次使用需要下载），失败时返回 None。"""
+    import tensorflow as tf
+
+    try:
+        _, (images, labels) = tf.keras.datasets.mnist.load_data()
+    except Exception:
+        return None
+    return images.astype(np.float32) / 255, labels.astype(np.int64)
+
+
+def load_holdout(labels: List[str], size: int) -> Tuple[str, np.ndarray, np.ndarray]:
+    """
+    :return: (数据集名称, 图片, 类别下标)，最多 size 张
+    """
+    dataset = load_mnist_test() if labels == DIGIT_LABELS else load_emnist_letters()
+    name = "MNIST 测试集" if labels == DIGIT_LABELS else "EMNIST letters 测试集"
+    if dataset is None:
+        name = "渲染字形"
+        dataset = render_glyphs(labels, per_label=max(1, size // len(labels)), seed=1)
+    images, targets = dataset
+    return name, images[:size], targets[:size]
+
+
+def evaluate(
+    recognizer, images: np.ndarray, targets: np.ndarray, batch_size: int = 256
+) -> Tuple[float, np.ndarray]:
+    """
+    :return: (准确率, 每张图片的预测类别下标)
+    """
+    predictions = np.concatenate(
+        [
+            recognizer.predict_proba(images[start : start + batch_size]).argmax(axis=1)
+            for start in range(0, len(images), batch_size)
+        ]
+    )
+    return float((predictions == targets).mean()), predictions
+
+
+def measure_latency(recognizer, image: np.ndarray, rounds: int = 200) -> Dict[str, float]:
+    """单张图片推理延迟（毫秒）。"""
+    recognizer.predict_proba(image)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        recognizer.predict_proba(image)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50": percentile(timings, 50), "p95": percentile(timings, 95)}
+
+
+def load_variant(model_path: str, spec: Dict, variant: str):
+    """加载模型并完成一次推理，返回 (推理函数, 加载耗时)。"""
+    import tensorflow as tf
+
+    labels, transpose = spec["labels"], spec.get("transpose", False)
+    start = time.perf_counter()
+    if variant == "float32":
+        model = tf.keras.models.load_model(model_path, compile=False)
+        recognizer = Recognizer(model, labels, transpose)
+    else:
+        recognizer = TFLiteRecognizer(variant_path(model_path, variant), labels, transpose)
+    recognizer.predict_proba(np.zeros((1, 28, 28), dtype=np.float32))
+    return recognizer, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="评估手写识别模型的各精度版本")
+    parser.add_argument(
+        "models", nargs="*", default=list(VARIANT_MODELS), help="Keras 模型路径"
+    )
+    parser.add_argument("--holdout-size", type=int, default=2000, help="留出集样本数")
+    parser.add_argument("--rounds", type=int, default=200, help="延迟测试的推理次数")
+    args = parser.parse_args()
+
+    for model_path in args.models:
+        spec = VARIANT_MODELS.get(model_path, {"labels": DIGIT_LABELS})
+        labels = spec["labels"]
+        holdout_name, holdout_images, holdout_targets = load_holdout(
+            labels, args.holdout_size
+        )
+        samples = (
+            load_sample_digits()
+            if labels == DIGIT_LABELS and os.path.isdir(SAMPLE_IMAGE_DIR)
+            else None
+        )
+        print(f"\n{model_path}（留出集：{holdout_name}，{len(holdout_images)} 张）")
+
+        reference = None
+        for variant in VARIANTS:
+            path = variant_path(model_path, variant)
+            if not os.path.exists(path):
+                print(f"  {variant:>7}: 未找到 {path}，请先运行 python model_variants.py")
+                continue
+            recognizer, load_seconds = load_variant(model_path, spec, variant)
+            accuracy, predictions = evaluate(recognizer, holdout_images, holdout_targets)
+            if reference is None:
+                reference = predictions
+            latency = measure_latency(recognizer, holdout_images[:1], args.rounds)
+            columns = [
+                f"{os.path.getsize(path) / 1024:6.0f} KB",
+                f"加载 {load_seconds * 1000:6.0f} ms",
+                f"延迟 p50 {latency['p50']:.3f} ms / p95 {latency['p95']:.3f} ms",
+            ]
+            if samples is not None:
+                columns.append(f"示例图片 {evaluate(recognizer, *samples)[0]:.0%}")
+            columns.append(f"留出集 {accuracy:.2%}")
+            columns.append(f"与 float32 一致 {(predictions == reference).mean():.2%}")
+            print(f"  {variant:>7}: " + "，".join(columns))
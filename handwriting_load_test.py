@@ -0,0 +1,85 @@
+"""
+手写识别压力测试：模拟 N 个并发用户，对比逐个推理与批量推理的吞吐量和延迟。
+
+用法：
+    python handwriting_load_test.py --users 32 --requests 50 --model digit
+    python handwriting_load_test.py --users 32 --max-batch-size 16 --max-wait-ms 2
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from handwriting_models import MODEL_SPECS, MicroBatcher, get_model_server
+from latency_stats import percentile
+
+
+def simulate_users(
+    predict: Callable[[np.ndarray], object], users: int, requests_per_user: int
+) -> Dict[str, float]:
+    """
+    每个用户在独立线程中依次发送请求，上一个请求返回后才发送下一个。
+
+    :param predict: 识别单张 (28, 28) 图片的函数
+    :param users: 并发用户数
+    :param requests_per_user: 每个用户发送的请求数
+    :return: 吞吐量（次/秒）和 p50/p95/p99 延迟（毫秒）
+    """
+    rng = np.random.default_rng(0)
+    images = rng.random((users, 28, 28), dtype=np.float32)
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def user(index: int) -> None:
+        own = []
+        for _ in range(requests_per_user):
+            start = time.perf_counter()
+            predict(images[index])
+            own.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(own)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        list(executor.map(user, range(users)))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="手写识别压力测试")
+    parser.add_argument("--model", default="digit", choices=list(MODEL_SPECS))
+    parser.add_argument("--users", type=int, default=32, help="并发用户数")
+    parser.add_argument("--requests", type=int, default=50, help="每个用户的请求数")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="每批最多请求数")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="等待凑批的最长时间（毫秒）")
+    args = parser.parse_args()
+
+    recognizer = get_model_server().get(args.model)
+    batcher = MicroBatcher(recognizer, args.max_batch_size, args.max_wait_ms / 1000)
+
+    for label, predict in (
+        ("逐个推理", recognizer.predict_proba),
+        ("批量推理", batcher.predict_proba),
+    ):
+        stats = simulate_users(predict, args.users, args.requests)
+        print(
+            f"{label}: {stats['throughput']:.0f} 次/秒，p50 {stats['p50']:.2f} ms，"
+            f"p95 {stats['p95']:.2f} ms，p99 {stats['p99']:.2f} ms"
+        )
+
+    metrics = batcher.metrics()
+    print(
+        f"共 {metrics['batches']} 批，平均批大小 {metrics['mean_batch_size']:.1f}，"
+        f"填充率 {metrics['fill_rate']:.0%}，排队延迟 p50 {metrics['queue_p50_ms']:.2f} ms，"
+        f"p95 {metrics['queue_p95_ms']:.2f} ms"
+    )
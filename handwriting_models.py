@@ -0,0 +1,449 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from latency_stats import percentile
+
+# 手写识别页面使用的模型，labels 为模型输出下标对应的类别。
+# 字母模型直接用 EMNIST 的原始数组训练，而 EMNIST 按列存储图片，
+# 因此输入需要先转置（transpose）才与训练数据的方向一致。
+MODEL_SPECS = {
+    "digit": {
+        "path": "models/DigitSense_model_improved.keras",
+        "labels": [str(i) for i in range(10)],
+    },
+    "letter": {
+        "path": "models/CNN_MNIST_20240911_epochs_50_batch_size_32.h5",
+        "labels": [chr(65 + i) for i in range(26)],
+        "transpose": True,
+    },
+}
+
+# 模型的精度版本：原始 float32 Keras 模型，以及由 model_variants.py 生成的 TFLite 模型
+VARIANTS = ("float32", "float16", "int8")
+VARIANT_DIR = "models/variants"
+
+
+def variant_path(model_path: str, variant: str) -> str:
+    """返回模型某个精度版本的文件路径，float32 即原始模型。"""
+    if variant == "float32":
+        return model_path
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown model variant: {variant}")
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(VARIANT_DIR, f"{stem}.{variant}.tflite")
+
+
+def _to_model_input(
+    images: np.ndarray, input_shape: Tuple[int, ...], transpose: bool
+) -> np.ndarray:
+    images = np.asarray(images, dtype=np.float32).reshape(-1, 28, 28)
+    if transpose:
+        images = np.ascontiguousarray(images.transpose(0, 2, 1))
+    return images.reshape((-1,) + input_shape)
+
+
+class Recognizer:
+    """
+    固定输入签名的推理函数。
+
+    用 tf.function 直接调用模型，绕过 model.predict 每次调用时创建数据集、回调等开销；
+    输入签名固定为 float32 且批大小可变，因此只追踪一次，之后不会重复追踪。
+    """
+
+    def __init__(self, model, labels: List[str], transpose: bool = False):
+        import tensorflow as tf
+
+        self.model = model
+        self.labels = labels
+        self.transpose = transpose
+        self.input_shape = tuple(model.input_shape[1:])
+        self._infer = tf.function(
+            lambda images: model(images, training=False),
+            input_signature=[tf.TensorSpec((None,) + self.input_shape, tf.float32)],
+        )
+
+    def predict_proba(self, images: np.ndarray) -> np.ndarray:
+        """
+        计算各类别的概率。
+
+        :param images: 形状为 (28, 28) 的单张图片或 (n, 28, 28) 的一批图片，取值 0-1，背景为 0
+        :return: 形状为 (n, 类别数) 的概率
+        """
+        images = _to_model_input(images, self.input_shape, self.transpose)
+        return self._infer(images).numpy()
+
+    def predict_topk(self, image: np.ndarray, k: int = 3) -> List[Tuple[str, float]]:
+        """
+        识别单张图片。
+
+        :param image: 形状为 (28, 28) 的图片
+        :param k: 返回的候选数量
+        :return: [(类别, 概率)]，按概率从高到低排列
+        """
+        probabilities = self.predict_proba(image)[0]
+        top = np.argsort(probabilities)[::-1][:k]
+        return [(self.labels[i], float(probabilities[i])) for i in top]
+
+
+class TFLiteRecognizer:
+    """
+    TFLite 版本的推理函数，接口与 Recognizer 相同。
+
+    解释器不是线程安全的，调用时加锁；批大小变化时重新分配张量。
+    """
+
+    def __init__(self, path: str, labels: List[str], transpose: bool = False):
+        import tensorflow as tf
+
+        self.path = path
+        self.labels = labels
+        self.transpose = transpose
+        self._interpreter = tf.lite.Interpreter(model_path=path)
+        self._input = self._interpreter.get_input_details()[0]
+        self._output_index = self._interpreter.get_output_details()[0]["index"]
+        self.input_shape = tuple(int(dim) for dim in self._input["shape"][1:])
+        self._batch_size = 0
+        self._lock = threading.Lock()
+
+    def predict_proba(self, images: np.ndarray) -> np.ndarray:
+        """同 Recognizer.predict_proba。"""
+        images = _to_model_input(images, self.input_shape, self.transpose)
+        with self._lock:
+            if len(images) != self._batch_size:
+                self._interpreter.resize_tensor_input(
+                    self._input["index"], images.shape
+                )
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(images)
+            self._interpreter.set_tensor(self._input["index"], images)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output_index).copy()
+
+    predict_topk = Recognizer.predict_topk
+
+
+class MicroBatcher:
+    """
+    把多个会话的单张识别请求合并成批量推理。
+
+    请求先进入队列，工作线程取到第一个请求后最多再等待 max_wait 秒收集后续请求，
+    凑满 max_batch_size 或超时即作为一批推理，再把结果分发回各个等待的会话。
+    """
+
+    def __init__(
+        self,
+        recognizer: Union[Recognizer, TFLiteRecognizer],
+        max_batch_size: int = 32, max_wait: float = 0.005
+    ):
+        """
+        :param recognizer: 实际执行推理的 Recognizer
+        :param max_batch_size: 每批最多包含的请求数
+        :param max_wait: 收到第一个请求后等待凑批的最长时间（秒）
+        """
+        self.recognizer = recognizer
+        self.labels = recognizer.labels
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: deque = deque(maxlen=1000)
+        self._queue_latencies: deque = deque(maxlen=1000)
+        self._requests = 0
+        self._batches = 0
+        self._thread = threading.Thread(
+            target=self._run, name="handwriting-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, image: np.ndarray) -> Future:
+        """
+        提交一张图片。
+
+        :param image: 形状为 (28, 28) 的图片
+        :return: 结果为该图片各类别概率的 Future
+        """
+        image = np.asarray(image, dtype=np.float32).reshape(28, 28)
+        future: Future = Future()
+        self._queue.put((image, future, time.perf_counter()))
+        return future
+
+    def predict_proba(
+        self, image: np.ndarray, timeout: Optional[float] = None
+    ) -> np.ndarray:
+        """提交一张图片并等待结果，返回形状为 (类别数,) 的概率。"""
+        return self.submit(image).result(timeout)
+
+    def predict_topk(self, image: np.ndarray, k: int = 3) -> List[Tuple[str, float]]:
+        """与 Recognizer.predict_topk 相同，但经由批量推理。"""
+        probabilities = self.predict_proba(image)
+        top = np.argsort(probabilities)[::-1][:k]
+        return [(self.labels[i], float(probabilities[i])) for i in top]
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future, float]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            # 调用方已取消的请求不再推理；其余请求标记为运行中，之后无法取消，
+            # 否则对已取消的 Future 设置结果会抛出 InvalidStateError 并使工作线程退出
+            batch = [
+                request
+                for request in self._collect()
+                if request[1].set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                probabilities = self.recognizer.predict_proba(
+                    np.stack([image for image, _, _ in batch])
+                )
+            except Exception as err:
+                for _, future, _ in batch:
+                    future.set_exception(err)
+                continue
+            for (_, future, _), row in zip(batch, probabilities):
+                future.set_result(row)
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._batch_sizes.append(len(batch))
+                self._queue_latencies.extend(
+                    started - submitted for _, _, submitted in batch
+                )
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        返回监控用的统计信息，批大小和排队延迟基于最近的请求计算。
+
+        :return: 包含 requests、batches、mean_batch_size、fill_rate（平均批大小 / 批大小上限）、
+                 queue_p50_ms、queue_p95_ms 的字典
+        """
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            latencies = list(self._queue_latencies)
+            requests, batches = self._requests, self._batches
+        mean_size = sum(sizes) / len(sizes) if sizes else 0.0
+        return {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": mean_size,
+            "fill_rate": mean_size / self.max_batch_size,
+            "queue_p50_ms": percentile(latencies, 50) * 1000,
+            "queue_p95_ms": percentile(latencies, 95) * 1000,
+        }
+
+
+class ModelHandle:
+    """单个模型的加载状态。"""
+
+    def __init__(
+        self, name: str, path: str, labels: List[str], transpose: bool = False
+    ):
+        self.name = name
+        self.path = path
+        self.labels = labels
+        self.transpose = transpose
+        self.state = "pending"  # pending -> loading -> ready / failed
+        self.model = None
+        self.recognizer: Optional[Recognizer] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待模型加载结束（成功或失败）。
+
+        :return: 在超时前结束时返回 True
+        """
+        return self._done.wait(timeout)
+
+
+class ModelServer:
+    """
+    在后台线程中加载手写识别模型，并用一次空白输入的推理完成预热（触发图追踪）。
+
+    TensorFlow 只在后台线程中导入，页面脚本不会因此阻塞。
+    """
+
+    def __init__(
+        self,
+        specs: Dict[str, Dict] = MODEL_SPECS,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+    ):
+        """
+        :param specs: 模型配置，格式同 MODEL_SPECS
+        :param max_batch_size: 批量推理时每批最多包含的请求数
+        :param max_wait: 批量推理时等待凑批的最长时间（秒）
+        """
+        self.handles = {
+            name: ModelHandle(
+                name, spec["path"], spec["labels"], spec.get("transpose", False)
+            )
+            for name, spec in specs.items()
+        }
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._variants: Dict[Tuple[str, str], TFLiteRecognizer] = {}
+        self._batchers: Dict[Tuple[str, str], MicroBatcher] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> "ModelServer":
+        """启动后台加载，重复调用不会重复加载。"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._load_all, name="handwriting-models", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def _load_all(self) -> None:
+        for handle in self.handles.values():
+            self._load(handle)
+
+    def _load(self, handle: ModelHandle) -> None:
+        handle.state = "loading"
+        try:
+            import tensorflow as tf
+
+            start = time.perf_counter()
+            model = tf.keras.models.load_model(handle.path, compile=False)
+            handle.load_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            recognizer = Recognizer(model, handle.labels, handle.transpose)
+            recognizer.predict_proba(np.zeros((1, 28, 28), dtype=np.float32))
+            handle.warmup_seconds = time.perf_counter() - start
+
+            handle.model = model
+            handle.recognizer = recognizer
+            handle.state = "ready"
+        except Exception as err:
+            handle.error = str(err)
+            handle.state = "failed"
+        finally:
+            handle._done.set()
+
+    def get(
+        self, name: str, timeout: Optional[float] = None, variant: str = "float32"
+    ) -> Union[Recognizer, TFLiteRecognizer]:
+        """
+        获取已加载模型的推理函数，尚未加载完成时等待。
+
+        :param name: 模型名称，例如 "digit"、"letter"
+        :param timeout: 最长等待时间（秒），None 表示一直等待
+        :param variant: 精度版本，见 VARIANTS；TFLite 版本在首次使用时加载
+        :raises TimeoutError: 超时仍未加载完成
+        :raises RuntimeError: 模型加载失败或该精度版本尚未生成
+        """
+        self.start()
+        handle = self.handles[name]
+        if variant != "float32":
+            return self._get_variant(handle, variant)
+        if not handle.wait(timeout):
+            raise TimeoutError(f"Model {name} is still loading.")
+        if handle.state == "failed":
+            raise RuntimeError(f"Failed to load model {name}: {handle.error}")
+        return handle.recognizer
+
+    def _get_variant(self, handle: ModelHandle, variant: str) -> TFLiteRecognizer:
+        path = variant_path(handle.path, variant)
+        with self._lock:
+            if (handle.name, variant) not in self._variants:
+                if not os.path.exists(path):
+                    raise RuntimeError(
+                        f"Model variant not found: {path}. "
+                        "Run `python model_variants.py` to build it."
+                    )
+                self._variants[handle.name, variant] = TFLiteRecognizer(
+                    path, handle.labels, handle.transpose
+                )
+            return self._variants[handle.name, variant]
+
+    def get_batcher(
+        self, name: str, timeout: Optional[float] = None, variant: str = "float32"
+    ) -> MicroBatcher:
+        """
+        获取模型的批量推理队列，多个会话共享同一个队列。参数和异常同 get。
+        """
+        recognizer = self.get(name, timeout, variant)
+        with self._lock:
+            if (name, variant) not in self._batchers:
+                self._batchers[name, variant] = MicroBatcher(
+                    recognizer, self.max_batch_size, self.max_wait
+                )
+            return self._batchers[name, variant]
+
+    def status(self) -> Dict[str, Dict]:
+        """返回各模型的加载状态、加载耗时和预热耗时。"""
+        return {
+            name: {
+                "state": handle.state,
+                "load_seconds": handle.load_seconds,
+                "warmup_seconds": handle.warmup_seconds,
+                "error": handle.error,
+            }
+            for name, handle in self.handles.items()
+        }
+
+
+# 进程级共享的模型服务
+model_server = ModelServer(
+    max_batch_size=int(os.getenv("HANDWRITING_MAX_BATCH_SIZE", "32")),
+    max_wait=float(os.getenv("HANDWRITING_MAX_WAIT_MS", "5")) / 1000,
+)
+
+
+def get_model_server() -> ModelServer:
+    """获取共享的模型服务，并确保后台加载已经开始。"""
+    return model_server.start()
+
+
+# 基准测试：单张图片时 model.predict 与固定签名推理函数的延迟对比
+if __name__ == "__main__":
+    server = get_model_server()
+    rounds = 200
+    for name in MODEL_SPECS:
+        recognizer = server.get(name)
+        image = np.random.rand(1, 28, 28).astype(np.float32)
+        for label, func in (
+            ("model.predict", lambda: recognizer.model.predict(image, verbose=0)),
+            ("Recognizer", lambda: recognizer.predict_proba(image)),
+        ):
+            timings = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(
+                f"{name:>6} {label:>14}: 平均 {sum(timings) / rounds:.2f} ms，"
+                f"p50 {timings[rounds // 2]:.2f} ms，p95 {timings[int(rounds * 0.95)]:.2f} ms"
+            )
@@ -1,4 +1,8 @@
 import streamlit as st
+from handwriting_models import get_model_server
+
+# 应用启动后即在后台加载手写识别模型，用户进入识别页面时无需等待
+get_model_server()
 
 st.set_page_config(
     page_title="你好",
@@ -1,17 +1,168 @@
+import hashlib
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import Dict, Generator
+from typing import Dict, Generator, List, Optional, Tuple
 from tencentcloud.common import credential
 from tencentcloud.common.exception.tencent_cloud_sdk_exception import (
     TencentCloudSDKException,
 )
 from tencentcloud.common.profile.client_profile import ClientProfile
+from tencentcloud.common.profile.http_profile import HttpProfile
 from tencentcloud.hunyuan.v20230901 import hunyuan_client, models
 
 # 加载 .env 文件
 load_dotenv()
 
+DEFAULT_REGION = "ap-guangzhou"
+
+
+class HunyuanClientPool:
+    """
+    进程级的混元客户端注册表。
+
+    按地域和凭据缓存 HunyuanClient，使所有 Streamlit 会话共享已建立的连接，
+    避免每轮对话都重新握手。Streamlit 的每个会话运行在独立线程中，因此所有操作都由锁保护。
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 3,
+        idle_timeout: float = 300.0,
+        endpoint: Optional[str] = None,
+        scheme: str = "https",
+    ):
+        """
+        :param pool_size: 每个客户端预建的连接数（pre_conn_pool_size）
+        :param idle_timeout: 客户端闲置超过该秒数后被淘汰，<= 0 表示永不淘汰
+        :param endpoint: 自定义接入地址，例如本地模拟服务 "127.0.0.1:8765"
+        :param scheme: 请求协议，连接本地模拟服务时使用 "http"
+        """
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.endpoint = endpoint
+        self.scheme = scheme
+        self._clients: Dict[Tuple, list] = {}  # key -> [client, 最近使用时间]
+        self._lock = threading.Lock()
+
+    def _key(self, region: str, secret_id: str, secret_key: str) -> Tuple:
+        # 不在内存中以明文作为键保存密钥
+        digest = hashlib.sha256(f"{secret_id}:{secret_key}".encode("utf-8")).hexdigest()
+        return (region, digest, self.endpoint, self.scheme)
+
+    def _create_client(
+        self, region: str, secret_id: str, secret_key: str
+    ) -> hunyuan_client.HunyuanClient:
+        http_profile = HttpProfile(
+            protocol=self.scheme, endpoint=self.endpoint, keepAlive=True
+        )
+        http_profile.pre_conn_pool_size = self.pool_size
+        cpf = ClientProfile(httpProfile=http_profile)
+        cred = credential.Credential(secret_id, secret_key)
+        return hunyuan_client.HunyuanClient(cred, region, cpf)
+
+    def _evict_idle_locked(self, now: float) -> int:
+        if self.idle_timeout <= 0:
+            return 0
+        expired = [
+            key
+            for key, (_, last_used) in self._clients.items()
+            if now - last_used > self.idle_timeout
+        ]
+        for key in expired:
+            del self._clients[key]
+        return len(expired)
+
+    def get_client(
+        self,
+        region: str = DEFAULT_REGION,
+        secret_id: Optional[str] = None,
+        secret_key: Optional[str] = None,
+    ) -> hunyuan_client.HunyuanClient:
+        """
+        获取（必要时创建）指定地域和凭据对应的共享客户端。
+
+        :param region: 地域，例如 "ap-guangzhou"
+        :param secret_id: SecretId，默认从 .env 文件读取
+        :param secret_key: SecretKey，默认从 .env 文件读取
+        :return: 可在多个线程间复用的 HunyuanClient
+        """
+        secret_id = secret_id or os.getenv("TENCENTCLOUD_SECRET_ID")
+        secret_key = secret_key or os.getenv("TENCENTCLOUD_SECRET_KEY")
+        key = self._key(region, secret_id, secret_key)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle_locked(now)
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = [self._create_client(region, secret_id, secret_key), now]
+                self._clients[key] = entry
+            entry[1] = now
+            return entry[0]
+
+    def invalidate(
+        self,
+        region: str = DEFAULT_REGION,
+        secret_id: Optional[str] = None,
+        secret_key: Optional[str] = None,
+    ) -> None:
+        """丢弃指定的客户端，下次获取时重新建立连接。"""
+        secret_id = secret_id or os.getenv("TENCENTCLOUD_SECRET_ID")
+        secret_key = secret_key or os.getenv("TENCENTCLOUD_SECRET_KEY")
+        with self._lock:
+            self._clients.pop(self._key(region, secret_id, secret_key), None)
+
+    def evict_idle(self) -> int:
+        """
+        淘汰闲置超时的客户端。
+
+        :return: 被淘汰的客户端数量
+        """
+        with self._lock:
+            return self._evict_idle_locked(time.monotonic())
+
+    def health_check(
+        self,
+        region: str = DEFAULT_REGION,
+        secret_id: Optional[str] = None,
+        secret_key: Optional[str] = None,
+    ) -> bool:
+        """
+        使用开销很小的 GetTokenCount 接口检查客户端是否可用，失败时淘汰该客户端。
+
+        :return: 客户端可用时返回 True
+        """
+        client = self.get_client(region, secret_id, secret_key)
+        req = models.GetTokenCountRequest()
+        req.Prompt = "ping"
+        try:
+            client.GetTokenCount(req)
+            return True
+        except TencentCloudSDKException:
+            self.invalidate(region, secret_id, secret_key)
+            return False
+
+    def clear(self) -> None:
+        """清空所有缓存的客户端。"""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+
+# 进程级共享的客户端池，可通过环境变量调整
+client_pool = HunyuanClientPool(
+    pool_size=int(os.getenv("HUNYUAN_POOL_SIZE", "3")),
+    idle_timeout=float(os.getenv("HUNYUAN_IDLE_TIMEOUT", "300")),
+    endpoint=os.getenv("HUNYUAN_ENDPOINT"),
+    scheme=os.getenv("HUNYUAN_SCHEME", "https"),
+)
+
 
 def hunyuan_generator(model_name: str, messages: Dict) -> Generator:
     """
@@ -22,15 +173,8 @@ def hunyuan_generator(model_name: str, messages: Dict) -> Generator:
     :yield: 逐步生成的模型响应内容
     """
     try:
-        # 实例化一个认证对象
-        cred = credential.Credential(
-            os.getenv("TENCENTCLOUD_SECRET_ID"),  # 从 .env 文件读取 secretId
-            os.getenv("TENCENTCLOUD_SECRET_KEY"),  # 从 .env 文件读取 secretKey
-        )
-
-        cpf = ClientProfile()
-        cpf.httpProfile.pre_conn_pool_size = 3
-        client = hunyuan_client.HunyuanClient(cred, "ap-guangzhou", cpf)
+        # 从共享客户端池获取客户端，复用已建立的连接
+        client = client_pool.get_client()
 
         req = models.ChatCompletionsRequest()
         req.Model = model_name
@@ -58,25 +202,74 @@ def hunyuan_generator(model_name: str, messages: Dict) -> Generator:
                 yield choice["Delta"]["Content"]
 
     except TencentCloudSDKException as err:
+        # 连接可能已失效，丢弃客户端以便下次重建
+        client_pool.invalidate()
         yield f"Error: {str(err)}"
 
 
+# get_embeddings 同时发出的请求数；接口每次只接受一段文本，逐个串行请求时长文档要等待数百次往返
+EMBEDDING_CONCURRENCY = int(os.getenv("HUNYUAN_EMBEDDING_CONCURRENCY", "8"))
+
+
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    调用混元 Embedding 接口，将文本转换为向量。
+
+    :param texts: 文本列表
+    :return: 与文本一一对应的向量列表
+    :raises TencentCloudSDKException: 任一请求失败时抛出，同时丢弃客户端以便下次重建
+    """
+    client = client_pool.get_client()
+
+    def embed(text: str) -> List[float]:
+        req = models.GetEmbeddingRequest()
+        req.Input = text
+        return client.GetEmbedding(req).Data[0].Embedding
+
+    try:
+        if len(texts) <= 1:
+            return [embed(text) for text in texts]
+        workers = min(EMBEDDING_CONCURRENCY, len(texts))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(embed, texts))
+    except TencentCloudSDKException:
+        client_pool.invalidate()
+        raise
+
+
+# 各模型可用的输入上下文长度（tokens），可以根据实际情况更新
+MODEL_CONTEXT_LIMITS = {
+    "hunyuan-lite": 4096,
+    "hunyuan-standard": 32768,
+    "hunyuan-standard-256K": 262144,
+    "hunyuan-pro": 32768,
+    "hunyuan-code": 8192,
+    "hunyuan-role": 32768,
+    "hunyuan-functioncall": 32768,
+    "hunyuan-vision": 8192,
+}
+
+# 未在上表中声明的模型使用的保守默认值
+DEFAULT_CONTEXT_LIMIT = 4096
+
+
 def get_available_models() -> list:
     """
     获取可用的混元模型列表。
 
     :return: 可用模型的名称列表
     """
-    return [
-        "hunyuan-lite",
-        "hunyuan-standard",
-        "hunyuan-standard-256K",
-        "hunyuan-pro",
-        "hunyuan-code",
-        "hunyuan-role",
-        "hunyuan-functioncall",
-        "hunyuan-vision",
-    ]  # 可以根据实际可用模型更新此列表
+    return list(MODEL_CONTEXT_LIMITS)  # 可以根据实际可用模型更新 MODEL_CONTEXT_LIMITS
+
+
+def get_context_limit(model_name: str) -> int:
+    """
+    获取模型的输入上下文长度。
+
+    :param model_name: 模型名称
+    :return: 上下文长度（tokens）
+    """
+    return MODEL_CONTEXT_LIMITS.get(model_name, DEFAULT_CONTEXT_LIMIT)
 
 
 # 示例调用
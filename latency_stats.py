@@ -0,0 +1,19 @@
+"""
+延迟统计的公共函数。
+
+批量描述、手写识别的压测和模型对比脚本以及 MicroBatcher 的监控指标都使用这里的百分位数，
+该模块只依赖标准库，导入它不会加载任何接口客户端或模型。
+"""
+
+from typing import Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """线性插值的百分位数，q 取值 0-100，values 为空时返回 0。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
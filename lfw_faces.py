@@ -0,0 +1,394 @@
+"""
+LFW 人脸分类的数据和模型。
+
+fetch_lfw_people 每次调用都要扫描并解码数千张 JPEG，页面每次重新运行时都这样做太慢，
+这里只在首次导出时调用一次，把图片、类别和人名保存为 data/lfw 下的 .npy 文件，
+之后以内存映射方式加载。
+
+提供两种识别引擎：
+- SVM：按 人像分类.ipynb 的方式在标准化后的像素上训练，用 joblib 保存；
+- 特征脸：随机化 PCA 把像素压缩到几百维，训练集的嵌入向量归一化后保存为一个矩阵，
+  预测时一次矩阵乘法得到与所有训练样本的余弦相似度，再由最近的 k 个样本投票。
+
+用法：
+    python lfw_faces.py export      # 下载（或读取 data/lfw_funneled 中已下载的）数据集并导出
+    python lfw_faces.py train       # 训练并保存两种引擎
+    python lfw_faces.py benchmark   # 对比两种引擎的准确率、模型大小和预测延迟
+"""
+
+import argparse
+import json
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+LFW_DATA_HOME = "data/lfw_funneled"
+LFW_DIR = "data/lfw"
+SVM_PATH = "data/svm_clf_model.joblib"
+SCALER_PATH = "data/scaler_model.joblib"
+EIGENFACES_PATH = "data/eigenfaces.npz"
+
+ENGINES = ("SVM", "特征脸 + k-NN")
+
+# 与 人像分类.ipynb 相同的数据集参数
+MIN_FACES_PER_PERSON = 60
+RESIZE = 0.4
+
+# RGB 转灰度的权重，与 PIL 的 "L" 模式相同
+_GRAY_WEIGHTS = np.array([0.2989, 0.5870, 0.1140], dtype=np.float32)
+
+
+class LFWDataset:
+    """与 fetch_lfw_people 返回值相同的 images / data / target / target_names 属性。"""
+
+    def __init__(self, images: np.ndarray, target: np.ndarray, target_names: np.ndarray):
+        self.images = images  # (n, 高, 宽) float32，取值 0-1
+        self.target = target
+        self.target_names = target_names
+
+    @property
+    def data(self) -> np.ndarray:
+        # 展平的视图，不复制内存映射的数组
+        return self.images.reshape(len(self.images), -1)
+
+    @property
+    def image_shape(self) -> Tuple[int, int]:
+        return self.images.shape[1:]
+
+
+def export_dataset(data_home: str = LFW_DATA_HOME, directory: str = LFW_DIR) -> LFWDataset:
+    """调用 fetch_lfw_people 并把结果保存到 directory。"""
+    from sklearn.datasets import fetch_lfw_people
+
+    faces = fetch_lfw_people(
+        data_home=data_home, min_faces_per_person=MIN_FACES_PER_PERSON, resize=RESIZE
+    )
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "images.npy"), faces.images.astype(np.float32))
+    np.save(os.path.join(directory, "target.npy"), faces.target)
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as meta_file:
+        json.dump({"target_names": faces.target_names.tolist()}, meta_file, ensure_ascii=False)
+    return load_dataset(directory)
+
+
+def load_dataset(directory: str = LFW_DIR, mmap: bool = True) -> Optional[LFWDataset]:
+    """
+    加载导出的数据集，尚未导出时返回 None。
+
+    :param mmap: 以只读内存映射方式打开数组，只有实际访问到的图片才会读入内存
+    """
+    meta_path = os.path.join(directory, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as meta_file:
+        meta = json.load(meta_file)
+    mmap_mode = "r" if mmap else None
+    return LFWDataset(
+        np.load(os.path.join(directory, "images.npy"), mmap_mode=mmap_mode),
+        np.load(os.path.join(directory, "target.npy"), mmap_mode=mmap_mode),
+        np.array(meta["target_names"]),
+    )
+
+
+def split_dataset(dataset: LFWDataset):
+    """与 人像分类.ipynb 相同的训练集 / 测试集划分。"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(
+        dataset.data, dataset.target, test_size=0.25, random_state=42
+    )
+
+
+def train_models(
+    dataset: LFWDataset, svm_path: str = SVM_PATH, scaler_path: str = SCALER_PATH
+) -> Dict:
+    """
+    训练 SVM 和标准化器并保存。
+
+    :return: 测试集上的评估结果，包括 accuracy 和 classification_report 的字典形式
+    """
+    import joblib
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+
+    X_train, X_test, y_train, y_test = split_dataset(dataset)
+    scaler = StandardScaler()
+    svm_clf = SVC(kernel="linear", class_weight="balanced", random_state=42)
+    svm_clf.fit(scaler.fit_transform(X_train), y_train)
+    joblib.dump(svm_clf, svm_path)
+    joblib.dump(scaler, scaler_path)
+    return evaluate(svm_predictor(svm_clf, scaler), dataset)
+
+
+def load_models(
+    svm_path: str = SVM_PATH, scaler_path: str = SCALER_PATH
+) -> Optional[Tuple[object, object]]:
+    """加载保存的 (SVM, 标准化器)，尚未训练时返回 None。"""
+    if not (os.path.exists(svm_path) and os.path.exists(scaler_path)):
+        return None
+    import joblib
+
+    return joblib.load(svm_path), joblib.load(scaler_path)
+
+
+def svm_predictor(svm_clf, scaler) -> Callable[[np.ndarray], np.ndarray]:
+    return lambda X: svm_clf.predict(scaler.transform(X))
+
+
+def evaluate(predict: Callable[[np.ndarray], np.ndarray], dataset: LFWDataset) -> Dict:
+    """
+    在测试集上评估。
+
+    :param predict: 输入形状为 (n, n_features) 的像素，返回类别的函数
+    """
+    from sklearn.metrics import accuracy_score, classification_report
+
+    _, X_test, _, y_test = split_dataset(dataset)
+    y_pred = predict(X_test)
+    return {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "report": classification_report(
+            y_test,
+            y_pred,
+            labels=np.arange(len(dataset.target_names)),
+            target_names=dataset.target_names,
+            output_dict=True,
+            zero_division=0,
+        ),
+    }
+
+
+class EigenfaceIndex:
+    """
+    特征脸嵌入和余弦 k 近邻。
+
+    嵌入为白化后的 PCA 投影再做 L2 归一化，两个嵌入的内积就是余弦相似度。
+    """
+
+    def __init__(
+        self,
+        mean: np.ndarray,
+        projection: np.ndarray,
+        embeddings: np.ndarray,
+        targets: np.ndarray,
+        n_classes: int,
+        n_neighbors: int = 5,
+    ):
+        """
+        :param mean: 训练集像素均值，形状为 (n_features,)
+        :param projection: 白化的投影矩阵，形状为 (n_features, n_components)
+        :param embeddings: 训练集归一化后的嵌入，形状为 (n_train, n_components)
+        :param targets: 训练集的类别
+        :param n_classes: 类别数
+        :param n_neighbors: 参与投票的近邻数
+        """
+        self.mean = mean
+        self.projection = projection
+        self.embeddings = embeddings
+        self.targets = targets
+        self.n_neighbors = n_neighbors
+        self.n_classes = n_classes
+
+    @classmethod
+    def fit(
+        cls,
+        X: np.ndarray,
+        y: np.ndarray,
+        n_components: int = 150,
+        n_classes: Optional[int] = None,
+        random_state: int = 42,
+    ) -> "EigenfaceIndex":
+        """用随机化 PCA 求特征脸，并计算训练样本的嵌入。"""
+        from sklearn.decomposition import PCA
+
+        n_components = min(n_components, len(X), X.shape[1])
+        pca = PCA(
+            n_components=n_components,
+            svd_solver="randomized",
+            whiten=True,
+            random_state=random_state,
+        ).fit(X)
+        # 白化合并进投影矩阵：(x - mean) @ projection == pca.transform(x)
+        projection = (pca.components_.T / np.sqrt(pca.explained_variance_)).astype(np.float32)
+        y = np.asarray(y)
+        n_classes = int(y.max()) + 1 if n_classes is None else n_classes
+        index = cls(pca.mean_.astype(np.float32), projection, np.empty(0), y, n_classes)
+        index.embeddings = index.embed(X)
+        return index
+
+    def save(self, path: str = EIGENFACES_PATH) -> None:
+        np.savez(
+            path,
+            mean=self.mean,
+            projection=self.projection,
+            embeddings=self.embeddings,
+            targets=self.targets,
+            n_classes=self.n_classes,
+        )
+
+    @classmethod
+    def load(cls, path: str = EIGENFACES_PATH) -> Optional["EigenfaceIndex"]:
+        """加载保存的索引，尚未训练时返回 None。"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as arrays:
+            return cls(
+                arrays["mean"],
+                arrays["projection"],
+                arrays["embeddings"],
+                arrays["targets"],
+                int(arrays["n_classes"]),
+            )
+
+    def embed(self, X: np.ndarray) -> np.ndarray:
+        """
+        :param X: 形状为 (n, n_features) 的像素
+        :return: 形状为 (n, n_components) 的 float32 单位向量
+        """
+        embedded = (np.asarray(X, dtype=np.float32) - self.mean) @ self.projection
+        norms = np.linalg.norm(embedded, axis=1, keepdims=True)
+        return embedded / np.maximum(norms, 1e-12)
+
+    def scores(self, X: np.ndarray) -> np.ndarray:
+        """
+        每个类别的得分：最相似的 n_neighbors 个训练样本中，属于该类别的相似度之和，
+        再按所有近邻的相似度之和归一化。
+
+        :return: 形状为 (n, n_classes) 的得分，每行之和为 1
+        """
+        similarities = self.embed(X) @ self.embeddings.T
+        k = min(self.n_neighbors, similarities.shape[1])
+        neighbors = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        # 负相似度的近邻不参与投票
+        weights = np.maximum(np.take_along_axis(similarities, neighbors, axis=1), 0)
+        scores = np.zeros((len(similarities), self.n_classes), dtype=np.float32)
+        np.add.at(scores, (np.arange(len(scores))[:, None], self.targets[neighbors]), weights)
+        return scores / np.maximum(scores.sum(axis=1, keepdims=True), 1e-12)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.scores(X).argmax(axis=1)
+
+    def predict_topk(self, features: np.ndarray, k: int = 3) -> List[Tuple[int, float]]:
+        """
+        :param features: 一个样本的像素，形状为 (n_features,)
+        :return: 得分最高的 k 个 (类别, 得分)
+        """
+        scores = self.scores(features[None, :])[0]
+        top = np.argsort(-scores)[:k]
+        return [(int(label), float(scores[label])) for label in top]
+
+
+def train_eigenfaces(
+    dataset: LFWDataset, n_components: int = 150, path: str = EIGENFACES_PATH
+) -> Dict:
+    """在与 SVM 相同的训练集上构建特征脸索引并保存，返回测试集上的评估结果。"""
+    X_train, _, y_train, _ = split_dataset(dataset)
+    index = EigenfaceIndex.fit(X_train, y_train, n_components, len(dataset.target_names))
+    index.save(path)
+    return evaluate(index.predict, dataset)
+
+
+def _image_pixels(image) -> np.ndarray:
+    """把 PIL 图片转为 preprocess_image 支持的数组，其他输入原样转为数组。"""
+    from PIL import Image
+
+    if not isinstance(image, Image.Image):
+        return np.asarray(image)
+    if image.mode.startswith("I"):
+        # 16 位灰度：I;16 系列直接得到 uint16，PNG 也可能以 32 位整数的 "I" 模式打开
+        return np.clip(np.asarray(image), 0, 65535).astype(np.uint16)
+    if image.mode not in ("L", "RGB", "RGBA", "F"):
+        # 调色板（P、PA）、灰度 + 透明度（LA）、二值、CMYK 等模式先转为 RGB
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+def preprocess_image(image, target_shape: Tuple[int, int]) -> np.ndarray:
+    """
+    把上传的图片转换为与数据集相同格式的特征向量。
+
+    先在 float32 中转为灰度再缩放：两步都是线性的，结果与先缩放 RGB 再转灰度相同，
+    但缩放只需处理一个通道。
+
+    :param image: 任意模式的 PIL 图片，或 (高, 宽) 灰度、(高, 宽, 2) 灰度 + 透明度、
+        (高, 宽, 3) RGB、(高, 宽, 4) RGBA 数组；透明度被忽略，
+        uint16 数组按 0-65535、其他整数数组按 0-255、浮点数组按 0-1 解释
+    :param target_shape: 数据集中图片的 (高, 宽)
+    :return: 长度为 高 * 宽 的 float32 向量，取值 0-1
+    """
+    from skimage.transform import resize
+
+    pixels = _image_pixels(image)
+    if pixels.ndim == 3 and pixels.shape[-1] >= 3:
+        gray = pixels[..., :3].astype(np.float32) @ _GRAY_WEIGHTS
+    elif pixels.ndim == 3:
+        gray = pixels[..., 0].astype(np.float32)
+    else:
+        gray = pixels.astype(np.float32)
+    if pixels.dtype.kind == "u" and pixels.dtype.itemsize == 2:
+        gray /= 65535
+    elif np.issubdtype(pixels.dtype, np.integer):
+        gray /= 255
+    resized = resize(gray, target_shape, mode="reflect", anti_aliasing=True)
+    return resized.astype(np.float32, copy=False).ravel()
+
+
+def _benchmark(dataset: LFWDataset, rounds: int = 200) -> None:
+    import pickle
+    import time
+
+    _, X_test, _, y_test = split_dataset(dataset)
+    svm_clf, scaler = load_models()
+    index = EigenfaceIndex.load()
+    engines = {
+        "SVM": (
+            svm_predictor(svm_clf, scaler),
+            len(pickle.dumps(svm_clf)) + len(pickle.dumps(scaler)),
+        ),
+        "特征脸 + k-NN": (
+            index.predict,
+            sum(
+                array.nbytes
+                for array in (index.mean, index.projection, index.embeddings, index.targets)
+            ),
+        ),
+    }
+    for name, (predict, size) in engines.items():
+        start = time.perf_counter()
+        accuracy = (predict(X_test) == y_test).mean()
+        batch = (time.perf_counter() - start) / len(X_test) * 1000
+        timings = []
+        for i in range(rounds):
+            start = time.perf_counter()
+            predict(X_test[i % len(X_test)][None, :])
+            timings.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{name}: 准确率 {accuracy:.2%}，模型 {size / 1024:.0f} KB，"
+            f"单张延迟 p50 {np.median(timings):.3f} ms，整批平均 {batch:.4f} ms/张"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出 LFW 数据集和训练人脸分类模型")
+    parser.add_argument("command", choices=["export", "train", "benchmark"])
+    parser.add_argument("--components", type=int, default=150, help="特征脸的 PCA 维数")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        dataset = export_dataset()
+        print(
+            f"已导出到 {LFW_DIR}：{len(dataset.images)} 张 {dataset.image_shape} 的图片，"
+            f"{len(dataset.target_names)} 个人"
+        )
+    else:
+        dataset = load_dataset()
+        if dataset is None:
+            raise SystemExit(f"未找到 {LFW_DIR}，请先运行 python lfw_faces.py export")
+        if args.command == "train":
+            result = train_models(dataset)
+            print(f"SVM 已保存到 {SVM_PATH} 和 {SCALER_PATH}，测试集准确率 {result['accuracy']:.2%}")
+            result = train_eigenfaces(dataset, args.components)
+            print(f"特征脸索引已保存到 {EIGENFACES_PATH}，测试集准确率 {result['accuracy']:.2%}")
+        else:
+            _benchmark(dataset)
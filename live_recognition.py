@@ -0,0 +1,67 @@
+import hashlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+Prediction = List[Tuple[str, float]]
+
+
+def canvas_digest(image_data: np.ndarray) -> str:
+    """计算画布像素的摘要，用于判断画布内容是否变化。"""
+    return hashlib.blake2b(
+        np.ascontiguousarray(image_data).data, digest_size=16
+    ).hexdigest()
+
+
+def is_blank(image_data: np.ndarray) -> bool:
+    """画布上没有任何笔迹（所有像素完全透明）时返回 True。"""
+    return not image_data[..., 3].any()
+
+
+class LiveRecognition:
+    """
+    单个会话的边写边识别状态，保存在 st.session_state 中。
+
+    画布每次更新都会触发页面重新运行。内容没有变化时直接返回上次的结果；
+    内容变化时由页面等待 debounce 秒再推理，期间如果又有新的笔画，
+    Streamlit 会中断本次运行，只有停笔后的最后一次更新才真正推理。
+    从画布清空到再次清空视为一次书写，统计其中避免了多少次推理。
+    """
+
+    def __init__(self, debounce: float = 0.3):
+        """
+        :param debounce: 画布变化后等待的时间（秒），连续的笔画更新只推理一次
+        """
+        self.debounce = debounce
+        self.last_digest: Optional[str] = None
+        self.last_result: Optional[Prediction] = None
+        self.reset()
+
+    def reset(self) -> None:
+        """画布被清空，开始新的一次书写。"""
+        self.last_digest = None
+        self.last_result = None
+        self.updates = 0  # 画布有笔迹时的页面运行次数，即每次都推理时的推理次数
+        self.inferences = 0
+
+    @property
+    def avoided(self) -> int:
+        """本次书写中避免的推理次数。"""
+        return self.updates - self.inferences
+
+    def lookup(self, digest: str) -> Optional[Prediction]:
+        """
+        记录一次画布更新，内容与上次推理时相同则返回缓存的结果。
+
+        :return: 缓存的结果，需要重新推理时返回 None
+        """
+        self.updates += 1
+        if digest == self.last_digest:
+            return self.last_result
+        return None
+
+    def record(self, digest: str, result: Prediction) -> None:
+        """保存推理结果。"""
+        self.inferences += 1
+        self.last_digest = digest
+        self.last_result = result
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import queue
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable, Dict, Generator, Iterator, List, Optional
+
+import httpx
+import ollama
+
+import hunyuan_api
+import ollama_api
+import tokenfree_api
+from sse import aiter_sse_data
+
+
+class StreamProvider(ABC):
+    """
+    流式大模型后端的统一接口。
+
+    子类只需实现 list_models 和 _astream；astream 在此基础上统一提供
+    单次请求超时和并发上限。
+    """
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 120.0):
+        """
+        :param max_concurrency: 同时进行的流式请求上限
+        :param timeout: 单次请求的总超时时间（秒）
+        """
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # asyncio.Semaphore 绑定到首次使用它的事件循环，因此按循环分别创建
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @abstractmethod
+    def list_models(self) -> List[str]:
+        """返回该后端可用的模型名称列表。"""
+
+    @abstractmethod
+    def _astream(self, model_name: str, messages: List[Dict]) -> AsyncIterator[str]:
+        """逐步产出模型回复的文本增量。"""
+
+    def context_limit(self, model_name: str) -> int:
+        """返回模型的输入上下文长度（tokens），未知模型使用保守的默认值。"""
+        return hunyuan_api.DEFAULT_CONTEXT_LIMIT
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def astream(
+        self, model_name: str, messages: List[Dict], timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        以异步迭代器的形式流式输出模型回复。
+
+        :param model_name: 模型名称
+        :param messages: 聊天历史记录，格式为 [{"role": "...", "content": "..."}]
+        :param timeout: 本次请求的总超时时间（秒），默认使用构造时的设置
+        :yield: 逐步生成的模型响应内容
+        :raises asyncio.TimeoutError: 超过总超时时间仍未完成
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        async with self._semaphore():
+            stream = self._astream(model_name, messages)
+            try:
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                    if chunk:
+                        yield chunk
+            finally:
+                await stream.aclose()
+
+
+async def _iterate_in_thread(factory: Callable[[], Iterator[str]]) -> AsyncIterator[str]:
+    """
+    在线程池中运行阻塞的生成器，并将其输出转发为异步迭代器。
+
+    消费方提前结束时会通知工作线程停止继续读取。
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    stopped = threading.Event()
+    done = object()
+
+    def worker():
+        try:
+            for item in factory():
+                if stopped.is_set():
+                    break
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+        except Exception as err:
+            loop.call_soon_threadsafe(chunks.put_nowait, err)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, done)
+
+    loop.run_in_executor(None, worker)
+    try:
+        while True:
+            item = await chunks.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
+
+class HunyuanProvider(StreamProvider):
+    """腾讯云混元大模型。官方 SDK 只提供同步接口，因此在线程池中运行并复用共享客户端池。"""
+
+    def list_models(self) -> List[str]:
+        return hunyuan_api.get_available_models()
+
+    def context_limit(self, model_name: str) -> int:
+        return hunyuan_api.get_context_limit(model_name)
+
+    async def _astream(self, model_name: str, messages: List[Dict]) -> AsyncIterator[str]:
+        async for chunk in _iterate_in_thread(
+            lambda: hunyuan_api.hunyuan_generator(model_name, messages)
+        ):
+            yield chunk
+
+
+class OllamaProvider(StreamProvider):
+    """本地 Ollama 服务，使用其原生的异步客户端。"""
+
+    def __init__(self, host: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self._client: Optional[ollama.AsyncClient] = None
+
+    def list_models(self) -> List[str]:
+        return ollama_api.get_available_models()
+
+    async def _astream(self, model_name: str, messages: List[Dict]) -> AsyncIterator[str]:
+        if self._client is None:
+            self._client = ollama.AsyncClient(host=self.host)
+        stream = await self._client.chat(model=model_name, messages=messages, stream=True)
+        async for chunk in stream:
+            yield chunk["message"]["content"]
+
+
+class TokenFreeProvider(StreamProvider):
+    """TokenFree 的 OpenAI 兼容接口，使用 httpx 异步流式请求。"""
+
+    def __init__(self, api_url: str = tokenfree_api.API_URL, **kwargs):
+        super().__init__(**kwargs)
+        self.api_url = api_url
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def list_models(self) -> List[str]:
+        return [tokenfree_api.DEFAULT_MODEL]
+
+    async def _astream(self, model_name: str, messages: List[Dict]) -> AsyncIterator[str]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=None)
+        payload = {
+            "model": model_name,
+            "messages": messages,
+            "max_tokens": 512,
+            "top_p": 1,
+            "temperature": 0.1,
+            "stream": True,
+        }
+        headers = {"Authorization": f"Bearer {tokenfree_api.TOKENFREE_TOKEN}"}
+        async with self._client.stream(
+            "POST", self.api_url, json=payload, headers=headers
+        ) as response:
+            response.raise_for_status()
+            async for data in aiter_sse_data(response.aiter_bytes()):
+                try:
+                    chunk_data = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                for choice in chunk_data.get("choices", []):
+                    content = choice.get("delta", {}).get("content")
+                    if content is not None:
+                        yield content
+
+
+# 按名称注册的后端，Chat 页面根据名称选择
+_providers: Dict[str, StreamProvider] = {}
+
+
+def register_provider(name: str, provider: StreamProvider) -> None:
+    """
+    注册一个流式后端，已存在的同名后端会被替换。
+
+    :param name: 在页面上显示的后端名称
+    :param provider: StreamProvider 实例
+    """
+    _providers[name] = provider
+
+
+def get_provider(name: str) -> StreamProvider:
+    """
+    按名称获取已注册的后端。
+
+    :raises KeyError: 后端未注册
+    """
+    try:
+        return _providers[name]
+    except KeyError:
+        raise KeyError(f"Unknown provider: {name}. Must be one of {list(_providers)}.")
+
+
+def available_providers() -> List[str]:
+    """返回已注册的后端名称，按注册顺序排列。"""
+    return list(_providers)
+
+
+register_provider("混元", HunyuanProvider())
+register_provider("Ollama", OllamaProvider())
+register_provider("TokenFree", TokenFreeProvider())
+
+
+# 所有同步调用共享一个后台事件循环，使多个会话的流式请求复用同一个线程
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="llm-providers-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def stream_sync(
+    provider_name: str,
+    model_name: str,
+    messages: List[Dict],
+    timeout: Optional[float] = None,
+) -> Generator[str, None, None]:
+    """
+    同步适配器：在共享的后台事件循环中运行 astream，可直接传给 st.write_stream。
+
+    与 hunyuan_generator 一致，请求失败时产出一条 "Error: ..." 文本而不是抛出异常。
+    生成器被提前关闭时会取消后台的请求。
+
+    :param provider_name: 已注册的后端名称
+    :param model_name: 模型名称
+    :param messages: 聊天历史记录
+    :param timeout: 本次请求的总超时时间（秒）
+    :yield: 逐步生成的模型响应内容
+    """
+    provider = get_provider(provider_name)
+    # 复制一份消息，避免页面在流式输出期间修改会话状态
+    messages = list(messages)
+    chunks: queue.Queue = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for chunk in provider.astream(model_name, messages, timeout):
+                chunks.put(chunk)
+        except asyncio.TimeoutError:
+            chunks.put(f"Error: 请求超时（{timeout or provider.timeout} 秒）")
+        except Exception as err:
+            chunks.put(f"Error: {str(err)}")
+        finally:
+            chunks.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _background_loop())
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        future.cancel()
+
+
+# 示例调用
+if __name__ == "__main__":
+    conversation = [{"role": "user", "content": "请给我讲个搞笑笑话"}]
+    for content in stream_sync("混元", "hunyuan-lite", conversation):
+        print(content, end="")
+    print("\n")
@@ -0,0 +1,189 @@
+"""
+本地模拟服务，用于在没有真实密钥和网络的情况下调试混元和 TokenFree API 客户端。
+
+用法：
+    python mock_server.py --port 8765
+    HUNYUAN_ENDPOINT=127.0.0.1:8765 HUNYUAN_SCHEME=http python hunyuan_api.py
+    TOKENFREE_API_URL=http://127.0.0.1:8765/v1/chat/completions python tokenfree_api.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+MOCK_REPLY = "你好！我是本地模拟的混元大模型。"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # 保持长连接，以便观察客户端的连接复用
+    protocol_version = "HTTP/1.1"
+    # 每个增量之间的延迟（秒）
+    delay = 0.0
+    # 以该概率随机返回 429 或 503，用于测试重试逻辑
+    fail_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError:
+            return {}
+
+    def _send_json(self, data: dict, status: int = 200) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_sse(self, events) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            chunk = f"data: {event}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            self.wfile.flush()
+            if self.delay:
+                time.sleep(self.delay)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        action = self.headers.get("X-TC-Action", "")
+        payload = self._read_body()
+        if self.fail_rate and random.random() < self.fail_rate:
+            status = random.choice((429, 503))
+            body = b'{"error": "mock failure"}'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith("/v1/chat/completions"):
+            self._openai_chat(payload)
+        elif action == "ChatCompletions":
+            self._hunyuan_chat(payload)
+        elif action == "GetTokenCount":
+            prompt = payload.get("Prompt", "")
+            self._send_json(
+                {
+                    "Response": {
+                        "TokenCount": len(prompt),
+                        "CharacterCount": len(prompt),
+                        "Tokens": list(prompt),
+                        "RequestId": "mock",
+                    }
+                }
+            )
+        else:
+            self._send_json(
+                {
+                    "Response": {
+                        "Error": {"Code": "InvalidAction", "Message": action},
+                        "RequestId": "mock",
+                    }
+                }
+            )
+
+    def _hunyuan_chat(self, payload: dict) -> None:
+        if not payload.get("Stream"):
+            self._send_json(
+                {
+                    "Response": {
+                        "Choices": [
+                            {
+                                "Message": {"Role": "assistant", "Content": MOCK_REPLY},
+                                "FinishReason": "stop",
+                            }
+                        ],
+                        "RequestId": "mock",
+                    }
+                }
+            )
+            return
+
+        def events():
+            for i, char in enumerate(MOCK_REPLY):
+                finish = "stop" if i == len(MOCK_REPLY) - 1 else ""
+                yield json.dumps(
+                    {
+                        "Note": "以上内容为模拟生成",
+                        "Choices": [
+                            {
+                                "Delta": {"Role": "assistant", "Content": char},
+                                "FinishReason": finish,
+                            }
+                        ],
+                        "Created": int(time.time()),
+                        "Id": "mock",
+                    },
+                    ensure_ascii=False,
+                )
+
+        self._send_sse(events())
+
+    def _openai_chat(self, payload: dict) -> None:
+        # OpenAI 兼容的流式接口（TokenFree），以 [DONE] 结束
+        def events():
+            for char in MOCK_REPLY:
+                yield json.dumps(
+                    {
+                        "object": "chat.completion.chunk",
+                        "model": payload.get("model", ""),
+                        "choices": [{"index": 0, "delta": {"content": char}}],
+                    },
+                    ensure_ascii=False,
+                )
+            yield "[DONE]"
+
+        self._send_sse(events())
+
+
+def start_mock_server(
+    host: str = "127.0.0.1", port: int = 0, delay: float = 0.0, fail_rate: float = 0.0
+) -> Tuple[ThreadingHTTPServer, threading.Thread]:
+    """
+    在后台线程中启动模拟服务。
+
+    :param host: 监听地址
+    :param port: 监听端口，0 表示随机分配
+    :param delay: 每个流式增量之间的延迟（秒）
+    :param fail_rate: 随机返回 429/503 的概率
+    :return: (服务对象, 线程)，实际端口为 server.server_address[1]
+    """
+    handler = type(
+        "ConfiguredMockHandler", (MockHandler,), {"delay": delay, "fail_rate": fail_rate}
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟 API 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, thread = start_mock_server(args.host, args.port, args.delay, args.fail_rate)
+    print(f"模拟服务已启动: http://{args.host}:{server.server_address[1]}")
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,196 @@
+"""
+生成手写识别模型的 float16 和 int8（训练后量化）TFLite 版本，保存到 models/variants。
+
+int8 量化需要一批有代表性的输入来校准激活值的范围，这里用字体渲染的字形
+模拟画布上的手写输入，数字模型还会加入 data/images 中的示例图片。
+
+用法：
+    python model_variants.py
+    python model_variants.py models/DigitSense_model.keras --variants int8
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from canvas_preprocessing import downscale_mean, preprocess_canvas
+from handwriting_models import MODEL_SPECS, VARIANT_DIR, VARIANTS, variant_path
+
+DIGIT_LABELS = MODEL_SPECS["digit"]["labels"]
+
+# 需要生成量化版本的模型，格式同 MODEL_SPECS，包括页面中未使用的旧版数字模型
+VARIANT_MODELS = {
+    **{spec["path"]: spec for spec in MODEL_SPECS.values()},
+    "models/DigitSense_model.keras": {"labels": DIGIT_LABELS},
+}
+
+SAMPLE_IMAGE_DIR = "data/images"
+
+_FONT_NAMES = ("DejaVuSans.ttf", "DejaVuSans-Bold.ttf", "DejaVuSerif.ttf")
+
+
+def _fonts(size: int) -> List[ImageFont.FreeTypeFont]:
+    fonts = []
+    for name in _FONT_NAMES:
+        try:
+            fonts.append(ImageFont.truetype(name, size))
+        except OSError:
+            continue
+    # Pillow 自带的字体，系统中没有安装上面的字体时也能使用
+    fonts.append(ImageFont.load_default(size))
+    return fonts
+
+
+def render_glyphs(
+    labels: List[str], per_label: int = 20, seed: int = 0, canvas_size: int = 280
+):
+    """
+    用字体渲染类别字符，模拟画布上的手写输入。
+
+    字符以随机的字号、位置、旋转角度和笔画粗细绘制在透明画布上，
+    再经过与页面相同的 preprocess_canvas 预处理。
+
+    :param labels: 类别字符，例如 "0"-"9"、"A"-"Z"
+    :param per_label: 每个类别的样本数
+    :param seed: 随机种子，校准和评估使用不同的种子
+    :return: (形状为 (n, 28, 28) 的图片, 类别下标)
+    """
+    rng = np.random.default_rng(seed)
+    fonts = {size: _fonts(size) for size in (160, 190, 220)}
+    images, targets = [], []
+    for index, label in enumerate(labels):
+        for _ in range(per_label):
+            size = int(rng.choice(list(fonts)))
+            font = fonts[size][rng.integers(len(fonts[size]))]
+            glyph = Image.new("RGBA", (canvas_size, canvas_size), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(glyph)
+            draw.text(
+                (canvas_size / 2, canvas_size / 2),
+                label,
+                fill=(0, 0, 0, 255),
+                font=font,
+                anchor="mm",
+                stroke_width=int(rng.integers(0, 6)),
+                stroke_fill=(0, 0, 0, 255),
+            )
+            glyph = glyph.rotate(
+                rng.uniform(-15, 15),
+                resample=Image.BILINEAR,
+                translate=tuple(rng.integers(-30, 31, size=2)),
+            )
+            images.append(preprocess_canvas(np.asarray(glyph)))
+            targets.append(index)
+    return np.stack(images), np.array(targets)
+
+
+def load_sample_digits(directory: str = SAMPLE_IMAGE_DIR):
+    """
+    读取 data/images 中的 0.png-9.png（白底黑字），按与画布相同的方式转换。
+
+    :return: (形状为 (10, 28, 28) 的图片, 类别下标)
+    """
+    images = []
+    for digit in range(10):
+        gray = np.asarray(
+            Image.open(os.path.join(directory, f"{digit}.png")).convert("L"),
+            dtype=np.float32,
+        )
+        images.append(downscale_mean(1 - gray / 255))
+    return np.stack(images), np.arange(10)
+
+
+def representative_images(labels: List[str], count: int = 200) -> np.ndarray:
+    """int8 量化的校准数据。"""
+    images, _ = render_glyphs(labels, per_label=max(1, count // len(labels)), seed=0)
+    if labels == DIGIT_LABELS and os.path.isdir(SAMPLE_IMAGE_DIR):
+        images = np.concatenate([images, load_sample_digits()[0]])
+    return images
+
+
+def convert(
+    model_path: str, variant: str, calibration: Optional[np.ndarray] = None
+) -> bytes:
+    """
+    把 Keras 模型转换为 TFLite 模型。
+
+    先导出为 SavedModel 再转换；直接转换 Keras 3 模型的 tf.function 会在 MLIR 中失败。
+    输入输出仍为 float32，页面无需关心量化参数。
+
+    :param model_path: Keras 模型路径
+    :param variant: "float16" 或 "int8"
+    :param calibration: int8 量化的校准图片，形状为 (n, 28, 28)，方向与模型的训练数据一致
+    :return: TFLite 模型内容
+    """
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    input_shape = tuple(model.input_shape[1:])
+    export_dir = tempfile.mkdtemp()
+    try:
+        model.export(export_dir)
+        converter = tf.lite.TFLiteConverter.from_saved_model(export_dir)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if variant == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        elif variant == "int8":
+            if calibration is None:
+                raise ValueError("int8 quantization requires calibration images.")
+
+            def representative_dataset() -> Iterator[List[np.ndarray]]:
+                for image in calibration:
+                    yield [image.reshape((1,) + input_shape).astype(np.float32)]
+
+            converter.representative_dataset = representative_dataset
+        else:
+            raise ValueError(f"Unsupported variant: {variant}")
+        return converter.convert()
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+
+def build_variants(
+    model_paths: List[str], variants: List[str], calibration_size: int = 200
+) -> None:
+    """为每个模型生成指定的精度版本，保存到 VARIANT_DIR。"""
+    os.makedirs(VARIANT_DIR, exist_ok=True)
+    for model_path in model_paths:
+        spec = VARIANT_MODELS.get(model_path, {"labels": DIGIT_LABELS})
+        calibration = None
+        if "int8" in variants:
+            calibration = representative_images(spec["labels"], calibration_size)
+            if spec.get("transpose"):
+                calibration = calibration.transpose(0, 2, 1)
+        for variant in variants:
+            start = time.perf_counter()
+            content = convert(model_path, variant, calibration)
+            path = variant_path(model_path, variant)
+            with open(path, "wb") as output:
+                output.write(content)
+            print(
+                f"{path}: {len(content) / 1024:.0f} KB "
+                f"（原模型 {os.path.getsize(model_path) / 1024:.0f} KB），"
+                f"耗时 {time.perf_counter() - start:.1f} 秒"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成手写识别模型的量化版本")
+    parser.add_argument(
+        "models", nargs="*", default=list(VARIANT_MODELS), help="Keras 模型路径"
+    )
+    parser.add_argument(
+        "--variants",
+        nargs="+",
+        default=[variant for variant in VARIANTS if variant != "float32"],
+        choices=[variant for variant in VARIANTS if variant != "float32"],
+    )
+    parser.add_argument("--calibration-size", type=int, default=200, help="int8 校准样本数")
+    args = parser.parse_args()
+
+    build_variants(args.models, args.variants, args.calibration_size)
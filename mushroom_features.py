@@ -0,0 +1,204 @@
+"""
+蘑菇特征的独热编码。
+
+模型用 pd.get_dummies 在 data/mushrooms.csv 上训练，特征列形如 "cap-shape_b"，
+取值是 UCI 数据集中的单字母代码，而页面的下拉框显示的是完整的英文单词。
+MushroomEncoder 在加载时根据 feature_columns.pkl 建好 (特征, 取值) 到列下标的映射，
+每次预测只需在一行全 0 的数组中把对应位置设为 1。
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# UCI Mushroom 数据集中各特征取值的代码，见 https://archive.ics.uci.edu/dataset/73/mushroom
+# fmt: off
+FEATURE_CODES: Dict[str, Dict[str, str]] = {
+    "cap-shape": {
+        "bell": "b", "conical": "c", "convex": "x", "flat": "f", "knobbed": "k", "sunken": "s",
+    },
+    "cap-surface": {"fibrous": "f", "grooves": "g", "scaly": "y", "smooth": "s"},
+    "cap-color": {
+        "brown": "n", "buff": "b", "cinnamon": "c", "gray": "g", "green": "r",
+        "pink": "p", "purple": "u", "red": "e", "white": "w", "yellow": "y",
+    },
+    "bruises": {"bruises": "t", "no": "f"},
+    "odor": {
+        "almond": "a", "anise": "l", "creosote": "c", "fishy": "y", "foul": "f",
+        "musty": "m", "none": "n", "pungent": "p", "spicy": "s",
+    },
+    "gill-attachment": {"attached": "a", "descending": "d", "free": "f", "notched": "n"},
+    "gill-spacing": {"close": "c", "crowded": "w", "distant": "d"},
+    "gill-size": {"broad": "b", "narrow": "n"},
+    "gill-color": {
+        "black": "k", "brown": "n", "buff": "b", "chocolate": "h", "gray": "g", "green": "r",
+        "orange": "o", "pink": "p", "purple": "u", "red": "e", "white": "w", "yellow": "y",
+    },
+    "stalk-shape": {"enlarging": "e", "tapering": "t"},
+    "stalk-root": {
+        "bulbous": "b", "club": "c", "cup": "u", "equal": "e",
+        "rhizomorphs": "z", "rooted": "r", "missing": "?",
+    },
+    "stalk-surface-above-ring": {"fibrous": "f", "scaly": "y", "silky": "k", "smooth": "s"},
+    "stalk-surface-below-ring": {"fibrous": "f", "scaly": "y", "silky": "k", "smooth": "s"},
+    "stalk-color-above-ring": {
+        "brown": "n", "buff": "b", "cinnamon": "c", "gray": "g", "orange": "o",
+        "pink": "p", "red": "e", "white": "w", "yellow": "y",
+    },
+    "stalk-color-below-ring": {
+        "brown": "n", "buff": "b", "cinnamon": "c", "gray": "g", "orange": "o",
+        "pink": "p", "red": "e", "white": "w", "yellow": "y",
+    },
+    "veil-type": {"partial": "p", "universal": "u"},
+    "veil-color": {"brown": "n", "orange": "o", "white": "w", "yellow": "y"},
+    "ring-number": {"none": "n", "one": "o", "two": "t"},
+    "ring-type": {
+        "cobwebby": "c", "evanescent": "e", "flaring": "f", "large": "l",
+        "none": "n", "pendant": "p", "sheathing": "s", "zone": "z",
+    },
+    "spore-print-color": {
+        "black": "k", "brown": "n", "buff": "b", "chocolate": "h", "green": "r",
+        "orange": "o", "purple": "u", "white": "w", "yellow": "y",
+    },
+    "population": {
+        "abundant": "a", "clustered": "c", "numerous": "n",
+        "scattered": "s", "several": "v", "solitary": "y",
+    },
+    "habitat": {
+        "grasses": "g", "leaves": "l", "meadows": "m", "paths": "p",
+        "urban": "u", "waste": "w", "woods": "d",
+    },
+}
+# fmt: on
+
+
+class MushroomEncoder:
+    """与 get_dummies + reindex(columns=feature_columns, fill_value=0) 等价的独热编码。"""
+
+    def __init__(self, feature_columns: List[str]):
+        """
+        :param feature_columns: 训练时的特征列，例如 ["cap-shape_b", ...]
+        """
+        self.feature_columns = list(feature_columns)
+        self.n_features = len(self.feature_columns)
+        # 每个特征：取值（单字母代码或完整单词）-> 列下标
+        self.lookup: Dict[str, Dict[str, int]] = {}
+        for index, column in enumerate(self.feature_columns):
+            feature, _, code = column.partition("_")
+            self.lookup.setdefault(feature, {})[code] = index
+        for feature, codes in FEATURE_CODES.items():
+            columns = self.lookup.setdefault(feature, {})
+            for word, code in codes.items():
+                if code in columns:
+                    columns[word] = columns[code]
+
+    def column_index(self, feature: str, value: str) -> Optional[int]:
+        """
+        返回某个特征取值对应的列下标。
+
+        训练数据中没有出现过的取值（例如 gill-attachment 的 descending）没有对应的列，
+        返回 None，效果与 reindex 时被丢弃相同。
+        """
+        return self.lookup.get(feature, {}).get(value)
+
+    def encode(self, features: Dict[str, str]) -> np.ndarray:
+        """
+        编码一个样本。
+
+        :param features: 特征名到取值的映射，取值可以是单字母代码或完整单词
+        :return: 形状为 (1, n_features) 的 float64 数组，列顺序与 feature_columns 相同
+        """
+        row = np.zeros((1, self.n_features))
+        for feature, value in features.items():
+            index = self.column_index(feature, value)
+            if index is not None:
+                row[0, index] = 1.0
+        return row
+
+    def encode_frame(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        向量化地编码多个样本。
+
+        :param frame: 每列为一个特征的 DataFrame，例如 mushrooms_test.csv 去掉 class 列；
+                      未知的列和取值会被忽略
+        :return: 形状为 (len(frame), n_features) 的 float32 数组
+                 （随机森林内部使用 float32，直接传入可以避免再复制一次）
+        """
+        encoded = np.zeros((len(frame), self.n_features), dtype=np.float32)
+        rows = np.arange(len(frame))
+        for feature in frame.columns:
+            columns = self.lookup.get(feature)
+            if columns is None:
+                continue
+            indices = frame[feature].map(columns).to_numpy(dtype=float, na_value=np.nan)
+            known = ~np.isnan(indices)
+            encoded[rows[known], indices[known].astype(np.intp)] = 1.0
+        return encoded
+
+
+def prepare_model(model, feature_columns: List[str]):
+    """
+    确认模型的特征顺序与 feature_columns 一致，然后去掉模型记录的特征名，
+    这样直接传入 NumPy 数组预测时 scikit-learn 不会发出特征名缺失的警告。
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        if list(names) != list(feature_columns):
+            raise ValueError("Feature columns do not match the model's features.")
+        del model.feature_names_in_
+    return model
+
+
+# 基准测试：与原页面中 DataFrame + get_dummies + reindex 的编码方式对比
+if __name__ == "__main__":
+    import time
+
+    import joblib
+
+    feature_columns = joblib.load("models/feature_columns.pkl")
+    model = joblib.load("models/mushrooms.pkl")
+    encoder = MushroomEncoder(feature_columns)
+
+    def dataframe_encode(features: Dict[str, str]) -> pd.DataFrame:
+        return pd.get_dummies(pd.DataFrame([features])).reindex(
+            columns=feature_columns, fill_value=0
+        )
+
+    samples = pd.read_csv("data/mushrooms.csv").drop(columns="class")
+    records = samples.to_dict("records")
+
+    # 取值为单字母代码时两种方式结果相同
+    for record in records[:500]:
+        assert np.array_equal(
+            encoder.encode(record), dataframe_encode(record).to_numpy(dtype=float)
+        )
+    # 取值为页面上的完整单词时，原方式得到的列名与训练时不同，整行都是 0
+    words = {
+        feature: next(word for word, code in FEATURE_CODES[feature].items() if code == value)
+        for feature, value in records[0].items()
+    }
+    assert np.array_equal(encoder.encode(words), encoder.encode(records[0]))
+    assert np.array_equal(
+        encoder.encode_frame(samples[:500]),
+        np.concatenate([encoder.encode(record) for record in records[:500]]),
+    )
+    print(f"原方式用完整单词编码后非 0 列数: {int(dataframe_encode(words).to_numpy().sum())}")
+
+    rounds = 500
+    for label, func in (
+        ("DataFrame + get_dummies + reindex", dataframe_encode),
+        ("MushroomEncoder", encoder.encode),
+    ):
+        start = time.perf_counter()
+        for i in range(rounds):
+            func(records[i % len(records)])
+        elapsed = (time.perf_counter() - start) / rounds
+        print(f"{label}: {elapsed * 1000:.3f} ms/次")
+
+    prepare_model(model, feature_columns)
+    row = encoder.encode(records[0])
+    start = time.perf_counter()
+    for _ in range(20):
+        model.predict(row)
+    print(f"随机森林预测: {(time.perf_counter() - start) / 20 * 1000:.3f} ms/次")
@@ -0,0 +1,258 @@
+"""
+蘑菇分类随机森林的紧凑表示。
+
+把 scikit-learn 随机森林中所有树的节点展平为几个连续的 NumPy 数组，
+保存为 .npy 文件并以内存映射方式加载。加载时不需要导入 scikit-learn，
+也不需要反序列化 pickle，冷启动更快、常驻内存更少；预测时所有树同时逐层向下走，
+结果与原模型的 predict_proba 完全相同。
+
+单行和小批量预测比原模型快；但大批量时 NumPy 的逐层遍历不如 scikit-learn 的
+C 实现，且不支持多线程，因此 mushroom_batch.py 的命令行和蘑菇分类页面的批量预测仍使用原模型，
+紧凑森林只用于页面上的单行预测。
+
+用法：
+    python mushroom_forest.py export            # 从 models/mushrooms.pkl 导出
+    python mushroom_forest.py export --retrain  # 按 蘑菇分类.ipynb 重新训练后导出
+    python mushroom_forest.py verify            # 验证预测一致，并对比加载时间、文件大小和延迟
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+FOREST_DIR = "models/mushrooms_forest"
+
+_ARRAYS = ("children", "feature", "threshold", "leaf", "value", "roots")
+
+# predict_proba 内部按块处理的行数，使每块用到的特征和节点下标能留在 CPU 缓存中
+BLOCK_ROWS = 2048
+
+
+class CompactForest:
+    """
+    展平的随机森林，接口与 RandomForestClassifier 的 predict / predict_proba 相同。
+
+    所有树的节点连续编号；children[2 * i] 和 children[2 * i + 1] 分别是节点 i 的
+    右、左子节点，这样可以用比较结果直接算出下一个节点的下标。
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        self.children = arrays["children"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.leaf = arrays["leaf"]
+        self.value = arrays["value"]  # 每个节点上各类别的比例
+        self.roots = arrays["roots"]  # 每棵树根节点的下标
+        self.classes_ = np.array(meta["classes"])
+        self.feature_columns: List[str] = meta["feature_columns"]
+        self.n_features_in_ = len(self.feature_columns)
+
+    @classmethod
+    def from_sklearn(cls, model, feature_columns: List[str]) -> "CompactForest":
+        """展平一个已训练的 RandomForestClassifier。"""
+        children, feature, threshold, leaf, value, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            children.append(
+                np.stack([tree.children_right, tree.children_left], axis=1) + offset
+            )
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            leaf.append(is_leaf)
+            # 与 DecisionTreeClassifier.predict_proba 相同的归一化
+            proportions = tree.value[:, 0, :]
+            normalizer = proportions.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(proportions / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+        arrays = {
+            "children": np.concatenate(children).ravel().astype(np.int32),
+            "feature": np.concatenate(feature).astype(np.int32),
+            "threshold": np.concatenate(threshold),
+            "leaf": np.concatenate(leaf),
+            "value": np.concatenate(value),
+            "roots": np.array(roots, dtype=np.int32),
+        }
+        meta = {
+            "classes": [str(label) for label in model.classes_],
+            "feature_columns": list(feature_columns),
+        }
+        return cls(arrays, meta)
+
+    def save(self, directory: str = FOREST_DIR) -> None:
+        """保存为目录中的若干 .npy 文件和 meta.json。"""
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        meta = {"classes": self.classes_.tolist(), "feature_columns": self.feature_columns}
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as meta_file:
+            json.dump(meta, meta_file, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str = FOREST_DIR, mmap: bool = True) -> "CompactForest":
+        """
+        加载导出的森林。
+
+        :param mmap: 以只读内存映射方式打开数组，只有实际访问到的页才会读入内存
+        """
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+        arrays = {
+            name: np.load(
+                os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None
+            )
+            for name in _ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """返回形状为 (树的数量, n) 的叶节点下标。"""
+        n_trees, n_rows = len(self.roots), len(X)
+        flat = X.ravel()
+        # 每个 (树, 样本) 对当前所在的节点；到达叶节点的对被记录下来并移出，只推进其余部分
+        pairs = np.arange(n_trees * n_rows)
+        nodes = np.repeat(np.asarray(self.roots), n_rows)
+        offsets = np.tile(np.arange(n_rows) * X.shape[1], n_trees)
+        leaves = np.empty(len(pairs), dtype=np.int32)
+        while True:
+            # 先判断再推进：根节点本身就是叶节点的树（训练样本无法再划分时）不会走到无效的子节点
+            done = self.leaf[nodes]
+            leaves[pairs[done]] = nodes[done]
+            pending = ~done
+            pairs, nodes, offsets = pairs[pending], nodes[pending], offsets[pending]
+            if not len(pairs):
+                return leaves.reshape(n_trees, n_rows)
+            go_left = flat[offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_left]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        :param X: 形状为 (n, n_features) 的独热编码特征
+        :return: 形状为 (n, 类别数) 的概率，各树结果的平均
+        """
+        # 与 scikit-learn 一致，先转换为 float32 再与 float64 的阈值比较
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        probabilities = np.zeros((len(X), len(self.classes_)))
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = probabilities[start : start + BLOCK_ROWS]
+            for tree_leaves in self._leaves(X[start : start + BLOCK_ROWS]):
+                block += self.value[tree_leaves]
+        return probabilities / len(self.roots)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def train_forest(dataset: str = "mushrooms", random_state: int = 0):
+    """按 蘑菇分类.ipynb 的方式训练随机森林，返回 (模型, 特征列)。"""
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+
+    from data_store import load_dataset
+
+    # 各列为 category，get_dummies 得到的列及其顺序与读取 CSV 字符串时相同
+    frame = load_dataset(dataset)
+    X = pd.get_dummies(frame.iloc[:, 1:])
+    model = RandomForestClassifier(random_state=random_state)
+    model.fit(X, frame["class"])
+    return model, X.columns.to_list()
+
+
+def directory_size(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
+
+
+# 在新进程中测量冷启动：导入依赖并加载模型的耗时，以及进程的峰值常驻内存
+_COLD_START = {
+    "pickle": (
+        "import joblib\n"
+        "model = joblib.load('models/mushrooms.pkl')\n"
+        "columns = joblib.load('models/feature_columns.pkl')\n"
+    ),
+    "compact": (
+        "from mushroom_forest import CompactForest\n"
+        "model = CompactForest.load()\n"
+    ),
+}
+
+
+def measure_cold_start(kind: str) -> Dict[str, float]:
+    import subprocess
+    import sys
+
+    # ru_maxrss 会继承 fork 时父进程的峰值，因此读取 /proc 中新地址空间的 VmHWM（单位 KB）
+    script = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        + _COLD_START[kind]
+        + "elapsed = time.perf_counter() - start\n"
+        "status = open('/proc/self/status').read()\n"
+        "print(elapsed, status.split('VmHWM:')[1].split()[0])\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout.split()
+    return {"seconds": float(output[0]), "rss_mb": float(output[1]) / 1024}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出和验证紧凑的蘑菇分类随机森林")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--retrain", action="store_true", help="重新训练而不是读取 pkl")
+    args = parser.parse_args()
+
+    import time
+
+    import joblib
+
+    if args.command == "export":
+        if args.retrain:
+            model, feature_columns = train_forest()
+        else:
+            model = joblib.load("models/mushrooms.pkl")
+            feature_columns = joblib.load("models/feature_columns.pkl")
+        CompactForest.from_sklearn(model, feature_columns).save()
+        print(f"已导出到 {FOREST_DIR}，共 {directory_size(FOREST_DIR) / 1024:.0f} KB")
+    else:
+        from data_store import load_dataset
+        from mushroom_features import MushroomEncoder, prepare_model
+
+        feature_columns = joblib.load("models/feature_columns.pkl")
+        model = prepare_model(joblib.load("models/mushrooms.pkl"), feature_columns)
+        forest = CompactForest.load()
+        test = load_dataset("mushrooms_test")
+        X = MushroomEncoder(forest.feature_columns).encode_frame(test.drop(columns="class"))
+
+        assert forest.feature_columns == feature_columns
+        assert np.array_equal(forest.predict(X), model.predict(X))
+        assert np.allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+        print(f"mushrooms_test.csv 上 {len(X)} 行的预测与原模型完全一致")
+
+        sizes = {
+            "pickle": os.path.getsize("models/mushrooms.pkl")
+            + os.path.getsize("models/feature_columns.pkl"),
+            "compact": directory_size(FOREST_DIR),
+        }
+        for kind, predictor in (("pickle", model), ("compact", forest)):
+            cold = measure_cold_start(kind)
+            timings = []
+            for row in X[:100]:
+                start = time.perf_counter()
+                predictor.predict_proba(row[None, :])
+                timings.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            predictor.predict_proba(X)
+            batch = (time.perf_counter() - start) / len(X) * 1000
+            print(
+                f"{kind:>7}: 文件 {sizes[kind] / 1024:.0f} KB，"
+                f"冷启动 {cold['seconds'] * 1000:.0f} ms，峰值内存 {cold['rss_mb']:.0f} MB，"
+                f"单行延迟 p50 {np.median(timings):.3f} ms，整批平均 {batch:.4f} ms/行"
+            )
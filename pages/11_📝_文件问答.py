@@ -1,6 +1,10 @@
+import hashlib
+import itertools
 import streamlit as st
-from hunyuan_api import hunyuan_generator
-from docx import Document
+from hunyuan_api import get_embeddings, hunyuan_generator
+from response_cache import ResponseCache
+from document_retrieval import DocumentIndex, build_prompt, iter_chunks
+from document_ingestion import UnsupportedFormatError, iter_document
 
 st.set_page_config(
     page_title="文件问答",
@@ -17,44 +21,87 @@ question = st.text_input(
     disabled=not uploaded_file,
 )
 
+# 检索设置
+top_k = st.sidebar.slider("检索片段数量", min_value=1, max_value=10, value=4)
+use_embedding = st.sidebar.checkbox("结合向量检索（混元 Embedding）", value=False)
 
-def read_docx(file) -> str:
-    """读取 .docx 文件的内容"""
-    document = Document(file)
-    return "\n".join([para.text for para in document.paragraphs])
+# 短文档直接整篇发送，超过该长度时只发送检索到的片段
+FULL_DOCUMENT_MAX_CHARS = 6000
+
+
+@st.cache_resource
+def get_response_cache():
+    """所有会话共享的回复缓存"""
+    return ResponseCache()
+
+
+response_cache = get_response_cache()
+
+
+@st.cache_resource(max_entries=16)
+def get_document_index(file_hash: str, use_embedding: bool, _pieces):
+    """按文件哈希缓存文档索引，同一文件的后续提问不再重新读取、切分和建索引"""
+    embed_fn = get_embeddings if use_embedding else None
+    return DocumentIndex(iter_chunks(_pieces), embed_fn=embed_fn)
 
 
 if uploaded_file and question:
-    if uploaded_file.name.endswith(".txt") or uploaded_file.name.endswith(".md"):
-        try:
-            # 尝试以 UTF-8 编码读取文件
-            article = uploaded_file.read().decode("utf-8")
-        except UnicodeDecodeError:
-            # 如果 UTF-8 解码失败，尝试其他常见编码
-            try:
-                article = uploaded_file.read().decode("gbk")
-            except UnicodeDecodeError:
-                st.error("解码文件失败。请上传 UTF-8 或 GBK 编码的文本文件。")
-                st.stop()
-    elif uploaded_file.name.endswith(".docx"):
-        # 处理 .docx 文件
-        article = read_docx(uploaded_file)
-    else:
+    try:
+        # 逐段读取文档，只在文档较短时才拼接出全文
+        pieces = iter_document(uploaded_file, uploaded_file.name)
+        head = []
+        head_chars = 0
+        for piece in pieces:
+            head.append(piece)
+            head_chars += len(piece)
+            if head_chars > FULL_DOCUMENT_MAX_CHARS:
+                break
+
+        if head_chars <= FULL_DOCUMENT_MAX_CHARS:
+            article = "".join(head)
+            user_content = f"下面是一个文档:\n\n{article}\n\n{question}"
+        else:
+            with uploaded_file.getbuffer() as buffer:
+                file_hash = hashlib.sha256(buffer).hexdigest()
+            # 已读取的开头部分和剩余部分一起增量送入切分器
+            index = get_document_index(
+                file_hash, use_embedding, itertools.chain(head, pieces)
+            )
+            chunks = index.search(question, k=top_k)
+            if use_embedding and index.embedding_error is not None:
+                st.warning(f"向量检索失败，本次只使用关键词检索：{index.embedding_error}")
+            user_content = build_prompt(chunks, question)
+            st.caption(
+                f"文档切分为 {len(index)} 个片段，"
+                f"本次发送 {len(chunks)} 个片段（{len(user_content)} 字）"
+            )
+    except UnicodeDecodeError:
+        st.error("解码文件失败。请上传 UTF-8 或 GBK 编码的文本文件。")
+        st.stop()
+    except UnsupportedFormatError:
         st.error("不支持的文件格式。请上传 .txt、.md 或 .docx 文件。")
         st.stop()
 
     conversation = [
         {"role": "system", "content": "你是一个智能助手。"},
-        {"role": "user", "content": f"下面是一个文档:\n\n{article}\n\n{question}"},
+        {"role": "user", "content": user_content},
     ]
 
     # 在 Streamlit 界面中创建一个可变的占位符
     answer_placeholder = st.empty()
 
-    # 使用 hunyuan_generator 生成逐步回答
-    response_generator = hunyuan_generator("hunyuan-lite", conversation)
+    # 使用 hunyuan_generator 生成逐步回答，相同的文档和问题直接回放缓存的回答
+    cache_key = ResponseCache.make_key("hunyuan-lite", conversation)
+    response_generator = response_cache.cached_stream(
+        cache_key, lambda: hunyuan_generator("hunyuan-lite", conversation)
+    )
 
     full_response = ""  # 用于拼接完整的回答
     for partial_response in response_generator:
         full_response += partial_response
         answer_placeholder.markdown(full_response)  # 实时更新回答，使用 markdown 显示
+
+    stats = response_cache.stats()
+    st.sidebar.caption(
+        f"缓存命中 {stats['hits']} 次，未命中 {stats['misses']} 次，共 {stats['entries']} 条"
+    )
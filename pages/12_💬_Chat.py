@@ -1,6 +1,7 @@
+import functools
 import streamlit as st
-from ollama_api import ollama_generator, get_available_models  # 导入 Ollama API 函数
-from hunyuan_api import hunyuan_generator  # 导入混元大模型 API 函数
+from llm_providers import available_providers, get_provider, stream_sync  # 导入统一的流式后端
+from conversation_context import ConversationContext, make_summarizer
 
 st.set_page_config(
     page_title="chat",
@@ -14,33 +15,31 @@ if "selected_platform" not in st.session_state:
     st.session_state.selected_platform = "混元"  # 默认平台为混元
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "context" not in st.session_state:
+    # 上下文管理与页面共用同一个消息列表
+    st.session_state.context = ConversationContext(st.session_state.messages)
 
-# 选择使用的平台（混元 或 Ollama）
+# 选择使用的平台（按名称从已注册的后端中选择）
 st.session_state.selected_platform = st.selectbox(
     "请选择平台：",
-    ["混元", "Ollama"],
+    available_providers(),
     index=0,  # 默认选择混元
 )
+provider = get_provider(st.session_state.selected_platform)
 
 # 根据选择的平台获取相应的模型列表
-if st.session_state.selected_platform == "Ollama":
-    st.session_state.selected_model = st.selectbox(
-        "请选择 Ollama 模型：", get_available_models()
-    )
-else:
-    st.session_state.selected_model = st.selectbox(
-        "请选择混元模型：",
-        [
-            "hunyuan-lite",
-            "hunyuan-standard",
-            "hunyuan-standard-256K",
-            "hunyuan-pro",
-            "hunyuan-code",
-            "hunyuan-role",
-            "hunyuan-functioncall",
-            "hunyuan-vision",
-        ],
+st.session_state.selected_model = st.selectbox(
+    f"请选择{st.session_state.selected_platform}模型：",
+    provider.list_models(),
+)
+
+# 超出上下文预算的早期对话由当前模型在后台压缩为摘要
+context = st.session_state.context
+context.summarizer = make_summarizer(
+    functools.partial(
+        stream_sync, st.session_state.selected_platform, st.session_state.selected_model
     )
+)
 
 # 显示聊天历史
 for message in st.session_state.messages:
@@ -54,20 +53,31 @@ if prompt := st.chat_input("请问有什么可以帮助您？"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    # 只发送上下文预算内的消息
+    request_messages = context.build_messages(
+        provider.context_limit(st.session_state.selected_model)
+    )
+
     # 根据选定的平台生成模型的回复
     with st.chat_message("assistant"):
-        if st.session_state.selected_platform == "Ollama":
-            response = st.write_stream(
-                ollama_generator(
-                    st.session_state.selected_model, st.session_state.messages
-                )
-            )
-        else:
-            response = st.write_stream(
-                hunyuan_generator(
-                    st.session_state.selected_model, st.session_state.messages
-                )
+        response = st.write_stream(
+            stream_sync(
+                st.session_state.selected_platform,
+                st.session_state.selected_model,
+                request_messages,
             )
+        )
 
     st.session_state.messages.append({"role": "assistant", "content": response})
 
+# 显示每轮的提示词大小
+if context.turn_metrics:
+    metrics = context.turn_metrics[-1]
+    st.sidebar.caption(
+        f"本轮提示词约 {metrics['prompt_tokens']} tokens，"
+        f"发送 {metrics['messages_sent']} 条消息，"
+        f"省略 {metrics['messages_dropped']} 条（其中 {metrics['messages_summarized']} 条已摘要）"
+    )
+    st.sidebar.line_chart(
+        [m["prompt_tokens"] for m in context.turn_metrics], height=150
+    )
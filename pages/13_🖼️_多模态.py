@@ -1,6 +1,12 @@
 import streamlit as st
-from tokenfree_api import describe_image
-import os
+from tokenfree_api import (
+    DELIVERY_CHECK_PROMPT,
+    JPEG_QUALITY,
+    MAX_IMAGE_SIZE,
+    describe_cache_key,
+    describe_image_stream,
+)
+from response_cache import ResponseCache
 
 st.set_page_config(
     page_title="多模态",
@@ -8,25 +14,45 @@ st.set_page_config(
 )
 st.header("多模态")
 
+
+@st.cache_resource
+def get_response_cache():
+    """所有会话共享的回复缓存"""
+    return ResponseCache()
+
+
+response_cache = get_response_cache()
+
+# 发送前的图片压缩设置
+max_size = st.sidebar.slider("图片最大边长（像素）", 256, 2048, MAX_IMAGE_SIZE, step=128)
+quality = st.sidebar.slider("JPEG 质量", 50, 95, JPEG_QUALITY, step=5)
+
 uploaded_file = st.file_uploader("上传图片", type=["jpg", "jpeg", "png"])
     
 if uploaded_file is not None:
-    # 将上传的文件保存到临时位置
-    with open("temp_image.jpg", "wb") as temp_file:
-        temp_file.write(uploaded_file.getbuffer())
-    
     # 显示上传的图像
     st.image(uploaded_file, caption="上传的图片", use_column_width=False, width=300)  
-    custom_text = st.text_area("输入自定义描述文本", "分析这张图片，判断收货地点是否在店内。请注意商店的常见特征如货架、商品陈列、购物车、收银台等，然后直接回答‘收货地点在店内’或‘收货地点不在店内’。")
+    custom_text = st.text_area("输入自定义描述文本", DELIVERY_CHECK_PROMPT)
 
     if st.button("获取描述"):
+        # 相同的图片和描述文本直接回放缓存的描述
+        with uploaded_file.getbuffer() as image_buffer:
+            cache_key = describe_cache_key(image_buffer, custom_text, max_size, quality)
+
+        # 显示生成的描述
+        st.markdown("### 图片描述")
         with st.spinner("描述生成中..."):
-            descriptions = describe_image("temp_image.jpg", custom_text)
-            full_description = "".join(descriptions)
-            
-            # 显示生成的描述
-            st.markdown("### 图片描述")
-            st.write(full_description)
-            
-            # 删除临时文件
-            os.remove("temp_image.jpg")
\ No newline at end of file
+            # 直接使用内存中的上传文件，不再写入临时文件
+            st.write_stream(
+                response_cache.cached_stream(
+                    cache_key,
+                    lambda: describe_image_stream(
+                        uploaded_file, custom_text, max_size, quality
+                    ),
+                )
+            )
+
+        stats = response_cache.stats()
+        st.sidebar.caption(
+            f"缓存命中 {stats['hits']} 次，未命中 {stats['misses']} 次，共 {stats['entries']} 条"
+        )
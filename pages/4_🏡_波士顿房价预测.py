@@ -1,9 +1,6 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
+from regression_pages import get_artifacts, load_data
 
 # 页面配置
 st.set_page_config(
@@ -13,14 +10,8 @@ st.set_page_config(
 
 
 
-# 加载数据集
-@st.cache_data
-def load_data():
-    data = pd.read_csv("data/course-5-boston.csv")
-    return data
-
-
-data = load_data()
+data = load_data("boston")
+artifacts = get_artifacts("boston")
 
 # 显示数据集
 st.write("# 波士顿房价预测 🏡")
@@ -57,29 +48,13 @@ st.dataframe(features_df, use_container_width=True)
 st.write("### 数据统计信息")
 st.write(data.describe())
 
-# 数据预处理
-X = data.drop("medv", axis=1)
-y = data["medv"]
-
-# 分割数据集
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-
-# 训练模型
-model = LinearRegression()  # 建立模型
-model.fit(X_train, y_train)  # 训练模型
-
-# 预测
-y_pred = model.predict(X_test)
-
-# 计算均方误差
-mse = mean_squared_error(y_test, y_pred)
+# 均方误差
+mse = artifacts["metrics"]["mse"]
 st.write("### 预测结果")
 st.write(f"均方误差: {mse:.2f}")
 
 # 显示预测和真实值对比
-results = pd.DataFrame({"真实值": y_test, "预测值": y_pred})
+results = artifacts["results"]
 st.write(results.head())
 
 # 绘制预测结果图表
@@ -1,9 +1,6 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_absolute_error, mean_squared_error
+from regression_pages import get_artifacts, load_data
 
 # 页面配置
 st.set_page_config(
@@ -12,14 +9,8 @@ st.set_page_config(
 )
 
 
-# 加载数据集
-@st.cache_data
-def load_data():
-    data = pd.read_csv("data/challenge-1-beijing.csv")
-    return data
-
-
-data = load_data()
+data = load_data("beijing")
+artifacts = get_artifacts("beijing")
 
 # 显示数据集
 st.write("# 北京房价预测 🏙️")
@@ -54,43 +45,10 @@ st.dataframe(features_df, use_container_width=True)
 st.write("### 数据统计信息")
 st.write(data.describe())
 
-# 数据预处理
-# 假设 '小区名字', '房型', '楼层' 为类别特征，需要进行编码
-data = pd.get_dummies(data, columns=["小区名字", "房型", "楼层"], drop_first=True)
-
-# 将'建造时间'转换为数值型数据
-data["建造时间"] = pd.to_numeric(data["建造时间"], errors="coerce")
-
-# 移除缺失值
-data = data.dropna()
-
-# 增加更多特征
-data["建造时间平方"] = data["建造时间"] ** 2
-data["面积平方"] = data["面积"] ** 2
-data["公交_写字楼"] = data["公交"] * data["写字楼"]
-data["医院_地铁"] = data["医院"] * data["地铁"]
-data["商场_学校"] = data["商场"] * data["学校"]
-
-# 特征和目标值
-X = data.drop("每平米价格", axis=1)
-y = data["每平米价格"]
-
-# 分割数据集
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-
-# 训练模型
-model = LinearRegression()
-model.fit(X_train, y_train)
-
-# 预测
-y_pred = model.predict(X_test)
-
-# 计算评价指标
-mae = mean_absolute_error(y_test, y_pred)
-mse = mean_squared_error(y_test, y_pred)
-mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
+# 评价指标，特征工程和训练见 regression_pipelines.train_beijing
+mae = artifacts["metrics"]["mae"]
+mse = artifacts["metrics"]["mse"]
+mape = artifacts["metrics"]["mape"]
 
 # 显示预测结果
 st.write("### 预测结果")
@@ -110,7 +68,7 @@ st.caption(
 )
 
 # 显示预测和真实值对比
-results = pd.DataFrame({"真实值": y_test, "预测值": y_pred})
+results = artifacts["results"]
 st.write(results.head())
 
 # 绘制预测结果图表
@@ -1,11 +1,9 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
 import matplotlib.pyplot as plt
+from polynomial_sweep import best_by_degree, results_frame
+from regression_pages import get_training_cache, load_data
+from regression_pipelines import train_pipeline
 
 # 设置中文字体
 plt.rcParams["font.sans-serif"] = ["SimHei"]  # 使用黑体
@@ -14,17 +12,10 @@ plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
 # 页面配置
 st.set_page_config(page_title="比特币价格预测", page_icon="📈")
 
-# 加载数据集
-@st.cache_data
-def load_data():
-    data = pd.read_csv("data/challenge-2-bitcoin.csv", parse_dates=["Date"])
-    return data
+MODES = ("时间序列预测", "随机划分（多项式回归）")
+mode = st.sidebar.selectbox("预测方式", MODES)
 
-data = load_data()
-
-# 选择特征和目标值
-selected_features = ["btc_total_bitcoins", "btc_transaction_fees"]
-target = "btc_market_price"
+data = load_data("bitcoin")
 
 # 数据预览
 st.write("# 比特币价格预测 📈")
@@ -69,33 +60,66 @@ features_df = pd.DataFrame(list(features.items()), columns=["特征", "说明"])
 st.write("### 数据集特征说明")
 st.dataframe(features_df, use_container_width=True)
 
-# 数据预处理
-X = data[selected_features]
-y = data[target]
-
-# 划分训练集和测试集
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.3, random_state=42
+# 时间序列预测：按时间顺序前推回测，每天用之前的数据预测当天价格，再用递推最小二乘更新模型
+if mode == MODES[0]:
+    window_type = st.sidebar.radio("训练窗口", ("扩展窗口", "滚动窗口"))
+    window = (
+        st.sidebar.slider("滚动窗口天数", 90, 730, 365, step=5)
+        if window_type == "滚动窗口"
+        else None
+    )
+    artifacts = train_pipeline(
+        "bitcoin_forecast", get_training_cache(), data_loader=load_data, window=window
+    )
+    metrics = artifacts["metrics"]
+
+    st.write("### 前推回测")
+    columns = st.columns(4)
+    columns[0].metric("MAE", f"{metrics['mae']:.1f}")
+    columns[1].metric("RMSE", f"{metrics['rmse']:.1f}")
+    columns[2].metric("MAPE", f"{metrics['mape']:.2f}%")
+    columns[3].metric("朴素预测 MAE", f"{metrics['naive_mae']:.1f}", help="以前一天的价格作为预测")
+    if metrics["mae"] >= metrics["naive_mae"]:
+        st.warning(
+            f"回测中模型的 MAE（{metrics['mae']:.1f}）不低于直接用前一天价格作为预测的朴素方法"
+            f"（{metrics['naive_mae']:.1f}），下面的预测价格仅供参考。"
+        )
+    st.line_chart(artifacts["results"].set_index("日期")[["真实值", "预测值", "朴素预测"]])
+
+    date, price = artifacts["forecast"]
+    st.write(f"### {date:%Y-%m-%d} 的预测价格：{price:,.2f} 美元")
+    st.stop()
+
+# 在多项式次数、正则化强度和特征子集上搜索，训练过程见 regression_pipelines.train_bitcoin
+# 没有缓存时，每个配置训练完成后立即更新图表
+# 在服务进程中依次训练，不 fork 进程池；命令行的 python regression_pipelines.py 仍并行搜索
+st.write("### 超参数搜索")
+progress = st.empty()
+finished = []
+
+
+def show_progress(result):
+    finished.append(result)
+    progress.line_chart(
+        best_by_degree(results_frame(finished)).set_index("degree")[["mse_train", "mse_test"]]
+    )
+
+
+artifacts = train_pipeline(
+    "bitcoin",
+    get_training_cache(),
+    data_loader=load_data,
+    max_workers=1,
+    progress_callback=show_progress,
 )
+progress.empty()
+st.dataframe(artifacts["sweep"], use_container_width=True)
 
-# 构建和评估多项式回归模型
-degrees = [1, 2, 3, 4, 5]  # 不同的多项式次数
-mse_train = []
-mse_test = []
-
-for degree in degrees:
-    poly = PolynomialFeatures(degree)
-    X_train_poly = poly.fit_transform(X_train)
-    X_test_poly = poly.transform(X_test)
-
-    model = LinearRegression()
-    model.fit(X_train_poly, y_train)
-
-    y_train_pred = model.predict(X_train_poly)
-    y_test_pred = model.predict(X_test_poly)
-
-    mse_train.append(mean_squared_error(y_train, y_train_pred))
-    mse_test.append(mean_squared_error(y_test, y_test_pred))
+# 每个次数下最佳配置的 MSE
+sweep = best_by_degree(artifacts["sweep"])
+degrees = sweep["degree"].tolist()
+mse_train = sweep["mse_train"].tolist()
+mse_test = sweep["mse_test"].tolist()
 
 # 绘制 MSE 与多项式次数的关系图
 plt.figure(figsize=(10, 6))
@@ -111,23 +135,15 @@ plt.grid(True)
 st.write("### 不同多项式次数下的均方误差 (MSE)")
 st.pyplot(plt)
 
-# 选择最佳多项式次数
-best_degree = degrees[np.argmin(mse_test)]
-st.write(f"最佳多项式次数: {best_degree}")
-
-# 使用最佳多项式次数训练模型并预测
-poly = PolynomialFeatures(best_degree)
-X_train_poly = poly.fit_transform(X_train)
-X_test_poly = poly.transform(X_test)
-
-model = LinearRegression()
-model.fit(X_train_poly, y_train)
-
-y_test_pred = model.predict(X_test_poly)
+# 最佳配置
+best_config = artifacts["best_config"]
+st.write(f"最佳多项式次数: {best_config['degree']}")
+st.write(f"正则化强度 alpha: {best_config['alpha']}，特征: {', '.join(best_config['features'])}")
 
 # 显示预测结果
 st.write("### 预测结果")
-results = pd.DataFrame({"真实值": y_test, "预测值": y_test_pred})
+results = artifacts["results"]
+y_test, y_test_pred = results["真实值"], results["预测值"]
 st.write(results.head())
 
 # 绘制预测结果图表
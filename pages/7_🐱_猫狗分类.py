@@ -1,34 +1,56 @@
-import streamlit as st
 import numpy as np
+import pandas as pd
+import streamlit as st
 from PIL import Image
-from sklearn.preprocessing import StandardScaler
-from sklearn.svm import SVC
-from sklearn.metrics import classification_report, accuracy_score
-from skimage.transform import resize
-import joblib
 
+from lfw_faces import (
+    ENGINES,
+    LFW_DIR,
+    EigenfaceIndex,
+    evaluate,
+    load_dataset,
+    load_models,
+    preprocess_image,
+    svm_predictor,
+    train_eigenfaces,
+    train_models,
+)
 
-def load_models():
-    """加载保存的模型"""
-    svm_clf = joblib.load("data/svm_clf_model.joblib")
-    scaler = joblib.load("data/scaler_model.joblib")
-    return svm_clf, scaler
+st.title("LFW 人脸分类")
 
 
-def preprocess_image(image, target_shape):
-    """预处理上传的图片"""
-    image_resized = resize(image, target_shape, mode="reflect", anti_aliasing=True)
-    image_gray = np.dot(
-        image_resized[..., :3], [0.2989, 0.5870, 0.1140]
-    )  # Convert to grayscale
-    return image_gray.flatten()
+# 数据集以内存映射方式打开，模型只加载一次，所有会话共享
+@st.cache_resource
+def get_dataset():
+    return load_dataset()
 
 
-st.title("LFW 人脸分类")
+@st.cache_resource
+def get_models():
+    return load_models()
 
-faces = fetch_lfw_people(
-    data_home="data/lfw_funneled", min_faces_per_person=60, resize=0.4
-)
+
+@st.cache_resource
+def get_eigenfaces():
+    return EigenfaceIndex.load()
+
+
+@st.cache_data
+def get_evaluation(engine: str):
+    if engine == "SVM":
+        predict = svm_predictor(*get_models())
+    else:
+        predict = get_eigenfaces().predict
+    return evaluate(predict, get_dataset())
+
+
+faces = get_dataset()
+if faces is None:
+    st.error(f"未找到数据集 {LFW_DIR}，请先运行 python lfw_faces.py export")
+    st.stop()
+
+engine = st.sidebar.selectbox("识别引擎", ENGINES)
+models = get_models() if engine == "SVM" else get_eigenfaces()
 
 tab1, tab2, tab3 = st.tabs(["数据集信息", "模型训练与评估", "上传图片预测"])
 
@@ -39,7 +61,11 @@ with tab1:
     with col1:
         sample_index = np.random.choice(len(faces.images))
         sample_image = faces.images[sample_index]
-        st.image(sample_image, caption=faces.target_names[faces.target[sample_index]])
+        st.image(
+            np.asarray(sample_image),
+            caption=faces.target_names[faces.target[sample_index]],
+            clamp=True,
+        )
 
     with col2:
         st.write("数据集信息:")
@@ -48,13 +74,21 @@ with tab1:
         st.write(f"- 类别数量: {len(faces.target_names)}")
 
 with tab2:
-    if st.button("加载模型"):
-        # 加载模型
-        with st.spinner("正在加载模型..."):
-            svm_clf, scaler = load_models()
-        st.success("模型加载成功！")
+    if models is None:
+        st.info("尚未训练模型，点击下方按钮按 人像分类.ipynb 的方式训练")
+        if st.button("训练模型"):
+            with st.spinner("正在训练模型..."):
+                train_models(faces)
+                train_eigenfaces(faces)
+            get_models.clear()
+            get_eigenfaces.clear()
+            get_evaluation.clear()
+            st.rerun()
     else:
-        st.info("点击上方按钮加载模型")
+        st.success("模型已加载")
+        evaluation = get_evaluation(engine)
+        st.metric("测试集准确率", f"{evaluation['accuracy']:.2%}")
+        st.dataframe(pd.DataFrame(evaluation["report"]).T)
 
 with tab3:
     uploaded_file = st.file_uploader(
@@ -62,15 +96,24 @@ with tab3:
     )
     if uploaded_file is not None:
         image = Image.open(uploaded_file)
-        image_array = np.array(image)
         st.image(image, caption="上传的图片", use_column_width=True)
 
-        if "svm_clf" in locals() and "scaler" in locals():
-            target_shape = faces.images[0].shape
-            preprocessed_image = preprocess_image(image_array, target_shape)
-            preprocessed_image_scaled = scaler.transform([preprocessed_image])
-            prediction = svm_clf.predict(preprocessed_image_scaled)
-            predicted_person = faces.target_names[prediction[0]]
-            st.success(f"预测结果: {predicted_person}")
+        if models is not None:
+            features = preprocess_image(image, faces.image_shape)
+            if engine == "SVM":
+                prediction = svm_predictor(*models)(features[None, :])
+                st.success(f"预测结果: {faces.target_names[prediction[0]]}")
+            else:
+                top = models.predict_topk(features, k=3)
+                st.success(f"预测结果: {faces.target_names[top[0][0]]}")
+                st.dataframe(
+                    pd.DataFrame(
+                        {
+                            "人物": [faces.target_names[label] for label, _ in top],
+                            "得分": [score for _, score in top],
+                        }
+                    ),
+                    hide_index=True,
+                )
         else:
-            st.error("请先加载模型")
+            st.error("请先在“模型训练与评估”中训练模型")
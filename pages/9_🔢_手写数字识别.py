@@ -1,20 +1,44 @@
+import time
+
 import streamlit as st
 from streamlit_drawable_canvas import st_canvas
-from skimage.color import rgb2gray, rgba2rgb
-from skimage.transform import resize
-import numpy as np
-import tensorflow as tf
+from canvas_preprocessing import preprocess_canvas
+from handwriting_models import VARIANTS, get_model_server
+from live_recognition import LiveRecognition, canvas_digest, is_blank
 
+variant = st.sidebar.selectbox(
+    "模型精度",
+    VARIANTS,
+    help="float16 和 int8 为 TFLite 量化版本，体积更小、推理更快，由 model_variants.py 生成",
+)
 
-# 加载模型
-@st.cache_resource
-def load_digit_model():
-    return tf.keras.models.load_model(
-        "models/DigitSense_model_improved.keras", compile=False
-    )
+# 模型在后台线程中加载并预热，首次访问时若尚未就绪则等待
+model_server = get_model_server()
+try:
+    with st.spinner("模型加载中..."):
+        # 多个会话的请求在同一个队列中合并为批量推理
+        recognizer = model_server.get_batcher("digit", variant=variant)
+except RuntimeError as err:
+    st.error(f"模型加载失败: {err}")
+    st.stop()
 
+if variant == "float32":
+    model_status = model_server.status()["digit"]
+    st.sidebar.caption(
+        f"模型加载耗时 {model_status['load_seconds']:.2f} 秒，"
+        f"预热耗时 {model_status['warmup_seconds']:.2f} 秒"
+    )
+batch_metrics = recognizer.metrics()
+if batch_metrics["batches"]:
+    st.sidebar.caption(
+        f"平均批大小 {batch_metrics['mean_batch_size']:.1f}"
+        f"（填充率 {batch_metrics['fill_rate']:.0%}），"
+        f"排队延迟 p95 {batch_metrics['queue_p95_ms']:.1f} ms"
+    )
 
-model = load_digit_model()
+center = st.sidebar.checkbox(
+    "按重心居中", value=False, help="像 MNIST 数据集一样，把笔迹的重心移到图像中心"
+)
 
 st.title("手写识别 - 数字 🔢")
 
@@ -37,31 +61,60 @@ with col1:
 
 # 右侧按钮和识别结果
 with col2:
-    if st.button("识别", key="recognize_digit"):
-        if canvas_result.image_data is not None:
+    live = st.toggle("边写边识别", value=True, key="live_digit")
+    if live or st.button("识别", key="recognize_digit"):
+        image_data = canvas_result.image_data
+        live_state = st.session_state.setdefault(
+            "live_recognition_digit", LiveRecognition()
+        )
+        if image_data is not None and not is_blank(image_data):
             # 处理绘制的图像
-            gray_image = rgb2gray(rgba2rgb(canvas_result.image_data))
-            resized_image = resize(gray_image, (28, 28), anti_aliasing=True)
-            processed_image = np.abs(1 - resized_image).reshape(1, 28, 28)
+            processed_image = preprocess_canvas(image_data, center=center)
+
+            # 画布内容不变时（例如其他控件触发的重新运行）直接使用上次的结果
+            digest = f"{canvas_digest(image_data)}:{center}:{variant}"
+            top_predictions = live_state.lookup(digest)
+            if top_predictions is None:
+                if live:
+                    # 等待停笔，期间的新笔画会让 Streamlit 中断本次运行
+                    time.sleep(live_state.debounce)
 
-            # 显示预测中的提示
-            prediction_status = st.empty()
-            prediction_status.write("预测中...")
+                # 显示预测中的提示
+                prediction_status = st.empty()
+                prediction_status.write("预测中...")
 
-            # 模型预测
-            predictions = np.argmax(model.predict(processed_image), axis=-1)
+                # 模型预测
+                top_predictions = recognizer.predict_topk(processed_image, k=3)
+                live_state.record(digest, top_predictions)
+                prediction_status.empty()
 
-            # 更新预测结果
-            prediction_status.write(f"## 识别结果: {predictions[0]}")
+            # 显示预测结果
+            st.write(f"## 识别结果: {top_predictions[0][0]}")
+            st.dataframe(
+                {
+                    "候选": [label for label, _ in top_predictions],
+                    "概率": [f"{probability:.1%}" for _, probability in top_predictions],
+                },
+                hide_index=True,
+            )
 
-            st.image(resized_image, caption="调整大小后的图像", width=150)
+            st.image(1 - processed_image, caption="调整大小后的图像", width=150)
+            if live:
+                st.caption(
+                    f"本次书写画布更新 {live_state.updates} 次，"
+                    f"实际推理 {live_state.inferences} 次，避免 {live_state.avoided} 次"
+                )
         else:
-            st.warning("请先在画布上绘制数字。")
+            live_state.reset()
+            if live:
+                st.info("在左侧画布上书写，停笔后自动识别。")
+            else:
+                st.warning("请先在画布上绘制数字。")
 
 # 添加使用说明
 st.markdown("""
 ## 使用说明
 1. 在左侧画布上用鼠标绘制一个数字（0-9）。
-2. 点击"识别"按钮进行预测。
+2. 开启"边写边识别"时停笔后自动识别，关闭时点击"识别"按钮进行预测。
 3. 系统将显示识别结果和调整大小后的图像。
 """)
@@ -0,0 +1,233 @@
+"""
+多项式回归的超参数搜索。
+
+只计算一次最高次数的多项式展开：PolynomialFeatures 的输出按次数从低到高排列，
+低次数和只用部分原始特征的展开都可以从中按列选取，不必重新计算。
+展开后的列按训练集标准化，再交给 LinearRegression（alpha 为 0）或 Ridge，
+避免 5 次方后数量级相差几十个 10 次方的列使求解病态，也使正则化强度对各列一致。
+
+各候选配置在进程池中并行训练，展开后的矩阵在每个工作进程启动时传入一次，
+结果按完成顺序逐个返回，调用方可以边训练边更新图表；最佳配置的模型直接保留，无需重新训练。
+Streamlit 页面传入 max_workers=1，在服务进程中依次训练，不 fork 多线程的服务进程。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class SweepConfig(NamedTuple):
+    degree: int
+    alpha: float
+    features: Tuple[str, ...]
+
+
+def make_configs(
+    degrees: Sequence[int],
+    alphas: Sequence[float],
+    feature_subsets: Sequence[Sequence[str]],
+) -> List[SweepConfig]:
+    """次数、正则化强度和特征子集的所有组合。"""
+    return [
+        SweepConfig(int(degree), float(alpha), tuple(features))
+        for features, degree, alpha in product(feature_subsets, degrees, alphas)
+    ]
+
+
+class ExpandedFeatures:
+    """训练集和测试集的最高次数多项式展开（已标准化），以及选取各配置所需列的方法。"""
+
+    def __init__(self, X_train: pd.DataFrame, X_test: pd.DataFrame, max_degree: int):
+        from sklearn.preprocessing import PolynomialFeatures
+
+        self.feature_names = list(X_train.columns)
+        self.poly = PolynomialFeatures(max_degree, include_bias=False).fit(X_train.to_numpy())
+        train = self.poly.transform(X_train.to_numpy())
+        self.mean = train.mean(axis=0)
+        scale = train.std(axis=0)
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self.train = (train - self.mean) / self.scale
+        self.test = self.transform(X_test)
+
+    def transform(self, X) -> np.ndarray:
+        return (self.poly.transform(np.asarray(X)) - self.mean) / self.scale
+
+    def columns(self, degree: int, features: Sequence[str]) -> np.ndarray:
+        """次数不超过 degree 且只包含 features 中原始特征的列。"""
+        powers = self.poly.powers_
+        excluded = [
+            index for index, name in enumerate(self.feature_names) if name not in features
+        ]
+        mask = powers.sum(axis=1) <= degree
+        if excluded:
+            mask &= (powers[:, excluded] == 0).all(axis=1)
+        return np.flatnonzero(mask)
+
+
+class PolynomialModel:
+    """搜索得到的模型：最高次数展开 + 标准化 + 选取的列 + 线性回归。"""
+
+    def __init__(self, expanded: ExpandedFeatures, columns: np.ndarray, estimator):
+        self.poly = expanded.poly
+        self.mean = expanded.mean[columns]
+        self.scale = expanded.scale[columns]
+        self.columns = columns
+        self.estimator = estimator
+
+    def predict(self, X) -> np.ndarray:
+        features = self.poly.transform(np.asarray(X))[:, self.columns]
+        return self.estimator.predict((features - self.mean) / self.scale)
+
+
+# 工作进程中共享的数据：(展开后的特征, y_train, y_test)
+_shared: Optional[Tuple[ExpandedFeatures, np.ndarray, np.ndarray]] = None
+
+
+def _init_worker(expanded: ExpandedFeatures, y_train: np.ndarray, y_test: np.ndarray) -> None:
+    global _shared
+    _shared = (expanded, y_train, y_test)
+
+
+def _fit(
+    config: SweepConfig,
+    shared: Optional[Tuple[ExpandedFeatures, np.ndarray, np.ndarray]] = None,
+) -> Dict:
+    """:param shared: 在当前进程中训练时直接传入数据，不经过模块级变量，多个线程可以同时搜索"""
+    from sklearn.linear_model import LinearRegression, Ridge
+    from sklearn.metrics import mean_squared_error
+
+    expanded, y_train, y_test = shared or _shared
+    columns = expanded.columns(config.degree, config.features)
+    estimator = LinearRegression() if config.alpha == 0 else Ridge(alpha=config.alpha)
+    estimator.fit(expanded.train[:, columns], y_train)
+    return {
+        "config": config,
+        "columns": columns,
+        "estimator": estimator,
+        "mse_train": mean_squared_error(y_train, estimator.predict(expanded.train[:, columns])),
+        "mse_test": mean_squared_error(y_test, estimator.predict(expanded.test[:, columns])),
+    }
+
+
+def run_sweep(
+    X_train: pd.DataFrame,
+    y_train,
+    X_test: pd.DataFrame,
+    y_test,
+    configs: List[SweepConfig],
+    max_workers: Optional[int] = None,
+) -> Iterator[Dict]:
+    """
+    训练所有候选配置，按完成顺序逐个返回结果。
+
+    :param configs: 候选配置，特征名必须是 X_train 的列
+    :param max_workers: 进程数，None 表示 CPU 核数；为 1 或只有一个配置时在当前进程中依次训练。
+        在 Streamlit 等多线程的服务进程中应传入 1，fork 出的子进程会复制服务进程的线程锁状态
+    :return: 每个配置的 config、mse_train、mse_test 和 model（PolynomialModel）
+    """
+    expanded = ExpandedFeatures(X_train, X_test, max(config.degree for config in configs))
+    y_train, y_test = np.asarray(y_train), np.asarray(y_test)
+
+    def with_model(result: Dict) -> Dict:
+        result["model"] = PolynomialModel(
+            expanded, result.pop("columns"), result.pop("estimator")
+        )
+        return result
+
+    workers = min(max_workers or os.cpu_count() or 1, len(configs))
+    if workers <= 1:
+        for config in configs:
+            yield with_model(_fit(config, (expanded, y_train, y_test)))
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(expanded, y_train, y_test),
+    ) as executor:
+        futures = [executor.submit(_fit, config) for config in configs]
+        for future in as_completed(futures):
+            yield with_model(future.result())
+
+
+def results_frame(results: List[Dict]) -> pd.DataFrame:
+    """把搜索结果整理为表格，按配置排序。"""
+    return pd.DataFrame(
+        [
+            {
+                "degree": result["config"].degree,
+                "alpha": result["config"].alpha,
+                "features": "+".join(result["config"].features),
+                "mse_train": result["mse_train"],
+                "mse_test": result["mse_test"],
+            }
+            for result in results
+        ]
+    ).sort_values(["features", "alpha", "degree"], ignore_index=True)
+
+
+def best_by_degree(frame: pd.DataFrame) -> pd.DataFrame:
+    """每个次数下测试集 MSE 最小的配置，按次数排序。"""
+    return frame.loc[frame.groupby("degree")["mse_test"].idxmin()].sort_values(
+        "degree", ignore_index=True
+    )
+
+
+# 基准测试：与原页面逐个次数重新计算 PolynomialFeatures、最后再训练一次最佳次数的做法对比
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_squared_error
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import PolynomialFeatures
+
+    parser = argparse.ArgumentParser(description="多项式回归超参数搜索的基准测试")
+    parser.add_argument("--workers", type=int, default=None, help="进程数")
+    parser.add_argument("--rows", type=int, default=0, help="把数据重复到该行数，0 表示原始数据")
+    args = parser.parse_args()
+
+    data = pd.read_csv("data/challenge-2-bitcoin.csv")
+    features = ["btc_total_bitcoins", "btc_transaction_fees"]
+    if args.rows:
+        data = data.sample(args.rows, replace=True, random_state=0)
+    X_train, X_test, y_train, y_test = train_test_split(
+        data[features], data["btc_market_price"], test_size=0.3, random_state=42
+    )
+    degrees = [1, 2, 3, 4, 5]
+
+    start = time.perf_counter()
+    mse_test = []
+    for degree in degrees:
+        poly = PolynomialFeatures(degree)
+        model = LinearRegression().fit(poly.fit_transform(X_train), y_train)
+        mse_test.append(mean_squared_error(y_test, model.predict(poly.transform(X_test))))
+    best = degrees[int(np.argmin(mse_test))]
+    poly = PolynomialFeatures(best)
+    LinearRegression().fit(poly.fit_transform(X_train), y_train)
+    serial = time.perf_counter() - start
+    print(f"原方式（{len(degrees)} 个次数）：{serial * 1000:.0f} ms，最佳次数 {best}")
+
+    grids = {
+        "同样的 5 个次数": make_configs(degrees, (0.0,), [features]),
+        "5 次数 x 4 alpha x 3 特征子集": make_configs(
+            degrees, (0.0, 0.01, 1.0, 100.0), [features, features[:1], features[1:]]
+        ),
+    }
+    for label, configs in grids.items():
+        start = time.perf_counter()
+        results = list(run_sweep(X_train, y_train, X_test, y_test, configs, args.workers))
+        elapsed = time.perf_counter() - start
+        best = min(results, key=lambda result: result["mse_test"])
+        assert np.isclose(
+            mean_squared_error(y_test, best["model"].predict(X_test)), best["mse_test"]
+        )
+        print(
+            f"{label}（{len(configs)} 个配置）：{elapsed * 1000:.0f} ms，"
+            f"最佳 {best['config']}，测试集 MSE {best['mse_test']:.0f}"
+        )
@@ -0,0 +1,50 @@
+"""
+房价和比特币价格预测页面共用的 st.cache_resource 资源。
+
+各页面从这里导入，所有页面和会话共享同一个 TrainingCache 和同一份数据集，
+缓存键只包含数据集名称和内容的哈希，不会因为页面写法不同产生重复的缓存项。
+"""
+
+from typing import Dict
+
+import pandas as pd
+import streamlit as st
+
+from data_store import load_dataset, source_path
+from regression_pipelines import dataset_digest, train_pipeline
+from training_cache import TrainingCache, file_digest
+
+
+# 以内存映射方式读取 Arrow 文件，命中时不需要反序列化
+# digest 只参与缓存键，CSV 变化后重新读取，不会用旧数据训练新 digest 下的模型
+@st.cache_resource
+def _cached_data(name: str, digest: str) -> pd.DataFrame:
+    return load_dataset(name)
+
+
+def load_data(name: str) -> pd.DataFrame:
+    """
+    读取数据集的当前版本，也作为 train_pipeline 的 data_loader。
+
+    页面和训练流水线只读取数据，不要原地修改。
+
+    :param name: data_store.DATASETS 中的名称
+    """
+    return _cached_data(name, file_digest(source_path(name)))
+
+
+# 训练结果在磁盘和进程内缓存，按数据集内容和参数区分
+@st.cache_resource
+def get_training_cache() -> TrainingCache:
+    return TrainingCache()
+
+
+# digest 只参与 st.cache_resource 的键，数据文件变化后重新获取
+@st.cache_resource
+def _cached_artifacts(name: str, digest: str) -> Dict:
+    return train_pipeline(name, get_training_cache(), data_loader=load_data)
+
+
+def get_artifacts(name: str) -> Dict:
+    """返回流水线 name 使用默认参数的训练结果。"""
+    return _cached_artifacts(name, dataset_digest(name))
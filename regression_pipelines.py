@@ -0,0 +1,238 @@
+"""
+房价和比特币价格预测页面的训练流水线。
+
+每个流水线接收读入的 DataFrame 和参数，返回模型、测试集上的预测结果和评价指标。
+train_pipeline 通过 TrainingCache 按数据集哈希和参数缓存结果，页面重新运行或有新的访问者时
+直接读取缓存，不再重复特征工程、划分数据集和训练。
+
+用法：
+    python regression_pipelines.py   # 对比重新训练和读取缓存的耗时
+"""
+
+import inspect
+import os
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_dataset, source_path
+from training_cache import TrainingCache, file_digest
+
+
+def train_boston(data: pd.DataFrame, test_size: float = 0.2, random_state: int = 42) -> Dict:
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_squared_error
+    from sklearn.model_selection import train_test_split
+
+    X = data.drop("medv", axis=1)
+    y = data["medv"]
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state
+    )
+    model = LinearRegression().fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    return {
+        "model": model,
+        "results": pd.DataFrame({"真实值": y_test, "预测值": y_pred}),
+        "metrics": {"mse": mean_squared_error(y_test, y_pred)},
+    }
+
+
+def train_beijing(
+    data: pd.DataFrame,
+    test_size: float = 0.2,
+    random_state: int = 42,
+    community_encoding: str = "onehot",
+    alpha: float = 0.01,
+) -> Dict:
+    """稀疏特征 + 岭回归，特征见 beijing_features.BeijingFeatureEncoder。"""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    from sklearn.model_selection import train_test_split
+
+    from beijing_features import TARGET_COLUMN, make_beijing_model
+
+    data = data.dropna(subset=[TARGET_COLUMN])
+    train, test = train_test_split(data, test_size=test_size, random_state=random_state)
+    model = make_beijing_model(community_encoding, alpha=alpha)
+    model.fit(train, train[TARGET_COLUMN])
+    y_test = test[TARGET_COLUMN]
+    y_pred = model.predict(test)
+    return {
+        "model": model,
+        "results": pd.DataFrame({"真实值": y_test, "预测值": y_pred}),
+        "metrics": {
+            "mae": mean_absolute_error(y_test, y_pred),
+            "mse": mean_squared_error(y_test, y_pred),
+            "mape": np.mean(np.abs((y_test - y_pred) / y_test)) * 100,
+        },
+    }
+
+
+def train_bitcoin(
+    data: pd.DataFrame,
+    features: List[str] = ("btc_total_bitcoins", "btc_transaction_fees"),
+    target: str = "btc_market_price",
+    degrees: List[int] = (1, 2, 3, 4, 5),
+    alphas: List[float] = (0.0, 0.01, 1.0, 100.0),
+    feature_subsets: Optional[List[List[str]]] = None,
+    test_size: float = 0.3,
+    random_state: int = 42,
+    max_workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """
+    在多项式次数、正则化强度和特征子集上搜索，保留测试集 MSE 最小的模型，
+    搜索过程见 polynomial_sweep.run_sweep。
+
+    :param feature_subsets: 候选的特征子集，None 表示全部特征及每个单独的特征
+    :param max_workers: 搜索使用的进程数，None 表示 CPU 核数
+    :param progress_callback: 每个配置训练完成时调用 callback(结果)
+    :return: 除 model / results 外，sweep 为各配置的训练集和测试集 MSE，
+             best_degree / best_config 为最佳配置
+    """
+    from sklearn.model_selection import train_test_split
+
+    from polynomial_sweep import make_configs, results_frame, run_sweep
+
+    features = list(features)
+    if feature_subsets is None:
+        feature_subsets = [features] + [[feature] for feature in features]
+    X_train, X_test, y_train, y_test = train_test_split(
+        data[features], data[target], test_size=test_size, random_state=random_state
+    )
+
+    results = []
+    configs = make_configs(degrees, alphas, feature_subsets)
+    for result in run_sweep(X_train, y_train, X_test, y_test, configs, max_workers):
+        results.append(result)
+        if progress_callback is not None:
+            progress_callback(result)
+
+    best = min(results, key=lambda result: result["mse_test"])
+    return {
+        "model": best["model"],
+        "results": pd.DataFrame({"真实值": y_test, "预测值": best["model"].predict(X_test)}),
+        "sweep": results_frame(results),
+        "best_degree": best["config"].degree,
+        "best_config": best["config"]._asdict(),
+        "metrics": {"mse": best["mse_test"]},
+    }
+
+
+def train_bitcoin_forecast(
+    data: pd.DataFrame,
+    initial: int = 365,
+    window: Optional[int] = None,
+    forgetting: float = 1.0,
+    lags: List[int] = (1, 2, 3, 7),
+    windows: List[int] = (7, 30),
+) -> Dict:
+    """
+    按时间顺序前推回测的价格预测，模型用递推最小二乘逐日更新，见 bitcoin_forecast。
+
+    :param initial: 回测开始前用于初始训练的天数
+    :param window: 滚动窗口的天数，None 表示扩展窗口
+    :return: model 为用全部数据训练、可以继续 append 新数据的 BitcoinForecaster，
+             results 为回测中每天的预测，forecast 为下一天的 (日期, 预测价格)
+    """
+    from bitcoin_forecast import BitcoinForecaster, backtest, backtest_metrics
+
+    data = data.sort_values("Date", ignore_index=True)
+    feature_params = {"lags": lags, "windows": windows}
+    results = backtest(data, initial, window, forgetting, **feature_params)
+    model = BitcoinForecaster(window=window, forgetting=forgetting, **feature_params).fit(data)
+    return {
+        "model": model,
+        "results": results,
+        "forecast": model.forecast(),
+        "metrics": backtest_metrics(results),
+    }
+
+
+# 训练代码和数据类型声明所在的文件，其内容的哈希参与缓存键
+_CODE_FILES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in (
+        "regression_pipelines.py",
+        "beijing_features.py",
+        "polynomial_sweep.py",
+        "bitcoin_forecast.py",
+        "data_store.py",
+    )
+]
+
+# 不影响训练结果、不参与缓存键的参数
+_RUNTIME_PARAMS = {"data", "max_workers", "progress_callback"}
+
+# 流水线名称 -> (data_store 中的数据集名称, 训练函数)
+PIPELINES: Dict[str, tuple] = {
+    "boston": ("boston", train_boston),
+    "beijing": ("beijing", train_beijing),
+    "bitcoin": ("bitcoin", train_bitcoin),
+    "bitcoin_forecast": ("bitcoin", train_bitcoin_forecast),
+}
+
+
+def load_data(name: str) -> pd.DataFrame:
+    return load_dataset(PIPELINES[name][0])
+
+
+def dataset_digest(name: str) -> str:
+    return file_digest(source_path(PIPELINES[name][0]))
+
+
+def train_pipeline(
+    name: str,
+    cache: Optional[TrainingCache] = None,
+    data_loader: Callable[[str], pd.DataFrame] = load_dataset,
+    **params,
+) -> Dict:
+    """
+    训练（或从缓存读取）一个流水线。
+
+    :param name: PIPELINES 中的名称
+    :param cache: 训练结果缓存，None 表示不缓存
+    :param data_loader: 按数据集名称读取数据的函数，页面可以传入自己带缓存的版本
+    :param params: 传给训练函数的参数，除 max_workers、progress_callback 外都参与缓存键的计算
+    """
+    dataset, train = PIPELINES[name]
+    if cache is None:
+        return train(data_loader(dataset), **params)
+    # 缓存键包括补全默认值后的全部参数和训练代码的哈希，修改默认参数或训练代码后自动重新训练
+    bound = inspect.signature(train).bind(None, **params)
+    bound.apply_defaults()
+    key_params = {k: v for k, v in bound.arguments.items() if k not in _RUNTIME_PARAMS}
+    key_params["code"] = [file_digest(path) for path in _CODE_FILES]
+    key = cache.make_key(name, dataset_digest(name), key_params)
+    return cache.get_or_train(key, lambda: train(data_loader(dataset), **params))
+
+
+# 基准测试：每次重新训练、从磁盘读取和命中内存缓存三种情况下获取训练结果的耗时
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    def measure(func: Callable[[], Dict], rounds: int = 5) -> float:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        return (time.perf_counter() - start) / rounds * 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TrainingCache(directory)
+        # 不在内存中保留结果，每次都从磁盘读取
+        disk_only = TrainingCache(directory, memory_entries=0)
+        for name in PIPELINES:
+            data = load_data(name)
+            retrain = measure(lambda: train_pipeline(name, data_loader=lambda _: data))
+            artifacts = train_pipeline(name, cache)
+            from_disk = measure(lambda: train_pipeline(name, disk_only))
+            from_memory = measure(lambda: train_pipeline(name, cache), rounds=100)
+            assert np.allclose(
+                artifacts["results"]["预测值"], train_pipeline(name)["results"]["预测值"]
+            )
+            print(
+                f"{name}: 重新训练 {retrain:.1f} ms，磁盘缓存 {from_disk:.1f} ms，"
+                f"内存缓存 {from_memory * 1000:.0f} µs"
+            )
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+DEFAULT_CACHE_PATH = "cache/responses.sqlite3"
+
+
+class ResponseCache:
+    """
+    基于 SQLite 的大模型回复缓存。
+
+    以模型、消息、图片内容和采样参数的哈希作为键，相同输入直接返回之前的回答。
+    支持过期时间（TTL）和按总字节数限制的 LRU 淘汰，可在多个会话线程间共享。
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: float = 7 * 24 * 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        """
+        :param path: SQLite 数据库文件路径，":memory:" 表示仅保存在内存中
+        :param ttl: 缓存的有效时间（秒），<= 0 表示永不过期
+        :param max_bytes: 缓存回答的总字节数上限，超出后淘汰最久未使用的条目
+        """
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        model_name: str,
+        messages: List[Dict],
+        image_bytes: Optional[Union[bytes, memoryview]] = None,
+        **params,
+    ) -> str:
+        """
+        根据请求内容计算缓存键。
+
+        :param model_name: 模型名称
+        :param messages: 发送给模型的消息列表
+        :param image_bytes: 随请求发送的图片内容（如有）
+        :param params: 采样参数，例如 temperature、top_p、max_tokens
+        :return: 十六进制的 SHA-256 摘要
+        """
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps(
+                {"model": model_name, "messages": messages, "params": params},
+                sort_keys=True,
+                ensure_ascii=False,
+            ).encode("utf-8")
+        )
+        if image_bytes is not None:
+            digest.update(b"\0image\0")
+            digest.update(hashlib.sha256(image_bytes).digest())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存的回答，并更新命中计数和最近使用时间。
+
+        :return: 缓存的回答，未命中或已过期时返回 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl > 0 and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """写入回答，必要时淘汰最久未使用的条目。"""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict_locked(now)
+            self._conn.commit()
+
+    def _evict_locked(self, now: float) -> None:
+        if self.ttl > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+            )
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall()
+        expired = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", expired)
+
+    def clear(self) -> None:
+        """清空缓存和计数。"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        返回监控用的统计信息。
+
+        :return: 包含 hits、misses、hit_rate、entries、bytes 的字典
+        """
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": total,
+            }
+
+    def cached_stream(
+        self,
+        key: str,
+        generator_factory: Callable[[], Iterable[str]],
+        chunk_size: int = 8,
+        replay_delay: float = 0.01,
+    ):
+        """
+        带缓存的流式输出。
+
+        命中时把缓存的回答切成小段重新输出，使界面仍以打字效果显示；
+        未命中时透传生成器的输出，并在完整生成且没有出错时写入缓存。
+
+        :param key: 由 make_key 计算的缓存键
+        :param generator_factory: 未命中时调用，返回逐步产出回答的生成器
+        :param chunk_size: 回放时每段的字符数
+        :param replay_delay: 回放时每段之间的间隔（秒）
+        :yield: 回答内容
+        """
+        cached = self.get(key)
+        if cached is not None:
+            for start in range(0, len(cached), chunk_size):
+                yield cached[start : start + chunk_size]
+                if replay_delay:
+                    time.sleep(replay_delay)
+            return
+
+        parts = []
+        failed = False
+        for chunk in generator_factory():
+            if chunk.startswith("Error:"):
+                failed = True
+            parts.append(chunk)
+            yield chunk
+        response = "".join(parts)
+        if response and not failed:
+            self.set(key, response)
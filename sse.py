@@ -0,0 +1,186 @@
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List
+
+DONE_SENTINEL = "[DONE]"
+
+
+class SSEDecoder:
+    """
+    增量的 Server-Sent Events 解码器。
+
+    直接处理网络上收到的原始字节块，事件可以在任意位置被拆分到多次读取中。
+    支持 LF、CRLF 和单独 CR 换行，多行 data 字段按规范以换行符拼接，
+    以冒号开头的注释行（常用作 keep-alive）会被忽略。只关心 data 字段。
+    """
+
+    def __init__(self):
+        self._pending: List[bytes] = []  # 尚未遇到换行的不完整行
+        self._data: List[str] = []
+        self._pending_cr = False
+
+    def feed(self, chunk: bytes) -> List[str]:
+        """
+        送入一块字节。
+
+        :param chunk: 从网络读取的原始字节
+        :return: 本次送入后完整到达的事件的 data 内容
+        """
+        if self._pending_cr:
+            # 上一块以 CR 结尾：如果本块以 LF 开头，二者合起来才是一个换行
+            self._pending_cr = False
+            if chunk.startswith(b"\n"):
+                chunk = chunk[1:]
+        if b"\r" in chunk:
+            if chunk.endswith(b"\r"):
+                self._pending_cr = True
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+        if b"\n" not in chunk:
+            # 常见于很长的事件被拆成多个小块，只暂存引用，等换行到达后一次拼接
+            if chunk:
+                self._pending.append(chunk)
+            return []
+        if self._pending:
+            self._pending.append(chunk)
+            chunk = b"".join(self._pending)
+            self._pending = []
+        # 只解码到最后一个换行为止，被拆开的多字节字符留在剩余部分中
+        last = chunk.rfind(b"\n")
+        if last + 1 < len(chunk):
+            self._pending.append(chunk[last + 1 :])
+        lines = chunk[:last].decode("utf-8").split("\n")
+
+        events = []
+        data = self._data
+        for line in lines:
+            if not line:
+                # 空行：分发当前事件
+                if data:
+                    events.append(data[0] if len(data) == 1 else "\n".join(data))
+                    data = []
+            elif line[:6] == "data: ":
+                data.append(line[6:])
+            elif line[:5] == "data:":
+                data.append(line[5:])
+            # 注释行（以冒号开头）以及 event、id、retry 等其他字段都不需要处理
+        self._data = data
+        return events
+
+    def flush(self) -> List[str]:
+        """
+        输入结束时调用，返回未以空行结束的最后一个事件。
+
+        规范要求丢弃这样的事件，但部分服务在结束时不发送空行，因此这里宽松处理。
+        """
+        events = self.feed(b"\n") if self._pending else []
+        if self._data:
+            events.append("\n".join(self._data))
+            self._data = []
+        return events
+
+
+def iter_sse_data(
+    chunks: Iterable[bytes], done_sentinel: str = DONE_SENTINEL
+) -> Iterator[str]:
+    """
+    从字节块流中逐个产出事件的 data 内容，遇到结束标记时停止。
+
+    :param chunks: 原始字节块，例如 response.iter_content(chunk_size=None)
+    :param done_sentinel: 结束标记
+    :yield: 每个事件的 data 内容
+    """
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        for data in decoder.feed(chunk):
+            if data == done_sentinel:
+                return
+            yield data
+    for data in decoder.flush():
+        if data == done_sentinel:
+            return
+        yield data
+
+
+async def aiter_sse_data(
+    chunks: AsyncIterable[bytes], done_sentinel: str = DONE_SENTINEL
+) -> AsyncIterator[str]:
+    """iter_sse_data 的异步版本，例如配合 httpx 的 response.aiter_bytes()。"""
+    decoder = SSEDecoder()
+    async for chunk in chunks:
+        for data in decoder.feed(chunk):
+            if data == done_sentinel:
+                return
+            yield data
+    for data in decoder.flush():
+        if data == done_sentinel:
+            return
+        yield data
+
+
+# 基准测试：与基于 requests.iter_lines 的逐行解析对比
+if __name__ == "__main__":
+    import io
+    import json
+    import random
+    import time
+
+    import requests
+
+    random.seed(0)
+    num_deltas = 5000
+    events = []
+    for i in range(num_deltas):
+        delta = json.dumps(
+            {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": random.choice("收货地点在店内。")}}],
+            },
+            ensure_ascii=False,
+        )
+        events.append(f"data: {delta}\n\n")
+        if i % 100 == 0:
+            events.append(": keep-alive\n\n")
+    events.append("data: [DONE]\n\n")
+    recorded = "".join(events).encode("utf-8")
+
+    def make_response() -> requests.Response:
+        response = requests.Response()
+        response.raw = io.BytesIO(recorded)
+        return response
+
+    def line_based(chunk_size: int, parse: bool) -> int:
+        # 原 stream_request 的做法
+        count = 0
+        for line in make_response().iter_lines(chunk_size=chunk_size):
+            if line.startswith(b"data: "):
+                data = line.decode("utf-8")[6:]
+                if parse:
+                    try:
+                        json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                count += 1
+        return count
+
+    def incremental(chunk_size: int, parse: bool) -> int:
+        count = 0
+        for data in iter_sse_data(make_response().iter_content(chunk_size=chunk_size)):
+            if parse:
+                json.loads(data)
+            count += 1
+        return count
+
+    print(f"{num_deltas} 个增量，共 {len(recorded) / 1024:.0f} KB")
+    for chunk_size in (512, 16384):
+        for parse in (False, True):
+            for label, func in (("逐行解析", line_based), ("增量解码", incremental)):
+                func(chunk_size, parse)
+                rounds = 20
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    count = func(chunk_size, parse)
+                elapsed = (time.perf_counter() - start) / rounds
+                print(
+                    f"块大小 {chunk_size:>5} {'含 JSON 解析' if parse else '仅分帧':<8} "
+                    f"{label}: {elapsed * 1000:6.1f} ms/流，{count} 个事件"
+                )
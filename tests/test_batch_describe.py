@@ -0,0 +1,21 @@
+import json
+
+from PIL import Image
+
+from batch_describe import BatchDescriber
+
+
+def test_decompression_bomb_is_recorded_per_image(tmp_path, monkeypatch):
+    # 超过 MAX_IMAGE_PIXELS 两倍的图片在打开时抛出 DecompressionBombError
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    bomb = tmp_path / "bomb.png"
+    Image.new("RGB", (64, 64)).save(bomb)
+    missing = tmp_path / "missing.png"
+
+    results_path = tmp_path / "results.jsonl"
+    stats = BatchDescriber(concurrency=2).run([str(bomb), str(missing)], str(results_path))
+
+    assert stats["failed"] == 2 and stats["succeeded"] == 0
+    records = [json.loads(line) for line in results_path.read_text(encoding="utf-8").splitlines()]
+    assert {record["image"] for record in records} == {str(bomb), str(missing)}
+    assert all(record["status"] == "error" and record["attempts"] == 0 for record in records)
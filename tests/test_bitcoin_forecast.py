@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from bitcoin_forecast import (
+    DEFAULT_EXOGENOUS,
+    BitcoinForecaster,
+    RecursiveLeastSquares,
+    backtest,
+    make_features,
+)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    days = 240
+    frame = pd.DataFrame(
+        {column: rng.normal(100, 10, days).cumsum() for column in DEFAULT_EXOGENOUS}
+    )
+    frame["btc_market_price"] = 1000 + rng.normal(0, 5, days).cumsum()
+    frame["Date"] = pd.date_range("2017-01-01", periods=days)
+    return frame
+
+
+def test_downdate_matches_refit(data):
+    features, target = make_features(data)
+    X, y = features.to_numpy(), target.to_numpy()
+    model = RecursiveLeastSquares(X.shape[1]).fit(X[:120], y[:120])
+    for t in range(40):
+        model.downdate(X[t], y[t])
+    reference = LinearRegression().fit(X[40:120], y[40:120])
+    np.testing.assert_allclose(model.predict(X), reference.predict(X), rtol=1e-4, atol=1e-2)
+
+
+def test_unstable_downdate_raises_and_keeps_state():
+    rng = np.random.default_rng(1)
+    X, y = rng.normal(size=(3, 2)) * [1e6, 1], rng.normal(size=3)
+    # 3 行恰好确定 3 个参数，移除任意一行后 XᵀX 奇异，只剩极弱的正则化
+    model = RecursiveLeastSquares(2, delta=1e12).fit(X, y)
+    P, w = model.P.copy(), model.w.copy()
+    with pytest.raises(np.linalg.LinAlgError):
+        model.downdate(X[0], y[0])
+    np.testing.assert_array_equal(model.P, P)
+    np.testing.assert_array_equal(model.w, w)
+    assert model.n_samples == 3
+
+
+def test_rolling_backtest_refits_when_downdate_is_unstable(data, monkeypatch):
+    def unstable(self, x, y):
+        raise np.linalg.LinAlgError
+
+    expected = backtest(data, initial=120, window=60)
+    monkeypatch.setattr(RecursiveLeastSquares, "downdate", unstable)
+    results = backtest(data, initial=120, window=60)
+    np.testing.assert_allclose(results["预测值"], expected["预测值"], rtol=1e-4)
+
+    forecaster = BitcoinForecaster(window=60).fit(data.iloc[:200])
+    for index in range(200, len(data)):
+        forecaster.append(data.iloc[index])
+    assert len(forecaster.recent) == 60
+    assert np.isfinite(forecaster.forecast()[1])
+
+
+def test_rolling_window_with_forgetting_is_rejected_upfront(data):
+    with pytest.raises(ValueError):
+        backtest(data, initial=120, window=60, forgetting=0.99)
+    with pytest.raises(ValueError):
+        BitcoinForecaster(window=60, forgetting=0.99)
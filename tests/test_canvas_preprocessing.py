@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from PIL import Image
+from scipy import ndimage
+from skimage.color import rgb2gray, rgba2rgb
+from skimage.transform import downscale_local_mean, resize
+
+from canvas_preprocessing import (
+    center_of_mass_shift,
+    downscale_mean,
+    ink_intensity,
+    preprocess_canvas,
+    shift_image,
+)
+
+# 与参考实现逐像素比较时的容差：float32 与 float64 计算的舍入误差
+ATOL = 1e-5
+
+
+def make_canvas(seed: int, size: int = 280) -> np.ndarray:
+    """模拟 st_canvas 的输出：透明背景上若干不透明的深色笔画，边缘带半透明的抗锯齿像素。"""
+    rng = np.random.default_rng(seed)
+    canvas = np.zeros((size, size, 4), dtype=np.uint8)
+    for _ in range(6):
+        row, col = rng.integers(size // 14, size - size // 7, 2)
+        height, width = rng.integers(size // 28, size // 5, 2)
+        canvas[row : row + height, col : col + width, 3] = 255
+        canvas[row + height : row + height + 2, col : col + width, 3] = 128
+    canvas[..., :3] = rng.integers(0, 40, size=(size, size, 3), dtype=np.uint8)
+    return canvas
+
+
+def original_pipeline(canvas: np.ndarray) -> np.ndarray:
+    """原页面的处理流程。"""
+    gray_image = rgb2gray(rgba2rgb(canvas))
+    resized_image = resize(gray_image, (28, 28), anti_aliasing=True)
+    return np.abs(1 - resized_image)
+
+
+@pytest.fixture(params=range(5))
+def canvas(request) -> np.ndarray:
+    return make_canvas(request.param)
+
+
+def test_ink_intensity_matches_skimage(canvas):
+    reference = np.abs(1 - rgb2gray(rgba2rgb(canvas)))
+    result = ink_intensity(canvas)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, reference, rtol=0, atol=ATOL)
+
+
+def test_downscale_matches_skimage_local_mean(canvas):
+    ink = ink_intensity(canvas)
+    np.testing.assert_allclose(
+        downscale_mean(ink), downscale_local_mean(ink, (10, 10)), rtol=0, atol=ATOL
+    )
+
+
+def test_downscale_matches_pil_box_resize(canvas):
+    # PIL 的 BOX 滤波即按面积平均
+    ink = ink_intensity(canvas)
+    reference = np.asarray(Image.fromarray(ink, "F").resize((28, 28), Image.BOX))
+    np.testing.assert_allclose(downscale_mean(ink), reference, rtol=0, atol=ATOL)
+
+
+def test_downscale_non_multiple_size():
+    image = np.random.default_rng(0).random((100, 90), dtype=np.float32)
+    rows = np.arange(29) * 100 // 28
+    cols = np.arange(29) * 90 // 28
+    expected = [
+        [image[rows[i] : rows[i + 1], cols[j] : cols[j + 1]].mean() for j in range(28)]
+        for i in range(28)
+    ]
+    np.testing.assert_allclose(downscale_mean(image), expected, rtol=0, atol=ATOL)
+
+
+def test_close_to_original_pipeline(canvas):
+    # 原流程先做高斯抗锯齿再双线性插值，与面积平均只在笔画边缘不同：
+    # 平均差异约 0.01，个别边缘像素最多约 0.28
+    original = original_pipeline(canvas)
+    result = preprocess_canvas(canvas)
+    assert result.shape == (28, 28) and result.dtype == np.float32
+    difference = np.abs(original - result)
+    assert difference.mean() < 0.02
+    assert difference.max() < 0.35
+    assert np.corrcoef(original.ravel(), result.ravel())[0, 1] > 0.98
+
+
+def test_blank_canvas():
+    blank = np.zeros((280, 280, 4), dtype=np.uint8)
+    assert not preprocess_canvas(blank).any()
+    assert center_of_mass_shift(preprocess_canvas(blank)) == (0, 0)
+    assert not preprocess_canvas(blank, center=True).any()
+
+
+def test_centering_moves_center_of_mass_to_middle():
+    # 左上角的笔画，居中后整体仍在图像内
+    canvas = np.zeros((280, 280, 4), dtype=np.uint8)
+    canvas[20:120, 30:50, 3] = 255
+    centered = preprocess_canvas(canvas, center=True)
+    np.testing.assert_allclose(ndimage.center_of_mass(centered), (13.5, 13.5), atol=1)
+    assert np.isclose(centered.sum(), preprocess_canvas(canvas).sum(), rtol=1e-5)
+
+
+@pytest.mark.parametrize("shift", [(0, 0), (3, -2), (-5, 7), (28, 0), (0, -30)])
+def test_shift_image_matches_ndimage(shift):
+    image = np.random.default_rng(1).random((28, 28), dtype=np.float32)
+    expected = ndimage.shift(image, shift, order=0, mode="constant", cval=0)
+    np.testing.assert_array_equal(shift_image(image, shift), expected)
@@ -0,0 +1,74 @@
+import time
+
+import conversation_context
+from conversation_context import (
+    _SUMMARY_PROMPT_TOKENS,
+    MESSAGE_OVERHEAD_TOKENS,
+    ConversationContext,
+    estimate_message_tokens,
+    estimate_tokens,
+)
+
+
+def make_messages(count: int):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "x" * 200}
+        for i in range(count)
+    ]
+
+
+def wait_for_summary(context: ConversationContext) -> None:
+    deadline = time.perf_counter() + 5
+    while context._summarizing and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert not context._summarizing
+
+
+def test_summary_prompts_stay_within_budget():
+    budget, reserve = 400, 100
+    calls = []
+
+    def summarize(previous, messages):
+        prompt_tokens = _SUMMARY_PROMPT_TOKENS + sum(map(estimate_message_tokens, messages))
+        if previous:
+            prompt_tokens += estimate_tokens(previous) + MESSAGE_OVERHEAD_TOKENS
+        calls.append((prompt_tokens, len(messages)))
+        return f"摘要 {len(calls)}"
+
+    context = ConversationContext(make_messages(40), summarize)
+    context.build_messages(budget, reserve)
+    wait_for_summary(context)
+
+    dropped = context.turn_metrics[0]["messages_dropped"]
+    assert len(calls) > 1
+    assert all(tokens <= budget - reserve for tokens, _ in calls)
+    assert sum(count for _, count in calls) == dropped
+    assert context._summarized_upto == dropped
+
+
+def test_failed_summary_backs_off(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(conversation_context.time, "monotonic", lambda: now[0])
+    calls = []
+
+    def summarize(previous, messages):
+        calls.append(len(messages))
+        raise RuntimeError("Error: unavailable")
+
+    context = ConversationContext(make_messages(40), summarize)
+    context.build_messages(400, 100)
+    wait_for_summary(context)
+    context.build_messages(400, 100)
+    wait_for_summary(context)
+    assert len(calls) == 1
+    assert context._summarized_upto == 0
+
+    now[0] += conversation_context.SUMMARY_RETRY_BACKOFF
+    context.build_messages(400, 100)
+    wait_for_summary(context)
+    assert len(calls) == 2
+    # 连续失败后等待时间翻倍
+    now[0] += conversation_context.SUMMARY_RETRY_BACKOFF
+    context.build_messages(400, 100)
+    wait_for_summary(context)
+    assert len(calls) == 2
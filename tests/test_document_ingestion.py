@@ -0,0 +1,61 @@
+import io
+import tracemalloc
+import zipfile
+
+import pytest
+
+from document_ingestion import UnsupportedFormatError, iter_docx_paragraphs, iter_document
+
+NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def make_docx(body: str) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(
+            "word/document.xml",
+            f'<w:document xmlns:w="{NAMESPACE}"><w:body>{body}</w:body></w:document>',
+        )
+    buffer.seek(0)
+    return buffer
+
+
+def paragraph(text: str) -> str:
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def test_paragraphs_tables_and_breaks():
+    body = (
+        paragraph("第一段")
+        + "<w:p><w:r><w:t>制表</w:t><w:tab/><w:t>换行</w:t><w:br/><w:t>结束</w:t></w:r></w:p>"
+        + f"<w:tbl><w:tr><w:tc>{paragraph('单元格 1')}</w:tc><w:tc>{paragraph('单元格 2')}</w:tc></w:tr></w:tbl>"
+        + paragraph("最后一段")
+        + "<w:sectPr/>"
+    )
+    assert list(iter_docx_paragraphs(make_docx(body))) == [
+        "第一段",
+        "制表\t换行\n结束",
+        "单元格 1",
+        "单元格 2",
+        "最后一段",
+    ]
+
+
+def peak_memory(num_paragraphs: int) -> int:
+    file = make_docx(paragraph("混元大模型支持长文档问答。" * 4) * num_paragraphs)
+    tracemalloc.start()
+    count = sum(1 for _ in iter_docx_paragraphs(file))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert count == num_paragraphs
+    return peak
+
+
+def test_memory_does_not_grow_with_document_size():
+    # 已处理的段落从树中移除后，峰值内存与段落数基本无关
+    assert peak_memory(40000) < 2 * peak_memory(5000)
+
+
+def test_unsupported_format():
+    with pytest.raises(UnsupportedFormatError):
+        list(iter_document(io.BytesIO(b""), "a.pdf"))
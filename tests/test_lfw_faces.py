@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from lfw_faces import preprocess_image
+
+SHAPE = (50, 37)
+
+
+@pytest.fixture
+def gray():
+    # 左暗右亮的渐变，缩放后仍能区分结果是否正确
+    return np.tile(np.linspace(0, 255, 80).astype(np.uint8), (100, 1))
+
+
+def test_rgb_and_gray_agree(gray):
+    expected = preprocess_image(gray, SHAPE)
+    assert expected.shape == (SHAPE[0] * SHAPE[1],) and expected.dtype == np.float32
+    rgb = Image.fromarray(np.repeat(gray[..., None], 3, axis=2), "RGB")
+    np.testing.assert_allclose(preprocess_image(rgb, SHAPE), expected, atol=1e-3)
+    np.testing.assert_allclose(preprocess_image(rgb.convert("RGBA"), SHAPE), expected, atol=1e-3)
+
+
+@pytest.mark.parametrize("mode", ["LA", "P", "PA", "1"])
+def test_other_modes_match_gray(gray, mode):
+    image = Image.fromarray(gray, "L")
+    if mode == "1":
+        image = Image.fromarray(np.where(gray > 127, 255, 0).astype(np.uint8), "L")
+    expected = preprocess_image(np.asarray(image), SHAPE)
+    converted = image.convert(mode)
+    result = preprocess_image(converted, SHAPE)
+    np.testing.assert_allclose(result, expected, atol=0.02)
+    if mode == "LA":
+        np.testing.assert_allclose(preprocess_image(np.asarray(converted), SHAPE), expected, atol=1e-6)
+
+
+def test_white_palette_image():
+    image = Image.new("RGB", (40, 40), "white").convert("P")
+    np.testing.assert_allclose(preprocess_image(image, SHAPE), 1, atol=1e-3)
+
+
+@pytest.mark.parametrize("mode", ["I;16", "I"])
+def test_16_bit_image(gray, mode):
+    wide = gray.astype(np.uint16) * 257
+    image = Image.fromarray(wide, "I;16")
+    if mode == "I":
+        image = image.convert("I")
+    result = preprocess_image(image, SHAPE)
+    assert 0 <= result.min() and result.max() <= 1
+    np.testing.assert_allclose(result, preprocess_image(gray, SHAPE), atol=1e-5)
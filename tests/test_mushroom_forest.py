@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from mushroom_forest import BLOCK_ROWS, CompactForest
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 2, size=(300, 12)).astype(np.float32)
+    y = np.where(X[:, 0] + X[:, 3] * X[:, 5] > 0, "p", "e")
+    return X, y
+
+
+def assert_same_predictions(model, X):
+    forest = CompactForest.from_sklearn(model, [f"f{i}" for i in range(X.shape[1])])
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+
+
+def test_matches_sklearn(data):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    assert_same_predictions(model, X)
+
+
+def test_matches_sklearn_across_blocks(data):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    assert_same_predictions(model, np.tile(X, (BLOCK_ROWS // len(X) + 2, 1)))
+
+
+def test_tree_whose_root_is_a_leaf(data):
+    X, y = data
+    # max_depth=0 不被允许；特征全部相同的样本无法划分，得到只有根节点的树
+    stump = RandomForestClassifier(n_estimators=3, random_state=0).fit(np.zeros_like(X), y)
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, y)
+    model.estimators_ = model.estimators_ + stump.estimators_
+    assert any(estimator.tree_.node_count == 1 for estimator in model.estimators_)
+    assert_same_predictions(model, X)
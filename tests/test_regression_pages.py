@@ -0,0 +1,37 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+from data_store import DATASETS
+from regression_pages import get_artifacts, load_data
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # data 和 cache 目录都是相对路径，切换到临时目录后不会改动仓库中的文件
+    os.makedirs(tmp_path / "data")
+    shutil.copy(os.path.join(SOURCE, DATASETS["boston"].filename), tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear()
+    yield tmp_path / "data" / DATASETS["boston"].filename
+    st.cache_resource.clear()
+
+
+def test_changed_csv_is_reloaded_and_retrained(workdir):
+    original = pd.read_csv(workdir)
+    first = get_artifacts("boston")
+    assert len(load_data("boston")) == len(original)
+    assert get_artifacts("boston") is first
+
+    # 去掉一半的行，数据和训练结果都应来自新文件
+    original.iloc[: len(original) // 2].to_csv(workdir, index=False)
+    assert len(load_data("boston")) == len(original) // 2
+    second = get_artifacts("boston")
+    assert second is not first
+    assert second["results"].index.isin(range(len(original) // 2)).all()
+    assert len(second["results"]) < len(first["results"])
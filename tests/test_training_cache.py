@@ -0,0 +1,40 @@
+import threading
+import time
+
+import pytest
+
+from training_cache import TrainingCache
+
+
+def test_concurrent_requests_train_once_and_release_key_locks(tmp_path):
+    cache = TrainingCache(str(tmp_path))
+    calls = []
+
+    def train():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"value": 1}
+
+    threads = [
+        threading.Thread(target=cache.get_or_train, args=(key, train))
+        for key in ("a", "b")
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 2
+    assert cache._key_locks == {}
+
+
+def test_key_lock_released_when_training_fails(tmp_path):
+    cache = TrainingCache(str(tmp_path))
+
+    def train():
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_train("a", train)
+    assert cache._key_locks == {}
+    assert cache.get_or_train("a", lambda: {"value": 2}) == {"value": 2}
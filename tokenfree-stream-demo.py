@@ -1,71 +1,18 @@
+from tokenfree_api import create_payload, image_to_base64, iter_content, stream_request
 import requests
-import os
-import json
-from dotenv import load_dotenv
-import base64
-from typing import Dict, Any, Generator
-
-# 加载 .env 文件
-load_dotenv()
-TOKENFREE_TOKEN = os.getenv("TOKENFREE_TOKEN")
-API_URL = "https://api.tokenfree.ai/v1/chat/completions"
-
-
-def image_to_base64(image_path: str) -> str:
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
-
-
-def create_payload(image_base64: str) -> Dict[str, Any]:
-    return {
-        "model": "llava-onevision-qwen2-72b-ov",
-        "messages": [
-            {"role": "system", "content": "你是一个中文智者，请用中文回答问题"},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "用中文详细地描述一下这张图片，最后描述这张图片的关键词，不要有任何前缀"},
-                    {"type": "image_url", "image_url": {"url": image_base64}},
-                ],
-            },
-        ],
-        "max_tokens": 512,
-        "top_p": 1,
-        "temperature": 0.1,
-        "stream": True,
-    }
-
-
-def stream_request(payload: Dict[str, Any]) -> Generator[str, None, None]:
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {TOKENFREE_TOKEN}",
-    }
-    with requests.post(API_URL, json=payload, headers=headers, stream=True) as response:
-        response.raise_for_status()
-        for line in response.iter_lines():
-            if line.startswith(b"data: "):
-                yield line.decode("utf-8")[6:]
 
 
 def main():
     image_path = "data/images/cat/cat (1).jpg"
     image_base64 = image_to_base64(image_path)
-    payload = create_payload(image_base64)
+    payload = create_payload(
+        image_base64, "用中文详细地描述一下这张图片，最后描述这张图片的关键词，不要有任何前缀"
+    )
 
     try:
-        for chunk in stream_request(payload):
-            try:
-                chunk_data = json.loads(chunk)
-                if "choices" in chunk_data:
-                    for choice in chunk_data["choices"]:
-                        if "delta" in choice and "content" in choice["delta"]:
-                            content = choice["delta"]["content"]
-                            if content is not None:
-                                print(content, end="")
-            except json.JSONDecodeError:
-                # print(f"解析chunk失败: {e}")
-                pass
+        # 流式请求和 SSE 解析与 tokenfree_api 共用同一实现
+        for content in iter_content(stream_request(payload)):
+            print(content, end="")
     except requests.RequestException as e:
         print(f"请求失败: {e}")
 
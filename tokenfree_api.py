@@ -1,22 +1,68 @@
 import requests
 import os
+import io
 import json
 from dotenv import load_dotenv
 import base64
-from typing import Dict, Any, Generator, List
+from PIL import Image, ImageOps
+from sse import iter_sse_data
+from typing import BinaryIO, Dict, Any, Generator, Iterable, Iterator, List, Optional, Union
 
 # 加载 .env 文件
 load_dotenv()
 TOKENFREE_TOKEN = os.getenv("TOKENFREE_TOKEN")
-API_URL = "https://api.tokenfree.ai/v1/chat/completions"
+API_URL = os.getenv("TOKENFREE_API_URL", "https://api.tokenfree.ai/v1/chat/completions")
+DEFAULT_MODEL = "llava-onevision-qwen2-72b-ov"
+
+# 多模态页面和批量处理默认使用的收货地点核验提示词
+DELIVERY_CHECK_PROMPT = "分析这张图片，判断收货地点是否在店内。请注意商店的常见特征如货架、商品陈列、购物车、收银台等，然后直接回答‘收货地点在店内’或‘收货地点不在店内’。"
+
+# 发送前将图片长边缩小到该像素数以内，并以该质量重新编码为 JPEG
+MAX_IMAGE_SIZE = 1024
+JPEG_QUALITY = 85
+
+# 图片可以是文件路径、内存中的字节或已打开的二进制文件（如 Streamlit 的 UploadedFile）
+ImageInput = Union[str, bytes, bytearray, memoryview, BinaryIO]
 
 def image_to_base64(image_path: str) -> str:
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
+def _open_image(image: ImageInput) -> Image.Image:
+    if isinstance(image, str):
+        return Image.open(image)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image))
+    image.seek(0)
+    return Image.open(image)
+
+def prepare_image(
+    image: ImageInput, max_size: int = MAX_IMAGE_SIZE, quality: int = JPEG_QUALITY
+) -> bytes:
+    # 缩小并重新编码图片；原图已足够小时直接使用原始内容
+    with _open_image(image) as img:
+        if max(img.size) <= max_size:
+            if isinstance(image, str):
+                with open(image, "rb") as image_file:
+                    return image_file.read()
+            if isinstance(image, (bytes, bytearray, memoryview)):
+                return bytes(image)
+            image.seek(0)
+            return image.read()
+
+        # JPEG 解码时直接按 1/2、1/4、1/8 缩放，避免先解码出完整的大图
+        img.draft("RGB", (max_size, max_size))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        output = io.BytesIO()
+        img.save(output, format="JPEG", quality=quality, optimize=True)
+        return output.getvalue()
+
 def create_payload(image_base64: str, text: str) -> Dict[str, Any]:
     return {
-        "model": "llava-onevision-qwen2-72b-ov",
+        "model": DEFAULT_MODEL,
         "messages": [
             {"role": "system", "content": "你是一个中文智者，请用中文回答问题"},
             {
@@ -33,38 +79,115 @@ def create_payload(image_base64: str, text: str) -> Dict[str, Any]:
         "stream": True,
     }
 
-def stream_request(payload: Dict[str, Any]) -> Generator[str, None, None]:
+class StreamingImagePayload:
+    # 请求体按块生成：图片的 base64 编码边发送边计算，不拼接出完整的 JSON 字符串。
+    # 提供 __len__ 使 requests 发送 Content-Length 而不是分块传输编码。
+    PLACEHOLDER = "__IMAGE_BASE64__"
+
+    def __init__(self, image_bytes: bytes, text: str, block_size: int = 48 * 1024):
+        body = json.dumps(create_payload(self.PLACEHOLDER, text)).encode("utf-8")
+        self.prefix, self.suffix = body.split(self.PLACEHOLDER.encode("ascii"), 1)
+        self.image = memoryview(image_bytes)
+        # 块大小为 3 的倍数，各块的 base64 编码直接拼接即为整体的编码
+        self.block_size = block_size - block_size % 3
+
+    def __len__(self) -> int:
+        return len(self.prefix) + 4 * ((len(self.image) + 2) // 3) + len(self.suffix)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.prefix
+        for start in range(0, len(self.image), self.block_size):
+            yield base64.b64encode(self.image[start : start + self.block_size])
+        yield self.suffix
+
+def stream_request(
+    payload: Union[Dict[str, Any], StreamingImagePayload],
+    api_url: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+) -> Generator[str, None, None]:
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {TOKENFREE_TOKEN}",
     }
-    with requests.post(API_URL, json=payload, headers=headers, stream=True) as response:
+    if isinstance(payload, StreamingImagePayload):
+        request_body = {"data": payload}
+    else:
+        request_body = {"json": payload}
+    # 传入 session 时复用其连接池，批量请求不必每次重新建立连接
+    http = session or requests
+    with http.post(
+        api_url or API_URL, headers=headers, stream=True, **request_body
+    ) as response:
         response.raise_for_status()
-        for line in response.iter_lines():
-            if line.startswith(b"data: "):
-                yield line.decode("utf-8")[6:]
+        # 按到达的原始字节块增量解码 SSE 事件，[DONE] 之后停止读取
+        yield from iter_sse_data(response.iter_content(chunk_size=None))
 
-def describe_image(image_path: str, text: str) -> List[str]:
-    image_base64 = image_to_base64(image_path)
-    payload = create_payload(image_base64, text)
-    descriptions = []
+def iter_content(chunks: Iterable[str]) -> Generator[str, None, None]:
+    # 从流式响应的各个数据块中提取回答的文本增量
+    for chunk in chunks:
+        try:
+            chunk_data = json.loads(chunk)
+            if "choices" in chunk_data:
+                for choice in chunk_data["choices"]:
+                    if "delta" in choice and "content" in choice["delta"]:
+                        content = choice["delta"]["content"]
+                        if content is not None:
+                            yield content
+        except json.JSONDecodeError:
+            pass
+
+def describe_image_stream(
+    image: ImageInput,
+    text: str,
+    max_size: int = MAX_IMAGE_SIZE,
+    quality: int = JPEG_QUALITY,
+) -> Generator[str, None, None]:
+    try:
+        payload = StreamingImagePayload(prepare_image(image, max_size, quality), text)
+    except (OSError, Image.DecompressionBombError) as e:
+        # 损坏或不支持的图片（UnidentifiedImageError 是 OSError 的子类），同样以文本形式返回错误
+        yield f"Error: 无法读取图片: {e}"
+        return
 
     try:
-        for chunk in stream_request(payload):
-            try:
-                chunk_data = json.loads(chunk)
-                if "choices" in chunk_data:
-                    for choice in chunk_data["choices"]:
-                        if "delta" in choice and "content" in choice["delta"]:
-                            content = choice["delta"]["content"]
-                            if content is not None:
-                                descriptions.append(content)
-            except json.JSONDecodeError:
-                pass
+        yield from iter_content(stream_request(payload))
     except requests.RequestException as e:
-        print(f"请求失败: {e}")
+        # 与 hunyuan_generator 一致，以文本形式返回错误，调用方据此判断是否缓存结果
+        yield f"Error: 请求失败: {e}"
+
+def describe_cache_key(
+    image_bytes: Union[bytes, memoryview],
+    text: str,
+    max_size: int = MAX_IMAGE_SIZE,
+    quality: int = JPEG_QUALITY,
+) -> str:
+    """
+    describe_image_stream 的回复缓存键。
+
+    由 create_payload 生成的请求体计算，模型和采样参数只在 create_payload 中定义一处，
+    修改后缓存键随之变化；图片按原始字节和压缩设置区分。
+
+    :param image_bytes: 上传的原始图片内容
+    """
+    from response_cache import ResponseCache
+
+    payload = create_payload(StreamingImagePayload.PLACEHOLDER, text)
+    return ResponseCache.make_key(
+        payload.pop("model"),
+        payload.pop("messages"),
+        image_bytes=image_bytes,
+        max_size=max_size,
+        quality=quality,
+        **payload,
+    )
 
-    return descriptions
+def describe_image(
+    image: ImageInput,
+    text: str,
+    max_size: int = MAX_IMAGE_SIZE,
+    quality: int = JPEG_QUALITY,
+) -> List[str]:
+    return list(describe_image_stream(image, text, max_size, quality))
 
 # Example usage:
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+DEFAULT_ARTIFACT_DIR = "cache/training"
+
+# (绝对路径, 修改时间, 大小) -> 内容哈希
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    计算文件内容的哈希。
+
+    结果按 (路径, 修改时间, 大小) 记忆，文件不变时页面每次重新运行只需一次 stat。
+    """
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    digest = _digests.get(signature)
+    if digest is None:
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as data_file:
+            for chunk in iter(lambda: data_file.read(chunk_size), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        _digests[signature] = digest
+    return digest
+
+
+class TrainingCache:
+    """
+    训练结果的磁盘缓存。
+
+    以流水线名称、数据集内容的哈希和流水线参数作为键，用 joblib 保存训练得到的模型、
+    预测值和评价指标；数据或参数变化后键随之变化，自动重新训练。
+    最近使用的结果同时保存在内存中，命中时不需要读取文件。
+    同一个键同时只会训练一次，其他会话的线程等待其结果。
+    """
+
+    def __init__(self, directory: str = DEFAULT_ARTIFACT_DIR, memory_entries: int = 16):
+        """
+        :param directory: 保存训练结果的目录
+        :param memory_entries: 内存中最多保留的结果数，超出后淘汰最久未使用的
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 键 -> [锁, 持有或等待该锁的线程数]，计数归零时删除，只保留正在训练的键
+        self._key_locks: Dict[str, list] = {}
+
+    @staticmethod
+    def make_key(name: str, dataset_digest: str, params: Dict) -> str:
+        payload = json.dumps(
+            {"name": name, "dataset": dataset_digest, "params": params},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.joblib")
+
+    def get_or_train(self, key: str, train: Callable[[], Dict]) -> Dict:
+        """
+        返回 key 对应的训练结果，不存在时调用 train() 训练并保存。
+
+        :param train: 无参数的训练函数，返回可被 joblib 序列化的字典
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                return self._load_or_train(key, train)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def _load_or_train(self, key: str, train: Callable[[], Dict]) -> Dict:
+        """持有 key 的锁时调用。"""
+        import joblib
+
+        with self._lock:
+            # 等待期间其他线程可能已经训练完成
+            if key in self._memory:
+                self.hits += 1
+                return self._memory[key]
+        path = self.path(key)
+        if os.path.exists(path):
+            try:
+                artifacts = joblib.load(path)
+            except Exception:
+                # 文件损坏或由不兼容的版本写入时重新训练
+                artifacts = None
+            if artifacts is not None:
+                self._remember(key, artifacts)
+                with self._lock:
+                    self.hits += 1
+                return artifacts
+
+        artifacts = train()
+        # 先写入临时文件再替换，其他进程不会读到写了一半的文件
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump(artifacts, temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._remember(key, artifacts)
+        with self._lock:
+            self.misses += 1
+        return artifacts
+
+    def _remember(self, key: str, artifacts: Dict) -> None:
+        with self._lock:
+            self._memory[key] = artifacts
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """删除所有保存的训练结果。"""
+        with self._lock:
+            self._memory.clear()
+        for name in os.listdir(self.directory):
+            if name.endswith(".joblib"):
+                os.remove(os.path.join(self.directory, name))
+
+    def stats(self) -> Dict[str, int]:
+        files = [name for name in os.listdir(self.directory) if name.endswith(".joblib")]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(files),
+            "bytes": sum(os.path.getsize(self.path(name[: -len(".joblib")])) for name in files),
+        }